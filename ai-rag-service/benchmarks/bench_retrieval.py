@@ -0,0 +1,328 @@
+"""
+RETRIEVAL AND FALLBACK MICROBENCHMARK
+
+Measures search_local_knowledge and generate_smart_fallback_response, the two
+functions every request runs over GHANA_UNIVERSITIES_KNOWLEDGE, against synthetic
+knowledge bases of increasing size (default 10, 100 and 1,000 universities with
+dozens of programs each) and a fixed corpus of realistic queries.
+
+For each size and function it reports per-call latency (mean, median, p95, min over
+--samples timed passes of the corpus, after --warmup passes) and allocations
+(tracemalloc peak per call). Index build times are reported separately.
+
+Runs are appended to benchmarks/baselines/bench_retrieval.jsonl with --record; every
+run is compared with the most recent recorded entry, so retrieval changes are judged
+on numbers. Embeddings use the hashing stand-in encoder unless --real-embeddings.
+
+Usage:
+    python benchmarks/bench_retrieval.py [--sizes 10,100,1000] [--samples N] [--record]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+SERVICE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(SERVICE_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+HISTORY_PATH = BENCH_DIR / 'baselines' / 'bench_retrieval.jsonl'
+
+TOWNS = ['Accra', 'Kumasi', 'Tamale', 'Cape Coast', 'Ho', 'Koforidua', 'Sunyani', 'Takoradi', 'Bolgatanga',
+         'Wa', 'Winneba', 'Tarkwa', 'Techiman', 'Dambai', 'Sefwi Wiawso', 'Goaso', 'Nalerigu', 'Damongo']
+KINDS = ['University of {town}', '{town} Technical University', '{town} University College',
+         'University of Applied Sciences, {town}', '{town} Institute of Technology', '{town} College of Health Sciences']
+PROGRAM_CATALOGUE = [
+    'Computer Science', 'Computer Engineering', 'Medicine', 'Nursing', 'Pharmacy', 'Law', 'Economics',
+    'Business Administration', 'Accounting', 'Marketing', 'Civil Engineering', 'Electrical Engineering',
+    'Mechanical Engineering', 'Agriculture', 'Agricultural Economics', 'Architecture', 'Education',
+    'Mathematics', 'Statistics', 'Physics', 'Chemistry', 'Biology', 'Biochemistry', 'Political Science',
+    'Sociology', 'Psychology', 'Geography', 'History', 'English', 'French', 'Music', 'Fine Arts',
+    'Journalism', 'Public Health', 'Midwifery', 'Actuarial Science', 'Data Science', 'Information Technology',
+    'Development Studies', 'Tourism', 'Hospitality Management', 'Supply Chain Management',
+]
+REAL_UNIVERSITIES = ['University of Ghana', 'Kwame Nkrumah University of Science and Technology',
+                     'University of Cape Coast', 'University for Development Studies',
+                     'University of Professional Studies, Accra']
+
+QUERY_TEMPLATES = [
+    'What are the admission requirements at {uni}?',
+    'How much are the fees for {program} at {uni}?',
+    'What is the cut-off point for {program} at {short}?',
+    'Tell me about {program} at {short}',
+    'Which universities offer {program}?',
+    'What scholarships are available at {uni}?',
+    'When is the application deadline for {short}?',
+    'How do I contact the admissions office at {uni}?',
+    'Compare {program} at UG and KNUST',
+    'What are the career prospects for {program} graduates?',
+    'cheapest university for {program} in {town}',
+    'Is there hostel accommodation at {uni}?',
+]
+GENERIC_QUERIES = [
+    'How do I apply to university in Ghana?',
+    'What is a WASSCE aggregate?',
+    'How much does university cost per year?',
+    'Which programs can I study with science subjects?',
+    'What documents do I need for my application?',
+    'Can I study computer science without elective maths?',
+]
+
+
+def synthetic_knowledge(universities: int, programs: int, seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    """Knowledge base shaped like CURATED_UNIVERSITIES_KNOWLEDGE with `universities` entries.
+
+    The five real universities come first so name variations (UG, KNUST...) still resolve.
+    """
+    rng = random.Random(seed)
+    year = datetime.now().year
+    names = list(REAL_UNIVERSITIES[:universities])
+    candidates = [kind.format(town=town) for kind in KINDS for town in TOWNS]
+    for i in range(universities - len(names)):
+        base = candidates[i % len(candidates)]
+        names.append(base if i < len(candidates) else f"{base} Campus {i // len(candidates) + 1}")
+
+    knowledge = {}
+    for name in names:
+        town = rng.choice(TOWNS)
+        domain = ''.join(word[0] for word in name.replace(',', '').split()).lower() + '.edu.gh'
+        offered = rng.sample(PROGRAM_CATALOGUE, min(programs, len(PROGRAM_CATALOGUE)))
+        while len(offered) < programs:
+            offered.append(f"{rng.choice(PROGRAM_CATALOGUE)} (Option {len(offered)})")
+        knowledge[name] = {
+            'location': f"{town}, Ghana",
+            'established': str(rng.randint(1948, 2020)),
+            'motto': f"Knowledge for {rng.choice(['Service', 'Development', 'Excellence', 'Progress'])}",
+            'programs': {
+                program: {
+                    'duration': f"{rng.choice([3, 4, 4, 6])} years",
+                    'requirements': f"WASSCE: Credits in English, Math and {rng.choice(['Physics', 'Biology', 'Economics', 'Literature'])} (Aggregate {rng.randint(6, 24)})",
+                    'fees_2024': f"GHS {rng.randint(3, 18)},{rng.randint(0, 9)}00 per year",
+                    'career_prospects': ', '.join(rng.sample(['Engineer', 'Analyst', 'Teacher', 'Researcher', 'Consultant', 'Manager', 'Doctor', 'Developer'], 3)),
+                }
+                for program in offered
+            },
+            'admission_requirements': {
+                'general': 'WASSCE with minimum of 6 credits (A1-C6) including English and Mathematics',
+                'application_deadline': f"{rng.choice(['March', 'April', 'May', 'June'])} {rng.randint(1, 28)}, {year + 1}",
+                'application_fee': f"GHS {rng.choice([150, 200, 250, 300])}",
+                'online_portal': f"https://admissions.{domain}",
+            },
+            'contact': {'phone': f"+233-{rng.randint(20, 39)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+                        'email': f"admissions@{domain}", 'address': f"P.O. Box {rng.randint(1, 999)}, {town}"},
+            'website': f"www.{domain}",
+            f"current_fees_{year}": {
+                'ghanaian_students': f"GHS {rng.randint(2, 8)},000 - {rng.randint(9, 20)},000 per year",
+                'international_students': f"USD {rng.randint(2, 4)},000 - {rng.randint(5, 8)},000 per year",
+                'residential_fees': f"GHS {rng.randint(1, 3)},500 - {rng.randint(4, 6)},000 per year",
+            },
+            'scholarships': {f"scheme_{i}": f"{rng.choice(['Merit', 'Need-based', 'Sports', 'Regional'])} support" for i in range(4)},
+            'cut_off_points': {f"{year - 1}/{year}": {program: rng.randint(6, 30) for program in offered[:8]}},
+        }
+    return knowledge
+
+
+def query_corpus(knowledge: Dict[str, Any], size: int = 48, seed: int = 7) -> List[str]:
+    """Realistic mix of university-specific, program-specific and generic questions"""
+    rng = random.Random(seed)
+    shorts = ['UG', 'KNUST', 'UCC', 'UDS', 'UPSA', 'Legon', 'Kumasi']
+    names = list(knowledge)
+    queries = list(GENERIC_QUERIES)
+    while len(queries) < size:
+        uni = rng.choice(names)
+        program = rng.choice(list(knowledge[uni]['programs']))
+        queries.append(rng.choice(QUERY_TEMPLATES).format(
+            uni=uni, short=rng.choice(shorts), program=program, town=rng.choice(TOWNS)))
+    return queries
+
+
+def install_knowledge(main, knowledge: Dict[str, Any]) -> Dict[str, float]:
+    """Publish the knowledge base and build both indexes; returns build times in ms"""
+    started = time.perf_counter()
+    index = main.build_knowledge_index(knowledge)
+    vector_ms = (time.perf_counter() - started) * 1000
+    main.swap_knowledge(knowledge, [], index, set(knowledge))
+    started = time.perf_counter()
+    main.get_keyword_index()
+    keyword_ms = (time.perf_counter() - started) * 1000
+    return {'chunks': len(index.chunks) if index else 0, 'vector_index_ms': round(vector_ms, 1), 'keyword_index_ms': round(keyword_ms, 1)}
+
+
+def measure(calls: List[Callable[[], Any]], warmup: int, samples: int) -> Dict[str, Any]:
+    """pyperf-style: warm up, then time `samples` passes over all calls; per-call statistics in microseconds"""
+    errors = 0
+    for _ in range(warmup):
+        for call in calls:
+            try:
+                call()
+            except Exception:
+                errors += 1
+    per_call = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            for call in calls:
+                started = time.perf_counter_ns()
+                try:
+                    call()
+                except Exception:
+                    errors += 1
+                per_call.append((time.perf_counter_ns() - started) / 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for call in calls:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            try:
+                call()
+            except Exception:
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    per_call.sort()
+    return {
+        'calls': len(per_call),
+        'errors': errors // max(warmup + samples, 1),
+        'mean_us': round(statistics.fmean(per_call), 1),
+        'median_us': round(statistics.median(per_call), 1),
+        'p95_us': round(per_call[int(len(per_call) * 0.95) - 1], 1),
+        'min_us': round(per_call[0], 1),
+        'stdev_us': round(statistics.pstdev(per_call), 1),
+        'peak_alloc_kb_mean': round(statistics.fmean(peaks) / 1024, 1),
+        'peak_alloc_kb_max': round(max(peaks) / 1024, 1),
+    }
+
+
+def bench_size(main, universities: int, programs: int, args) -> Dict[str, Any]:
+    knowledge = synthetic_knowledge(universities, programs)
+    build = install_knowledge(main, knowledge)
+    queries = query_corpus(knowledge, args.queries)
+    vectors = [main.embed_query(q) for q in queries] if not args.include_embedding else [None] * len(queries)
+
+    search_calls = [lambda q=q, v=v: main.search_local_knowledge(q, query_vector=v) for q, v in zip(queries, vectors)]
+
+    # The fallback is given what retrieval found for the same query, as in /respond
+    fallback_calls = []
+    for query, vector in zip(queries, vectors):
+        local = main.search_local_knowledge(query, query_vector=vector)
+        sources = [{'source': r['source'], 'type': 'local_knowledge', 'confidence': r['relevance']} for r in local['results']]
+        context = main.context_text([block for r in local["results"] for block in main.knowledge_context_blocks(r)])
+        fallback_calls.append(lambda q=query, c=context, s=sources: main.generate_smart_fallback_response(q, c, s))
+
+    return {
+        'universities': universities,
+        'programs_per_university': programs,
+        **build,
+        'search_local_knowledge': measure(search_calls, args.warmup, args.samples),
+        'generate_smart_fallback_response': measure(fallback_calls, args.warmup, args.samples),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR, capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+
+def load_previous(path: Path, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Most recent recorded run with the same corpus and sizes"""
+    if not path.exists():
+        return {}
+    previous = {}
+    for line in path.read_text(encoding='utf-8').splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            if entry.get('config') == config:
+                previous = entry
+    return previous
+
+
+def print_results(results: List[Dict[str, Any]], previous: Dict[str, Any]):
+    old = {(r['universities'], fn): r[fn] for r in previous.get('results', []) for fn in ('search_local_knowledge', 'generate_smart_fallback_response')}
+    print(f"\n{'function':<34}{'unis':>6}{'chunks':>8}{'mean us':>11}{'median us':>11}{'p95 us':>10}{'peak KB':>10}{'vs last':>9}")
+    for row in results:
+        for fn in ('search_local_knowledge', 'generate_smart_fallback_response'):
+            stats = row[fn]
+            base = old.get((row['universities'], fn))
+            change = f"{(stats['median_us'] - base['median_us']) / base['median_us']:+.0%}" if base and base['median_us'] else ''
+            errors = f"  ({stats['errors']} failing queries)" if stats['errors'] else ''
+            print(f"{fn:<34}{row['universities']:>6}{row['chunks']:>8}{stats['mean_us']:>11.1f}{stats['median_us']:>11.1f}"
+                  f"{stats['p95_us']:>10.1f}{stats['peak_alloc_kb_mean']:>10.1f}{change:>9}{errors}")
+    print(f"\n{'index build':<34}{'unis':>6}{'chunks':>8}{'vector ms':>11}{'keyword ms':>11}")
+    for row in results:
+        print(f"{'':<34}{row['universities']:>6}{row['chunks']:>8}{row['vector_index_ms']:>11.1f}{row['keyword_index_ms']:>11.1f}")
+    if previous:
+        print(f"\n'vs last' compares median latency with the run recorded at {previous['recorded_at']} (rev {previous.get('git_revision') or '?'})")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,1000', help='Comma-separated university counts')
+    parser.add_argument('--programs', type=int, default=36, help='Programs per synthetic university')
+    parser.add_argument('--queries', type=int, default=48, help='Queries in the corpus')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed passes over the corpus')
+    parser.add_argument('--samples', type=int, default=5, help='Timed passes over the corpus')
+    parser.add_argument('--include-embedding', action='store_true', help='Embed queries inside search_local_knowledge (as when CAG is off)')
+    parser.add_argument('--real-embeddings', action='store_true', help='Load all-MiniLM-L6-v2 instead of the hashing encoder')
+    parser.add_argument('--record', action='store_true', help=f'Append this run to {HISTORY_PATH.relative_to(SERVICE_DIR)}')
+    args = parser.parse_args()
+
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        from stand_ins import HashingEncoder
+        if args.real_embeddings:
+            from sentence_transformers import SentenceTransformer
+            main.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        else:
+            main.embedding_model = HashingEncoder()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    results = []
+    for universities in sizes:
+        print(f"⏱️ {universities} universities x {args.programs} programs...", flush=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(bench_size(main, universities, args.programs, args))
+
+    config = {'sizes': sizes, 'programs': args.programs, 'queries': args.queries,
+              'include_embedding': args.include_embedding, 'real_embeddings': args.real_embeddings}
+    print_results(results, load_previous(HISTORY_PATH, config))
+
+    if args.record:
+        entry = {
+            'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': config,
+            'results': results,
+        }
+        HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with HISTORY_PATH.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        print(f"💾 Recorded in {HISTORY_PATH}")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,504 @@
+"""
+LOAD TEST AND LATENCY BENCHMARK
+
+Drives /respond, /respond/stream, /respond-with-files and /eligibility with a weighted
+query mix at a fixed concurrency and reports throughput, client-side p50/p95/p99 per
+scenario and endpoint, and the server's per-stage breakdown (diffed from /metrics).
+
+Groq, DuckDuckGo/SerpAPI, MongoDB and the embedding model are replaced by the local
+stand-ins in benchmarks/stand_ins.py (tunable latency), so results reflect our own code.
+By default the answer, web search and extraction caches are off so every request runs
+the full pipeline; pass --warm-caches to measure cache-friendly traffic instead.
+
+Modes:
+    inprocess  ASGI transport, no sockets (default)
+    http       uvicorn on a local port in a background thread, driven over HTTP
+    --url URL  an already running service (real dependencies, stand-ins not installed)
+
+Results are compared against benchmarks/baselines/load_test.json; --save-baseline
+overwrites it. Latency regressions beyond --tolerance are flagged (exit code 1 with
+--fail-on-regression). Extraction timings depend heavily on the CPU, so record the
+baseline on the machine that runs the comparison.
+
+The files_png scenario OCRs an image and needs the tesseract binary, so it is left out of
+the default mix; add it with --mix ...,files_png=6 where tesseract is installed. Without
+tesseract every PNG request measures the extraction error path.
+
+Usage:
+    python benchmarks/load_test.py [--mode inprocess|http] [--url URL] [--concurrency N]
+        [--requests N] [--mix respond=40,stream=10,...] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+SERVICE_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(SERVICE_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from upload_fixtures import ensure_fixtures  # noqa: E402
+
+DEFAULT_BASELINE = BENCH_DIR / 'baselines' / 'load_test.json'
+DEFAULT_MIX = 'respond=35,general=15,stream=10,eligibility=10,files_pdf=12,files_docx=12'
+OCR_SCENARIOS = ('files_png',)  # Need the tesseract binary (see module docstring)
+
+UNIVERSITIES = ['University of Ghana', 'KNUST', 'UCC', 'UDS', 'UPSA']
+TOPICS = ['admission requirements', 'tuition fees', 'application deadline', 'programs offered',
+          'scholarships', 'contact details', 'cut-off points', 'hostel accommodation']
+GENERAL_QUESTIONS = [
+    'How do I prepare for university interviews',
+    'What documents does a student visa application need',
+    'How can I get a student loan for tertiary education',
+    'Is distance learning recognised by employers',
+    'What is the difference between a diploma and a degree',
+    'How do I transfer credits from a polytechnic',
+]
+PROGRAMS = ['Medicine', 'Engineering', 'Law', 'Business Administration', 'Computing', 'Nursing']
+
+
+def build_scenarios(fixtures: Dict[str, Tuple[Path, str]]) -> Dict[str, Dict[str, Any]]:
+    """Scenario name -> endpoint and request builder (rng, sequence number) -> httpx request kwargs"""
+    uploads = {name: (path.name, path.read_bytes(), content_type) for name, (path, content_type) in fixtures.items()}
+
+    def chat(message: str, n: int) -> Dict[str, Any]:
+        return {'json': {'message': message, 'conversation_id': f'bench-{n % 50}', 'user_id': f'bench-user-{n % 10}'}}
+
+    def with_file(filename: str):
+        def build(rng: random.Random, n: int) -> Dict[str, Any]:
+            return {
+                'data': {'message': f'Which universities fit my results? (request {n})',
+                         'conversation_id': f'bench-{n % 50}', 'user_id': f'bench-user-{n % 10}'},
+                'files': {'files': uploads[filename]},
+            }
+        return build
+
+    return {
+        'respond': {'method': 'POST', 'endpoint': '/respond', 'build': lambda rng, n: chat(
+            f'What are the {rng.choice(TOPICS)} at {rng.choice(UNIVERSITIES)}? ({n})', n)},
+        'general': {'method': 'POST', 'endpoint': '/respond', 'build': lambda rng, n: chat(
+            f'{rng.choice(GENERAL_QUESTIONS)}? ({n})', n)},
+        'stream': {'method': 'POST', 'endpoint': '/respond/stream', 'build': lambda rng, n: chat(
+            f'Tell me about {rng.choice(TOPICS)} at {rng.choice(UNIVERSITIES)} ({n})', n)},
+        'eligibility': {'method': 'POST', 'endpoint': '/respond', 'build': lambda rng, n: chat(
+            f'I have aggregate {rng.randint(6, 30)}, which programmes can I study at {rng.choice(UNIVERSITIES)}?', n)},
+        'eligibility_api': {'method': 'GET', 'endpoint': '/eligibility', 'build': lambda rng, n: {
+            'params': {'aggregate': rng.randint(6, 36), 'program': rng.choice(PROGRAMS)}}},
+        'files_pdf': {'method': 'POST', 'endpoint': '/respond-with-files', 'build': with_file('wassce_transcript.pdf')},
+        'files_png': {'method': 'POST', 'endpoint': '/respond-with-files', 'build': with_file('results_slip.png')},
+        'files_docx': {'method': 'POST', 'endpoint': '/respond-with-files', 'build': with_file('personal_statement.docx')},
+    }
+
+
+def parse_mix(spec: str, scenarios: Dict[str, Any]) -> List[Tuple[str, float]]:
+    mix = []
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in scenarios:
+            raise SystemExit(f"Unknown scenario '{name}' (choose from {', '.join(scenarios)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+# Server-side stage breakdown from /metrics
+
+METRIC_LINE = re.compile(r'^(\w+?)(_bucket|_sum|_count)?(?:\{(.*)\})? (\S+)$')
+LABEL_PAIR = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+STAGE_HISTOGRAMS = {
+    'glinax_stage_duration_seconds': ('stage',),
+    'glinax_file_extraction_duration_seconds': ('file_type', 'source'),
+}
+COUNTERS = ('glinax_retrieval_path_total', 'glinax_errors_total', 'glinax_groq_requests_total')
+
+
+def parse_metrics(text: str) -> Dict[str, Dict[str, Any]]:
+    """{series name: {"buckets": {le: count}, "sum", "count"}} for stage histograms, {name: value} for counters"""
+    parsed: Dict[str, Dict[str, Any]] = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, suffix, labels, value = match.groups()
+        labels = dict(LABEL_PAIR.findall(labels or ''))
+        if name in STAGE_HISTOGRAMS and suffix:
+            series = parsed.setdefault('/'.join([name.split('_')[1]] + [labels.get(k, '') for k in STAGE_HISTOGRAMS[name]]),
+                                       {'buckets': {}, 'sum': 0.0, 'count': 0})
+            if suffix == '_bucket':
+                series['buckets'][float(labels['le'])] = float(value)
+            else:
+                series[suffix[1:]] = float(value)
+        elif name in COUNTERS and not suffix:
+            key = name.replace('glinax_', '').replace('_total', '') + ':' + ','.join(labels.values())
+            parsed[key] = {'value': float(value)}
+    return parsed
+
+
+def bucket_quantile(buckets: Dict[float, float], count: float, q: float) -> Optional[float]:
+    """Prometheus-style histogram_quantile with linear interpolation inside the bucket"""
+    if count <= 0:
+        return None
+    rank, previous_bound, previous_count = q * count, 0.0, 0.0
+    for bound in sorted(buckets):
+        if buckets[bound] >= rank:
+            if bound == float('inf'):
+                return previous_bound
+            width = buckets[bound] - previous_count
+            return previous_bound + (bound - previous_bound) * ((rank - previous_count) / width if width else 1)
+        previous_bound, previous_count = bound, buckets[bound]
+    return previous_bound
+
+
+def diff_metrics(before: Dict[str, Any], after: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    stages, counters = {}, {}
+    for key, series in after.items():
+        old = before.get(key, {})
+        if 'value' in series:
+            delta = series['value'] - old.get('value', 0.0)
+            if delta:
+                counters[key] = delta
+            continue
+        count = series['count'] - old.get('count', 0)
+        if count <= 0:
+            continue
+        buckets = {le: c - old.get('buckets', {}).get(le, 0.0) for le, c in series['buckets'].items()}
+        stages[key] = {
+            'count': int(count),
+            'mean_ms': round((series['sum'] - old.get('sum', 0.0)) / count * 1000, 3),
+            'p95_ms': round(bucket_quantile(buckets, count, 0.95) * 1000, 3),
+        }
+    return stages, counters
+
+
+# Load generation
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    if not latencies:
+        return {'count': 0, 'errors': errors}
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, scenarios: Dict[str, Any], mix: List[Tuple[str, float]],
+                   total: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` workers issue `total` requests drawn from the mix"""
+    rng = random.Random(seed)
+    names, weights = zip(*mix)
+    plan = rng.choices(names, weights=weights, k=total)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    error_samples: List[str] = []
+    next_index = 0
+
+    async def worker(worker_id: int):
+        nonlocal next_index
+        worker_rng = random.Random(seed * 1000 + worker_id)
+        while next_index < total:
+            n = next_index
+            next_index += 1
+            scenario = scenarios[plan[n]]
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario['method'], scenario['endpoint'], **scenario['build'](worker_rng, n))
+                ok = response.status_code == 200
+                if not ok and len(error_samples) < 5:
+                    error_samples.append(f"{plan[n]}: HTTP {response.status_code} {response.text[:120]}")
+            except Exception as e:
+                ok = False
+                if len(error_samples) < 5:
+                    error_samples.append(f"{plan[n]}: {type(e).__name__} {e}")
+            if ok:
+                latencies[plan[n]].append(time.perf_counter() - started)
+            else:
+                errors[plan[n]] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    by_endpoint_latencies: Dict[str, List[float]] = defaultdict(list)
+    by_endpoint_errors: Dict[str, int] = defaultdict(int)
+    for name in set(plan):
+        endpoint = scenarios[name]['endpoint']
+        by_endpoint_latencies[endpoint] += latencies[name]
+        by_endpoint_errors[endpoint] += errors[name]
+
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'total': summarize([l for ls in latencies.values() for l in ls], sum(errors.values()), elapsed),
+        'scenarios': {name: summarize(latencies[name], errors[name], elapsed) for name in sorted(set(plan))},
+        'endpoints': {ep: summarize(by_endpoint_latencies[ep], by_endpoint_errors[ep], elapsed) for ep in sorted(by_endpoint_latencies)},
+        'error_samples': error_samples,
+    }
+
+
+async def drive(client: httpx.AsyncClient, args, scenarios, mix) -> Dict[str, Any]:
+    if args.warmup:
+        await run_load(client, scenarios, mix, args.warmup, min(args.concurrency, args.warmup), args.seed + 1)
+    before = parse_metrics((await client.get('/metrics')).text)
+    result = await run_load(client, scenarios, mix, args.requests, args.concurrency, args.seed)
+    after = parse_metrics((await client.get('/metrics')).text)
+    result['stages'], result['counters'] = diff_metrics(before, after)
+    return result
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def client_limits(concurrency: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+
+async def prewarm_extraction(main, fixtures: Dict[str, Tuple[Path, str]]):
+    """Start every extraction worker and import its parsers, so process spawn is not measured"""
+    loop = asyncio.get_running_loop()
+    pool = main.get_extraction_pool()
+    for path, content_type in fixtures.values():
+        await asyncio.gather(*(
+            loop.run_in_executor(pool, main.extract_file_content, path.name, content_type, None, str(path))
+            for _ in range(main.EXTRACTION_WORKERS)
+        ))
+
+
+async def run_inprocess(args, scenarios, mix) -> Dict[str, Any]:
+    import main
+    import stand_ins
+    await stand_ins.install(main, **stand_in_options(args))
+    await prewarm_extraction(main, ensure_fixtures())
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+            return await drive(client, args, scenarios, mix)
+    finally:
+        await main.rag_log_writer.stop()
+        if main.extraction_pool is not None:
+            main.extraction_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_http(args, scenarios, mix) -> Dict[str, Any]:
+    """Serve the app with stand-ins from a background thread (own event loop), load it over HTTP"""
+    import uvicorn
+    import main
+    import stand_ins
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port, lifespan='off', log_level='warning'))
+    ready = threading.Event()
+
+    def serve():
+        async def setup_and_serve():
+            await stand_ins.install(main, **stand_in_options(args))
+            await prewarm_extraction(main, ensure_fixtures())
+            ready.set()
+            await server.serve()
+            await main.rag_log_writer.stop()
+        asyncio.run(setup_and_serve())
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def load():
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=120, limits=client_limits(args.concurrency)) as client:
+            return await drive(client, args, scenarios, mix)
+    try:
+        return asyncio.run(load())
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        if main.extraction_pool is not None:
+            main.extraction_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_remote(args, scenarios, mix) -> Dict[str, Any]:
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=client_limits(args.concurrency)) as client:
+        return await drive(client, args, scenarios, mix)
+
+
+def stand_in_options(args) -> Dict[str, Any]:
+    return {
+        'groq_latency_ms': args.groq_ms,
+        'web_latency_ms': args.web_ms,
+        'mongo_latency_ms': args.mongo_ms,
+        'embed_latency_ms': args.embed_ms,
+        'warm_caches': args.warm_caches,
+        'real_embeddings': args.real_embeddings,
+    }
+
+
+# Reporting and baselines
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR, capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def print_report(result: Dict[str, Any]):
+    header = f"{'':<22}{'count':>7}{'err':>5}{'rps':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    for title in ('scenarios', 'endpoints'):
+        print(f"\n{title.upper()}\n{header}")
+        for name, row in list(result[title].items()) + ([('total', result['total'])] if title == 'endpoints' else []):
+            if not row.get('count'):
+                print(f"{name:<22}{0:>7}{row['errors']:>5}")
+                continue
+            print(f"{name:<22}{row['count']:>7}{row['errors']:>5}{row['rps']:>8.1f}{row['mean_ms']:>10.1f}"
+                  f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+    print(f"\nSERVER STAGES (from /metrics)\n{'':<36}{'count':>7}{'mean ms':>10}{'~p95 ms':>10}")
+    for name, row in sorted(result['stages'].items()):
+        print(f"{name:<36}{row['count']:>7}{row['mean_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+    if result['counters']:
+        print("\nCOUNTERS")
+        for name, value in sorted(result['counters'].items()):
+            print(f"  {name:<44}{value:>8.0f}")
+    for sample in result['error_samples']:
+        print(f"  ⚠️ {sample}")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, noise_ms: float) -> List[str]:
+    """Print deltas against the baseline; returns descriptions of regressions beyond tolerance"""
+    regressions = []
+    rows = []
+    for section, fields in (('scenarios', ('p50_ms', 'p95_ms')), ('endpoints', ('p50_ms', 'p95_ms')), ('stages', ('mean_ms',))):
+        for name, row in result.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base:
+                continue
+            for field in fields:
+                old, new = base.get(field), row.get(field)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old if old else 0.0
+                regressed = change > tolerance and new - old > noise_ms
+                rows.append((f"{section}/{name}", field, old, new, change, regressed))
+                if regressed:
+                    regressions.append(f"{section}/{name} {field}: {old:.2f} -> {new:.2f} ms ({change:+.0%})")
+    base_rps, rps = baseline.get('total', {}).get('rps'), result['total'].get('rps')
+    if base_rps and rps:
+        change = (rps - base_rps) / base_rps
+        rows.append(('total', 'rps', base_rps, rps, change, change < -tolerance))
+        if change < -tolerance:
+            regressions.append(f"total rps: {base_rps:.1f} -> {rps:.1f} ({change:+.0%})")
+
+    print(f"\nVS BASELINE ({baseline.get('meta', {}).get('recorded_at', '?')}, rev {baseline.get('meta', {}).get('git_revision')})")
+    print(f"{'':<44}{'field':>9}{'baseline':>11}{'now':>11}{'change':>9}")
+    for name, field, old, new, change, regressed in rows:
+        print(f"{name:<44}{field:>9}{old:>11.2f}{new:>11.2f}{change:>+9.0%}{'  ⚠️' if regressed else ''}")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=('inprocess', 'http'), default='inprocess')
+    parser.add_argument('--url', help='Benchmark a running service instead (no stand-ins)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Weighted scenarios (default: {DEFAULT_MIX})')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--groq-ms', type=float, default=400.0, help='Stand-in Groq completion latency')
+    parser.add_argument('--web-ms', type=float, default=300.0, help='Stand-in DuckDuckGo latency (SerpAPI 1.2x)')
+    parser.add_argument('--mongo-ms', type=float, default=2.0, help='Stand-in MongoDB round trip')
+    parser.add_argument('--embed-ms', type=float, default=0.0, help='Blocking time per stand-in encode() call')
+    parser.add_argument('--real-embeddings', action='store_true', help='Load all-MiniLM-L6-v2 instead of the hashing encoder')
+    parser.add_argument('--warm-caches', action='store_true', help='Keep answer, web search and extraction caches on')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+    parser.add_argument('--output', type=Path, help='Also write this run\'s results as JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Relative latency increase counted as a regression')
+    parser.add_argument('--noise-ms', type=float, default=1.0, help='Ignore regressions smaller than this (absolute)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='Show the service\'s own request logging')
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(ensure_fixtures())
+    mix = parse_mix(args.mix, scenarios)
+    ocr_available = shutil.which('tesseract') is not None
+    if not ocr_available and any(name in OCR_SCENARIOS for name, _ in mix):
+        print("⚠️ tesseract is not installed: image uploads will fail extraction and measure the error path")
+    mode = 'remote' if args.url else args.mode
+
+    print(f"🚀 {args.requests} requests at concurrency {args.concurrency} ({mode})...")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        if mode == 'remote':
+            result = asyncio.run(run_remote(args, scenarios, mix))
+        elif mode == 'http':
+            result = run_http(args, scenarios, mix)
+        else:
+            result = asyncio.run(run_inprocess(args, scenarios, mix))
+
+    result['meta'] = {
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'mode': mode,
+        'ocr_available': ocr_available,
+        'config': {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()
+                   if key not in ('baseline', 'save_baseline', 'output', 'fail_on_regression')},
+    }
+    print_report(result)
+
+    regressions = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        recorded = baseline.get('meta', {}).get('config', {})
+        if baseline.get('meta', {}).get('mode') != mode or any(recorded.get(k) != getattr(args, k) for k in ('mix', 'requests', 'concurrency', 'warm_caches')):
+            print("\nℹ️ Baseline was recorded with a different mode, mix, request count, concurrency or cache setting; deltas are indicative only")
+        regressions = compare(result, baseline, args.tolerance, args.noise_ms)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2) + '\n', encoding='utf-8')
+        print(f"\n💾 Baseline written to {args.baseline}")
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + '\n', encoding='utf-8')
+
+    if regressions:
+        print("\n⚠️ Regressions:\n  " + "\n  ".join(regressions))
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,200 @@
+"""
+LOCAL STAND-INS FOR BENCHMARKS
+
+In-process replacements for the service's external dependencies, each with tunable
+latency, so load tests measure our own code paths rather than Groq, DuckDuckGo,
+SerpAPI or MongoDB:
+
+- HashingEncoder: deterministic bag-of-words embeddings (same shape as all-MiniLM-L6-v2)
+- FakeAsyncGroq: chat completions, streamed or not
+- fake_web_search: DuckDuckGo / SerpAPI provider functions
+- FakeMotorClient: the motor calls the service makes (rag_logs, rollups, extraction cache)
+
+install() wires them into an imported main module.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import types
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class HashingEncoder:
+    """SentenceTransformer.encode stand-in: hashed word counts, L2-normalized.
+
+    latency_ms is spent per encode() call with time.sleep, i.e. blocking the caller
+    like the real model does.
+    """
+
+    def __init__(self, dimension: int = 384, latency_ms: float = 0.0):
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dimension] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors /= norms
+        return vectors
+
+
+def _completion(messages: List[Dict[str, str]]) -> Any:
+    question = messages[-1]["content"].split("Question:", 1)[-1].split("Available Information:")[0].strip()[:80]
+    content = f"Here is what I found about {question}. " + "Admission details follow. " * 20
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))])
+
+
+class _AsyncStream:
+    def __init__(self, tokens: List[str], token_latency: float):
+        self.tokens = tokens
+        self.token_latency = token_latency
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            await asyncio.sleep(self.token_latency)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=token))])
+
+
+class _AsyncCompletions:
+    def __init__(self, latency_ms: float, tokens: int):
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.calls = 0
+
+    async def create(self, messages, model=None, temperature=None, max_tokens=None, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            # Time to first token ~ a fifth of a full completion, the rest spread over tokens
+            await asyncio.sleep(self.latency_ms / 5000)
+            words = _completion(messages).choices[0].message.content.split(" ")
+            return _AsyncStream([w + " " for w in words[:self.tokens]], self.latency_ms * 0.8 / 1000 / max(self.tokens, 1))
+        await asyncio.sleep(self.latency_ms / 1000)
+        return _completion(messages)
+
+
+class FakeAsyncGroq:
+    """AsyncGroq stand-in: completions take latency_ms, streams emit `tokens` chunks"""
+
+    def __init__(self, latency_ms: float = 400.0, tokens: int = 60):
+        self.chat = types.SimpleNamespace(completions=_AsyncCompletions(latency_ms, tokens))
+
+
+def fake_web_search(latency_ms: float, source: str, confidence: float):
+    """Build an async provider with the signature of search_with_duckduckgo / search_with_serpapi"""
+    async def search(query: str, api_key: Optional[str] = None) -> Dict[str, Any]:
+        await asyncio.sleep(latency_ms / 1000)
+        slug = '-'.join(WORD_PATTERN.findall(query.lower())[:4]) or 'query'
+        results = [{
+            'title': f'{source} result {i} for {query[:40]}',
+            'url': f'https://{source}.example.edu.gh/{slug}/{i}',
+            'snippet': f'Admission information related to {query[:60]} (result {i}).',
+            'source': 'official_website' if i == 0 else 'web_search'
+        } for i in range(5)]
+        return {'results': results, 'confidence': confidence}
+    return search
+
+
+class _FakeCollection:
+    def __init__(self, client: "FakeMotorClient"):
+        self.client = client
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+
+    async def _io(self):
+        self.client.operations += 1
+        await asyncio.sleep(self.client.latency_ms / 1000)
+
+    async def insert_many(self, documents, ordered=True):
+        await self._io()
+        for document in documents:
+            self.documents[document.get("_id", len(self.documents))] = document
+        return types.SimpleNamespace(inserted_ids=[d.get("_id") for d in documents])
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._io()
+        return types.SimpleNamespace(upserted_count=0, modified_count=len(operations))
+
+    def find(self, *args, **kwargs):
+        async def cursor():
+            await self._io()
+            for document in list(self.documents.values()):
+                yield document
+        return cursor()
+
+    async def find_one(self, *args, **kwargs):
+        await self._io()
+        return None
+
+    async def find_one_and_update(self, query, update, projection=None, **kwargs):
+        await self._io()
+        return self.documents.get(query.get("_id")) if self.client.persist else None
+
+    async def replace_one(self, query, document, upsert=False):
+        await self._io()
+        if self.client.persist:
+            self.documents[query.get("_id")] = document
+        return types.SimpleNamespace(matched_count=0)
+
+
+class FakeMotorClient:
+    """AsyncIOMotorClient stand-in: client[db].collection with latency_ms per round trip.
+
+    With persist=False the extraction cache never finds a stored result, so every
+    upload is extracted (cold extraction benchmarks).
+    """
+
+    def __init__(self, latency_ms: float = 2.0, persist: bool = True):
+        self.latency_ms = latency_ms
+        self.persist = persist
+        self.operations = 0
+        self._collections: Dict[str, _FakeCollection] = {}
+
+    def __getitem__(self, db_name: str):
+        client = self
+
+        class _Database:
+            def __getattr__(self, name: str) -> _FakeCollection:
+                return client._collections.setdefault(name, _FakeCollection(client))
+        return _Database()
+
+
+async def install(main, groq_latency_ms: float = 400.0, web_latency_ms: float = 300.0, mongo_latency_ms: float = 2.0,
+                  embed_latency_ms: float = 0.0, stream_tokens: int = 60, warm_caches: bool = False,
+                  real_embeddings: bool = False):
+    """Replace main's external clients with stand-ins and load the knowledge base.
+
+    Must run on the event loop that will serve requests (the rag_logs writer task lives there).
+    With warm_caches=False the answer, web search and extraction caches are disabled so
+    every request exercises the full pipeline.
+    """
+    import os
+
+    if real_embeddings:
+        from sentence_transformers import SentenceTransformer
+        main.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    else:
+        main.embedding_model = HashingEncoder(latency_ms=embed_latency_ms)
+    main.groq_async_client = FakeAsyncGroq(groq_latency_ms, stream_tokens)
+    os.environ.setdefault('SERPAPI_KEY', 'benchmark')
+    main.search_with_duckduckgo = fake_web_search(web_latency_ms, 'duckduckgo', 0.75)
+    main.search_with_serpapi = fake_web_search(web_latency_ms * 1.2, 'serpapi', 0.8)
+    if not warm_caches:
+        main.CAG_ENABLED = False
+        main.WEB_SEARCH_CACHE_TTL_SECONDS = 0
+        main.extraction_cache = main.ExtractionCache(0)
+
+    # Knowledge comes from the curated base plus the scraper's JSON files (no hot reload while measuring)
+    await main.knowledge_store.reload("benchmark")
+    main.db_client = FakeMotorClient(mongo_latency_ms, persist=warm_caches)
+    main.rag_log_writer.start()
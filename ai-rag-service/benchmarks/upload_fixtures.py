@@ -0,0 +1,121 @@
+"""
+UPLOAD FIXTURES FOR BENCHMARKS
+
+Generates the documents the load test uploads to /respond-with-files: a multi-page
+text PDF (WASSCE results transcript), a PNG results slip and a DOCX personal statement.
+The generated files are committed so benchmark runs (and their baselines) always
+extract the same bytes; run this module to recreate them.
+
+Usage:
+    python benchmarks/upload_fixtures.py [--force]
+"""
+
+import argparse
+import random
+from datetime import datetime
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+FIXTURES = {
+    'wassce_transcript.pdf': 'application/pdf',
+    'results_slip.png': 'image/png',
+    'personal_statement.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+SUBJECTS = ['English Language', 'Core Mathematics', 'Integrated Science', 'Social Studies',
+            'Elective Mathematics', 'Physics', 'Chemistry', 'Biology', 'Economics', 'Geography']
+GRADES = ['A1', 'B2', 'B3', 'C4', 'C5', 'C6']
+
+
+def transcript_lines(seed: int = 7, pages: int = 6):
+    rng = random.Random(seed)
+    for page in range(pages):
+        lines = ['WEST AFRICAN EXAMINATIONS COUNCIL', f'WASSCE RESULTS TRANSCRIPT - PAGE {page + 1}',
+                 'Candidate: Ama Mensah    Index Number: 0123456789', '']
+        for subject in SUBJECTS:
+            lines.append(f'{subject:<28} {rng.choice(GRADES)}')
+        lines.append('')
+        lines += [f'Remark {i}: candidate intends to apply to KNUST, University of Ghana and UCC for 2025/2026.'
+                  for i in range(20)]
+        yield lines
+
+
+def build_pdf(pages) -> bytes:
+    """Minimal text PDF (Helvetica, one content stream per page) that pdfplumber can extract"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    page_ids = []
+    for lines in pages:
+        text = ['BT', '/F1 10 Tf', '12 TL', '50 800 Td']
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            text.append(f'({escaped}) Tj T*')
+        text.append('ET')
+        stream = '\n'.join(text).encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        content_id = len(objects)
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        page_ids.append(len(objects))
+    kids = ' '.join(f'{i} 0 R' for i in page_ids).encode()
+    objects[1] = b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(page_ids)
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_png(path: Path):
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (1240, 1754), 'white')
+    draw = ImageDraw.Draw(image)
+    y = 60
+    for lines in transcript_lines(pages=1):
+        for line in lines[:16]:
+            draw.text((60, y), line, fill='black')
+            y += 28
+    image.save(path, format='PNG')
+
+
+def build_docx(path: Path):
+    from docx import Document
+    document = Document()
+    document.add_heading('Personal Statement', level=1)
+    rng = random.Random(11)
+    for i in range(40):
+        document.add_paragraph(
+            f'Paragraph {i + 1}: I am applying for {rng.choice(["Computer Science", "Medicine", "Engineering", "Law"])} '
+            'because I want to contribute to development in Ghana. My WASSCE aggregate is 12 and I '
+            'have taken part in science clubs, community service and mentoring junior students.'
+        )
+    document.core_properties.created = datetime(2025, 1, 1)
+    document.save(path)
+
+
+def ensure_fixtures(force: bool = False) -> dict:
+    """Create any missing fixture file; returns {filename: (path, content_type)}"""
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    builders = {
+        'wassce_transcript.pdf': lambda p: p.write_bytes(build_pdf(transcript_lines())),
+        'results_slip.png': build_png,
+        'personal_statement.docx': build_docx,
+    }
+    for name, build in builders.items():
+        path = FIXTURES_DIR / name
+        if force or not path.exists():
+            build(path)
+    return {name: (FIXTURES_DIR / name, content_type) for name, content_type in FIXTURES.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--force', action='store_true', help='Regenerate files that already exist')
+    for name, (path, _) in ensure_fixtures(parser.parse_args().force).items():
+        print(f"{name:<28}{path.stat().st_size / 1024:>8.1f} KB")
@@ -0,0 +1,169 @@
+"""
+GLINAX FILE EXTRACTION WORKERS
+Text extraction for uploaded documents (PDF, images, DOCX, plain text).
+
+These functions run inside the extraction process pool, so this module must stay
+light: parsers (pdfplumber, Pillow, pytesseract, python-docx) are imported lazily
+and nothing from main.py is imported here.
+"""
+
+import io
+import os
+from typing import Any, Dict, Optional
+
+# Content types whose extraction is CPU-bound and belongs in a worker process
+CPU_BOUND_TYPES = {
+    'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+# Cap overall extracted text to ~15k chars to protect downstream model
+MAX_EXTRACTED_CHARS = 15000
+PREVIEW_CHARS = 4000
+
+def is_cpu_bound(content_type: str) -> bool:
+    """True for uploads that should be extracted in the process pool"""
+    return content_type in CPU_BOUND_TYPES or (content_type or '').startswith('image/')
+
+def limit_worker_memory(limit_mb: int):
+    """Process pool initializer: cap the worker's address space (Linux/macOS only)"""
+    if not limit_mb:
+        return
+    try:
+        import resource
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception as e:
+        print(f"⚠️ Could not apply worker memory limit: {e}")
+
+def extract_file_content(filename: str, content_type: str, content: Optional[bytes] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    """Extract text from one upload, given either its bytes (small files) or a spooled file path.
+
+    Parsers open the path directly, so large uploads are never copied into memory here.
+    Returns {"summary": <labelled preview for the prompt>, "text": <full extracted text or "">,
+    "ok": <False when extraction failed, so the result must not be cached>}.
+    """
+    content_type = content_type or ''
+    # pdfplumber, Pillow and python-docx all accept a path or a file-like object
+    source = path if path is not None else io.BytesIO(content or b'')
+
+    if content_type == 'text/plain':
+        try:
+            if path is not None:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            text_content = content.decode('utf-8', errors='ignore')
+            preview = text_content.strip()[:PREVIEW_CHARS]
+            return {"summary": f"📄 TEXT: {filename}\n{preview}", "text": text_content.strip(), "ok": True}
+        except Exception as e:
+            return {"summary": f"📄 TEXT extraction failed for {filename}: {e}", "text": "", "ok": False}
+
+    # For PDFs - Enhanced analysis for university documents
+    if content_type == 'application/pdf':
+        try:
+            # Extract selectable text from PDF using pdfplumber for robust header/top text capture
+            import pdfplumber
+
+            extracted_pages = []
+            extracted_chars = 0
+            with pdfplumber.open(source) as pdf:
+                for page in pdf.pages:
+                    try:
+                        page_text = page.extract_text() or ""
+                    except Exception:
+                        page_text = ""
+                    if page_text:
+                        extracted_pages.append(page_text)
+                        extracted_chars += len(page_text)
+                    if extracted_chars > MAX_EXTRACTED_CHARS:
+                        break
+
+            # Join with double newlines to preserve section breaks
+            extracted_text = "\n\n".join(extracted_pages).strip()
+            if not extracted_text:
+                extracted_text = "[No selectable text extracted from PDF. This may be a scanned document or image-based PDF.]"
+
+            # Proof-of-life debugging to verify University name capture
+            print(f"DEBUG: Extracted {len(extracted_text)} chars. Start: {extracted_text[:200]}")
+
+            preview = extracted_text[:PREVIEW_CHARS]
+            return {"summary": f"📋 PDF: {filename}\n{preview}", "text": extracted_text, "ok": True}
+        except Exception as e:
+            return {"summary": f"📋 PDF extraction failed for {filename}: {e}", "text": "", "ok": False}
+
+    # For images - OCR via pytesseract on Pillow image
+    if content_type.startswith('image/'):
+        try:
+            from PIL import Image
+            try:
+                import pytesseract
+            except Exception:
+                pytesseract = None
+            image = Image.open(source)
+            ocr_ok = False
+            if pytesseract:
+                try:
+                    ocr_text = pytesseract.image_to_string(image) or ''
+                    ocr_ok = True
+                except Exception as ocr_err:
+                    ocr_text = f"[OCR failed: {ocr_err}]"
+            else:
+                ocr_text = "[OCR engine not available on server. Install pytesseract to enable OCR.]"
+            preview = ocr_text.strip()[:PREVIEW_CHARS]
+            return {
+                "summary": f"🖼️ IMAGE: {filename}\n{preview if preview else '[No text detected]'}",
+                "text": ocr_text.strip(),
+                "ok": ocr_ok
+            }
+        except Exception as e:
+            return {"summary": f"🖼️ Image processing failed for {filename}: {e}", "text": "", "ok": False}
+
+    # For Word documents - Extract text from DOCX using python-docx. For legacy .doc we return a hint.
+    if content_type in ('application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'):
+        try:
+            if content_type == 'application/msword' and not filename.lower().endswith('.docx'):
+                return {"summary": f"📝 {filename}: Legacy .doc files are not supported. Please convert to .docx and try again.", "text": "", "ok": True}
+            from docx import Document
+            doc = Document(source)
+            paragraphs = []
+            extracted_chars = 0
+            for p in doc.paragraphs:
+                txt = p.text.strip()
+                if txt:
+                    paragraphs.append(txt)
+                    extracted_chars += len(txt)
+                if extracted_chars > MAX_EXTRACTED_CHARS:
+                    break
+            text = "\n".join(paragraphs)
+            preview = text[:PREVIEW_CHARS] if text else ""
+            return {"summary": f"📝 DOCX: {filename}\n{preview if preview else '[No text extracted]'}", "text": text, "ok": True}
+        except Exception as e:
+            return {"summary": f"📝 DOCX extraction failed for {filename}: {e}", "text": "", "ok": False}
+
+    file_size_kb = (os.path.getsize(path) if path is not None else len(content or b'')) / 1024
+
+    # For Excel/CSV files - Enhanced data analysis
+    if content_type in ('text/csv', 'application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'):
+        return {"summary": f"""📊 **SPREADSHEET ANALYSIS**
+**File:** {filename}
+**Size:** {file_size_kb:.1f}KB
+
+**Data Analysis Capabilities:**
+• **Grade Calculations:** CGPA/GPA analysis and university program matching
+• **University Comparisons:** Cost analysis, program comparisons, ranking data
+• **Academic Planning:** Course planning and credit calculations
+• **Financial Planning:** University cost analysis and scholarship planning
+• **Application Tracking:** University application status and deadline management
+
+I can interpret your data and provide personalized university recommendations based on the spreadsheet content.""", "text": "", "ok": True}
+
+    # For other documents - Professional handling
+    return {"summary": f"""📎 **DOCUMENT ANALYSIS**
+**File:** {filename}
+**Type:** {content_type}
+**Size:** {file_size_kb:.1f}KB
+
+**General Analysis:** I have received your document and will analyze it in the context of Ghanaian university admissions. Whether it's an application document, academic record, or informational material, I'll provide relevant guidance for your university journey.
+
+Please let me know what specific aspect of this document you'd like me to help you with regarding university admissions.""", "text": "", "ok": True}
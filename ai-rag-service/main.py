@@ -2,23 +2,49 @@
 GLINAX RAG+CAG SERVICE - PRODUCTION READY
 Built for Ghanaian University Applicants
 Author: Kwame Asare - Senior Fullstack Engineer
+
+Run with: uvicorn main:app --host 0.0.0.0 --port 8000  (`python main.py` hands over to the same command)
 """
 
 import os
+import re
+import copy
 import json
+import math
+import time
+import base64
+import hashlib
+import tempfile
 import asyncio
+import multiprocessing
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from fastapi import FastAPI, HTTPException, File, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
-import requests
+import httpx
 from dotenv import load_dotenv
 import motor.motor_asyncio
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from groq import Groq
+from groq import AsyncGroq
+
+from file_extraction import extract_file_content, is_cpu_bound, limit_worker_memory
+import metrics
+
+try:
+    import faiss  # Optional ANN backend for the knowledge vector index
+except ImportError:
+    faiss = None
 
 # Load environment variables
 load_dotenv()
@@ -27,7 +53,7 @@ load_dotenv()
 app = FastAPI(title="Glinax RAG+CAG Service", version="2.0.0")
 
 from fastapi import Path, Query, Depends, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt  
 
@@ -63,9 +89,98 @@ app.add_middleware(
 
 # Global variables for services
 embedding_model = None
-groq_client = None
+groq_async_client = None
+http_client = None  # Pooled keep-alive client for web search (see get_http_client)
+extraction_pool = None  # Process pool for PDF/OCR/DOCX extraction (see get_extraction_pool)
 db_client = None
-ghana_universities_data = []
+ghana_universities_data = []  # Raw scraper records per university (filled by knowledge_store)
+knowledge_index = None  # Dense vector index over knowledge chunks (built at startup)
+keyword_index = None  # BM25 inverted index over knowledge chunks (rebuilt when the knowledge base changes)
+cut_off_index = None  # Sorted cut-off aggregates (rebuilt when the knowledge store reloads cut-offs)
+knowledge_version = 0  # Bumped whenever GHANA_UNIVERSITIES_KNOWLEDGE is modified or swapped
+intent_classifier = None  # Nearest-centroid intent classifier (rebuilt when the embedding model changes)
+conversation_rollup_task = None  # Background rag_conversations backfill (see ensure_indexes)
+conversation_rollups_ready = True  # False while the backfill runs; conversation lists then aggregate rag_logs
+
+# Retrieval configuration
+VECTOR_TOP_K = int(os.getenv("VECTOR_TOP_K", "8"))
+VECTOR_MIN_SIMILARITY = float(os.getenv("VECTOR_MIN_SIMILARITY", "0.35"))
+USE_FAISS = os.getenv("USE_FAISS", "auto").lower()  # auto | true | false
+LEXICAL_MIN_RELEVANCE = float(os.getenv("LEXICAL_MIN_RELEVANCE", "0.3"))
+
+# Knowledge store configuration (scraper output merged over the curated knowledge base)
+KNOWLEDGE_DATA_DIR = os.getenv("KNOWLEDGE_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_scraper", "data"))
+KNOWLEDGE_RELOAD_SECONDS = float(os.getenv("KNOWLEDGE_RELOAD_SECONDS", "30"))  # Source poll interval; 0 disables hot reload
+
+# LLM configuration
+GROQ_MODEL = "llama-3.1-8b-instant"  # Current working model
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "30"))
+llm_semaphore = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
+llm_pool_stats = {"in_flight": 0, "waiting": 0, "max_waiting": 0, "completed": 0, "timeouts": 0, "errors": 0}
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))  # System prompt + question + context, estimated tokens
+PROMPT_DOCUMENT_SHARE = float(os.getenv("PROMPT_DOCUMENT_SHARE", "0.6"))  # Share of the context room uploaded documents may take
+
+# Semantic answer cache configuration
+CAG_ENABLED = os.getenv("CAG_ENABLED", "true").lower() == "true"
+CAG_SIMILARITY_THRESHOLD = float(os.getenv("CAG_SIMILARITY_THRESHOLD", "0.92"))
+CAG_TTL_SECONDS = float(os.getenv("CAG_TTL_SECONDS", "3600"))
+CAG_MAX_ENTRIES = int(os.getenv("CAG_MAX_ENTRIES", "2000"))
+CAG_MAX_BYTES = int(os.getenv("CAG_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Web search configuration
+WEB_SEARCH_DEADLINE_SECONDS = float(os.getenv("WEB_SEARCH_DEADLINE_SECONDS", "8"))
+WEB_SEARCH_PARALLEL = os.getenv("WEB_SEARCH_PARALLEL", "true").lower() == "true"  # Also query DuckDuckGo when SerpAPI is configured
+WEB_SEARCH_CACHE_TTL_SECONDS = float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "900"))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "500"))
+web_search_cache: "OrderedDict[str, tuple]" = OrderedDict()  # normalized query -> (expires_at, result)
+web_search_inflight: Dict[str, Dict[str, Any]] = {}  # normalized query -> {"task": upstream search, "waiters": callers awaiting it}
+web_search_stats = {"cache_hits": 0, "coalesced": 0, "upstream_calls": 0, "deadline_exceeded": 0}
+
+# Retrieval routing
+FAST_PATH_CONFIDENCE = float(os.getenv("FAST_PATH_CONFIDENCE", "0.7"))
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "false").lower() == "true"  # Start web search alongside local search
+INTENT_ROUTING_ENABLED = os.getenv("INTENT_ROUTING_ENABLED", "true").lower() == "true"  # Answer structured intents without the LLM
+INTENT_MIN_SIMILARITY = float(os.getenv("INTENT_MIN_SIMILARITY", "0.5"))  # Centroid similarity needed to trust the embedding classifier
+INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", "0.05"))  # Required lead over the runner-up intent
+
+# Pipeline metrics (Prometheus format on /metrics)
+REQUEST_SECONDS = metrics.Histogram("glinax_request_duration_seconds", "End-to-end request latency by route", ("endpoint",))
+STAGE_SECONDS = metrics.Histogram("glinax_stage_duration_seconds", "Latency of one RAG pipeline stage", ("stage",))
+EXTRACTION_SECONDS = metrics.Histogram("glinax_file_extraction_duration_seconds", "Upload extraction latency by file type", ("file_type", "source"))
+RETRIEVAL_PATHS = metrics.Counter("glinax_retrieval_path_total", "Answers by routing decision (fast, fallback, cache, cut-off, intent, files)", ("path",))
+QUERY_INTENTS = metrics.Counter("glinax_query_intent_total", "Classified queries by intent, classifier and whether they were answered directly", ("intent", "method", "answered"))
+GROQ_REQUESTS = metrics.Counter("glinax_groq_requests_total", "Groq completions by mode and outcome", ("mode", "outcome"))
+PROMPT_TOKENS = metrics.Histogram("glinax_prompt_tokens", "Estimated prompt tokens per Groq call", buckets=(250, 500, 1000, 2000, 4000, 6000, 8000, 16000, 32000))
+SMART_FALLBACKS = metrics.Counter("glinax_smart_fallback_responses_total", "Replies built by the template fallback instead of the LLM")
+ERRORS = metrics.Counter("glinax_errors_total", "Errors by pipeline stage", ("stage",))
+metrics.Gauge("glinax_llm_in_flight", "Groq calls currently running", lambda: llm_pool_stats["in_flight"])
+metrics.Gauge("glinax_llm_waiting", "Requests queued for a Groq slot", lambda: llm_pool_stats["waiting"])
+metrics.Gauge("glinax_rag_log_queue_depth", "rag_logs documents waiting for the batch writer", lambda: rag_log_writer.snapshot()["queued"])
+WEB_SEARCH_BUDGET_SECONDS = float(os.getenv("WEB_SEARCH_BUDGET_SECONDS", "6"))
+
+# File extraction configuration
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "30"))
+EXTRACTION_WORKER_MEMORY_MB = int(os.getenv("EXTRACTION_WORKER_MEMORY_MB", "1024"))
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_THRESHOLD_BYTES = int(os.getenv("UPLOAD_SPOOL_THRESHOLD_BYTES", str(1024 * 1024)))  # Larger uploads are parsed from a temp file
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None  # None = system temp directory
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+EXTRACTION_CACHE_MEMORY_BYTES = int(os.getenv("EXTRACTION_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL_DAYS = int(os.getenv("EXTRACTION_CACHE_TTL_DAYS", "30"))
+
+# Conversation log (rag_logs) write-behind configuration
+RAG_LOG_BATCH_SIZE = int(os.getenv("RAG_LOG_BATCH_SIZE", "100"))
+RAG_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("RAG_LOG_FLUSH_INTERVAL_SECONDS", "1"))
+RAG_LOG_QUEUE_SIZE = int(os.getenv("RAG_LOG_QUEUE_SIZE", "10000"))
+RAG_LOG_WRITE_TIMEOUT_SECONDS = float(os.getenv("RAG_LOG_WRITE_TIMEOUT_SECONDS", "10"))
+RAG_LOG_DRAIN_TIMEOUT_SECONDS = float(os.getenv("RAG_LOG_DRAIN_TIMEOUT_SECONDS", "15"))
+CONVERSATION_PAGE_SIZE = int(os.getenv("CONVERSATION_PAGE_SIZE", "50"))
+THREAD_PAGE_SIZE = int(os.getenv("THREAD_PAGE_SIZE", "50"))  # Exchanges per /history/chat page
+CONVERSATION_ROLLUP_REBUILD = os.getenv("CONVERSATION_ROLLUP_REBUILD", "false").lower() == "true"  # Recompute rag_conversations from rag_logs at startup
+RAG_LOG_SPILL_PATH = os.getenv("RAG_LOG_SPILL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rag_logs_spill.jsonl"))
 
 # Request/Response Models
 class ChatRequest(BaseModel):
@@ -85,9 +200,10 @@ class ChatResponse(BaseModel):
     timestamp: str
     processing_time: Optional[float] = None
     model_used: str = "hybrid-rag"
+    stage_timings: Optional[Dict[str, Any]] = None
 
-# Ghana Universities Knowledge Base
-GHANA_UNIVERSITIES_KNOWLEDGE = {
+# Ghana Universities Knowledge Base (curated; knowledge_store merges scraped data over it)
+CURATED_UNIVERSITIES_KNOWLEDGE = {
     "University of Ghana": {
         "location": "Legon, Accra",
         "established": "1948",
@@ -243,23 +359,1043 @@ GHANA_UNIVERSITIES_KNOWLEDGE = {
     }
 }
 
+GHANA_UNIVERSITIES_KNOWLEDGE = CURATED_UNIVERSITIES_KNOWLEDGE  # Current snapshot, swapped atomically on reload
+
+# Vector Retrieval Engine
+def _flatten_field(value: Any) -> str:
+    """Render a knowledge-base value as compact 'key: value' text for embedding"""
+    if isinstance(value, dict):
+        return "; ".join(f"{str(k).replace('_', ' ')}: {_flatten_field(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_flatten_field(v) for v in value)
+    return str(value)
+
+def build_knowledge_chunks(knowledge: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split the knowledge base into retrievable chunks (program, fees, admissions, contact...)"""
+    chunks = []
+
+    def add(uni_name: str, kind: str, title: str, body: str):
+        if body:
+            chunks.append({
+                "university": uni_name,
+                "kind": kind,
+                "title": title,
+                "text": f"{uni_name} - {title}: {body}"
+            })
+
+    for uni_name, uni_data in knowledge.items():
+        overview = {k: uni_data[k] for k in ("location", "established", "motto") if k in uni_data}
+        add(uni_name, "overview", "Overview", _flatten_field(overview))
+
+        programs = uni_data.get("programs")
+        if isinstance(programs, dict):
+            for program_name, program_data in programs.items():
+                add(uni_name, "program", program_name, _flatten_field(program_data))
+        elif programs:
+            add(uni_name, "program", "Programs offered", _flatten_field(programs))
+
+        for key, value in uni_data.items():
+            if key == "fees" or key.startswith("current_fees"):
+                add(uni_name, "fees", "Fees", _flatten_field(value))
+
+        if "admission_requirements" in uni_data:
+            add(uni_name, "admissions", "Admission requirements", _flatten_field(uni_data["admission_requirements"]))
+
+        contact = {"contact": uni_data.get("contact"), "website": uni_data.get("website")}
+        add(uni_name, "contact", "Contact", _flatten_field({k: v for k, v in contact.items() if v}))
+
+        if uni_data.get("scholarships"):
+            add(uni_name, "scholarships", "Scholarships", _flatten_field(uni_data["scholarships"]))
+        if uni_data.get("external_scholarships"):
+            add(uni_name, "scholarships", "External scholarships", _flatten_field(uni_data["external_scholarships"]))
+
+        if uni_data.get("cut_off_points"):
+            add(uni_name, "cut_offs", "Cut-off points (WASSCE aggregate)", _flatten_field(uni_data["cut_off_points"]))
+
+        if uni_data.get("official_site"):
+            add(uni_name, "official_site", "Official website", _flatten_field(uni_data["official_site"]))
+
+    return chunks
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed texts with the shared SentenceTransformer as L2-normalized float32 rows"""
+    vectors = embedding_model.encode(
+        texts,
+        batch_size=64,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+class KnowledgeVectorIndex:
+    """Normalized embedding matrix over knowledge chunks; inner product equals cosine similarity"""
+
+    def __init__(self, chunks: List[Dict[str, Any]], embeddings: np.ndarray):
+        self.chunks = chunks
+        self.matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.faiss_index = None
+        if faiss is not None and USE_FAISS != "false" and len(chunks):
+            self.faiss_index = faiss.IndexFlatIP(self.matrix.shape[1])
+            self.faiss_index.add(self.matrix)
+        elif USE_FAISS == "true":
+            print("⚠️ USE_FAISS=true but faiss is not installed, using numpy backend")
+
+    @property
+    def backend(self) -> str:
+        return "faiss" if self.faiss_index is not None else "numpy"
+
+    def search(self, query_vector: np.ndarray, top_k: int) -> List[tuple]:
+        """Return [(chunk_position, similarity)] for the top_k chunks, best first"""
+        if not self.chunks:
+            return []
+        top_k = min(top_k, len(self.chunks))
+        query_vector = np.ascontiguousarray(query_vector, dtype=np.float32).reshape(1, -1)
+
+        if self.faiss_index is not None:
+            scores, positions = self.faiss_index.search(query_vector, top_k)
+            return [(int(p), float(s)) for p, s in zip(positions[0], scores[0]) if p >= 0]
+
+        scores = self.matrix @ query_vector[0]
+        if top_k < len(scores):
+            positions = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            positions = np.arange(len(scores))
+        positions = positions[np.argsort(-scores[positions])]
+        return [(int(p), float(scores[p])) for p in positions]
+
+def build_knowledge_index(knowledge: Dict[str, Any], previous: Optional[KnowledgeVectorIndex] = None) -> Optional[KnowledgeVectorIndex]:
+    """Chunk and embed the knowledge base; returns None when no embedding model is loaded.
+
+    With `previous`, embeddings are reused for chunks whose text is unchanged (chunk text is
+    prefixed with the university name), so only changed universities are re-embedded.
+    """
+    if embedding_model is None:
+        return None
+    chunks = build_knowledge_chunks(knowledge)
+    reusable = {}
+    if previous is not None and len(previous.chunks):
+        reusable = {c["text"]: previous.matrix[i] for i, c in enumerate(previous.chunks)}
+    missing = list(dict.fromkeys(c["text"] for c in chunks if c["text"] not in reusable))
+    fresh = dict(zip(missing, embed_texts(missing))) if missing else {}
+    if chunks:
+        embeddings = np.stack([reusable[c["text"]] if c["text"] in reusable else fresh[c["text"]] for c in chunks])
+    else:
+        embeddings = np.zeros((0, 1), dtype=np.float32)
+    index = KnowledgeVectorIndex(chunks, embeddings)
+    index.embedded = len(missing)
+    return index
+
+def embed_query(query: str) -> Optional[np.ndarray]:
+    """Embed one query for retrieval and the answer cache; None when no model is loaded"""
+    if embedding_model is None:
+        return None
+    return embed_texts([query])[0]
+
+def search_knowledge_vectors(query: str, top_k: int = VECTOR_TOP_K, query_vector: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """Dense top-k retrieval over knowledge chunks for a single query"""
+    if knowledge_index is None or embedding_model is None:
+        return []
+    if query_vector is None:
+        query_vector = embed_texts([query])[0]
+    return [
+        {**knowledge_index.chunks[position], "score": score}
+        for position, score in knowledge_index.search(query_vector, top_k)
+    ]
+
+# Keyword (BM25) Index
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "can", "do", "does", "for", "from", "how", "i", "in", "is", "it",
+    "me", "my", "of", "on", "or", "the", "to", "what", "when", "where", "which", "who", "with", "you"
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+class KnowledgeKeywordIndex:
+    """Inverted index token -> [(chunk_position, BM25 weight)] over (university, field) chunks"""
+
+    def __init__(self, chunks: List[Dict[str, Any]], version: int = 0, k1: float = 1.2, b: float = 0.75):
+        self.chunks = chunks
+        self.version = version
+        self.k1 = k1
+        self.postings: Dict[str, List[tuple]] = {}
+        self.idf: Dict[str, float] = {}
+
+        term_counts = []
+        for chunk in chunks:
+            counts: Dict[str, int] = {}
+            for token in tokenize(chunk["text"]):
+                counts[token] = counts.get(token, 0) + 1
+            term_counts.append(counts)
+
+        doc_count = len(chunks)
+        avg_length = (sum(sum(c.values()) for c in term_counts) / doc_count) if doc_count else 0.0
+        doc_freq: Dict[str, int] = {}
+        for counts in term_counts:
+            for token in counts:
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        for token, df in doc_freq.items():
+            self.idf[token] = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+        # Precompute the full BM25 term weight per posting so scoring is a pure merge
+        for position, counts in enumerate(term_counts):
+            length_norm = 1 - b + b * (sum(counts.values()) / avg_length if avg_length else 0.0)
+            for token, tf in counts.items():
+                weight = self.idf[token] * tf * (k1 + 1) / (tf + k1 * length_norm)
+                self.postings.setdefault(token, []).append((position, weight))
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Merge posting lists for the query terms; scores are normalized to 0..1"""
+        terms = set(tokenize(query))
+        # Best achievable score: every known query term matched in a document of average length
+        ideal = sum(self.idf[t] * (self.k1 + 1) / (1 + self.k1) for t in terms if t in self.idf)
+        if not ideal:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for position, weight in self.postings.get(term, ()):
+                scores[position] = scores.get(position, 0.0) + weight
+
+        return [
+            {**self.chunks[position], "score": min(score / ideal, 1.0)}
+            for position, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+def get_keyword_index() -> KnowledgeKeywordIndex:
+    """Return the compiled keyword index, rebuilding it only if the knowledge base changed"""
+    global keyword_index
+    if keyword_index is None or keyword_index.version != knowledge_version:
+        keyword_index = KnowledgeKeywordIndex(build_knowledge_chunks(GHANA_UNIVERSITIES_KNOWLEDGE), knowledge_version)
+    return keyword_index
+
+def mark_knowledge_changed(universities: Optional[set] = None):
+    """Invalidate derived indexes after GHANA_UNIVERSITIES_KNOWLEDGE is modified in place.
+
+    Only chunks whose text changed are re-embedded; cached answers are dropped for
+    `universities` (all of them when None).
+    """
+    global knowledge_version, knowledge_index
+    knowledge_version += 1
+    if embedding_model is not None:
+        knowledge_index = build_knowledge_index(GHANA_UNIVERSITIES_KNOWLEDGE, previous=knowledge_index)
+    answer_cache.invalidate(universities)
+    fallback_templates.compile(GHANA_UNIVERSITIES_KNOWLEDGE, knowledge_version)
+
+# Semantic Answer Cache (CAG)
+class SemanticAnswerCache:
+    """LRU/TTL cache of generated replies keyed on query embeddings, bounded by entries and bytes"""
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.groups: Dict[str, Dict[str, Any]] = {}  # scope (see answer_cache_scope) -> {"ids": [...], "matrix": ndarray | None}
+        self.bytes_used = 0
+        self._next_id = 0
+        self.stats = {"hits": 0, "misses": 0, "unscoped": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self.bytes_used -= entry["size"]
+        group = self.groups.get(entry["group"])
+        if group:
+            group["ids"].remove(entry_id)
+            group["matrix"] = None
+            if not group["ids"]:
+                del self.groups[entry["group"]]
+
+    def lookup(self, query_vector: np.ndarray, scope: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the stored answer for the nearest cached query in the same scope above the threshold.
+
+        Without a scope the cache is bypassed: near-identical wording says nothing about which
+        university a question is about.
+        """
+        if scope is None:
+            self.stats["unscoped"] += 1
+            return None
+        group = self.groups.get(scope)
+        if group:
+            if group["matrix"] is None:
+                group["matrix"] = np.stack([self.entries[i]["vector"] for i in group["ids"]])
+            scores = group["matrix"] @ query_vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                entry_id = group["ids"][best]
+                entry = self.entries[entry_id]
+                if time.monotonic() - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.stats["expirations"] += 1
+                else:
+                    self.entries.move_to_end(entry_id)
+                    self.stats["hits"] += 1
+                    return {**entry["answer"], "similarity": float(scores[best])}
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, query_vector: np.ndarray, scope: Optional[str], answer: Dict[str, Any]):
+        """Cache a generated answer ({reply, sources, confidence}) under its scope and evict down to the bounds"""
+        if scope is None:
+            return
+        size = query_vector.nbytes + len(json.dumps(answer, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = {
+            "vector": np.ascontiguousarray(query_vector, dtype=np.float32),
+            "group": scope,
+            "answer": answer,
+            "size": size,
+            "created_at": time.monotonic(),
+            "universities": {s.get("source") for s in answer.get("sources", []) if s.get("type") == "local_knowledge"}
+        }
+        group = self.groups.setdefault(scope, {"ids": [], "matrix": None})
+        group["ids"].append(entry_id)
+        group["matrix"] = None
+        self.bytes_used += size
+        self.stats["stores"] += 1
+
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes_used > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+            self.stats["evictions"] += 1
+
+    def invalidate(self, universities: Optional[set] = None):
+        """Drop all answers, or only those grounded on the given universities"""
+        if universities is None:
+            dropped = list(self.entries)
+        else:
+            dropped = [i for i, e in self.entries.items() if e["universities"] & set(universities)]
+        for entry_id in dropped:
+            self._remove(entry_id)
+        self.stats["invalidations"] += len(dropped)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "bytes": self.bytes_used,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+answer_cache = SemanticAnswerCache(
+    threshold=CAG_SIMILARITY_THRESHOLD,
+    ttl_seconds=CAG_TTL_SECONDS,
+    max_entries=CAG_MAX_ENTRIES,
+    max_bytes=CAG_MAX_BYTES
+)
+
+# Knowledge Store
+UNIVERSITY_CODES = {
+    "UG": "University of Ghana",
+    "KNUST": "Kwame Nkrumah University of Science and Technology",
+    "UCC": "University of Cape Coast",
+    "UDS": "University for Development Studies",
+    "UPSA": "University of Professional Studies, Accra"
+}
+SCRAPED_SITE_FIELDS = ("description", "contact", "admission_requirements", "deadlines", "programs", "source_urls")
+SCRAPED_PROFILE_FIELDS = ("location", "established", "type")  # From the scraper's fallback records
+SCRAPED_SCHOLARSHIP_FIELDS = ("type", "eligibility", "amount", "coverage", "focus_areas", "application_period", "website")  # Stable fields only
+KNOWLEDGE_FILES = ("ghana_universities", "scholarships", "cut_off_points")
+
+class KnowledgeStore:
+    """Curated knowledge merged with scraper output: data_scraper JSON files and, when connected,
+    the universities_data / scholarships_data / cut_off_points collections (MongoDB wins).
+
+    reload() builds a complete new snapshot and swaps it in with one assignment, so readers never
+    see a half-updated knowledge base. Changes are detected per university by content hash; only
+    those universities are re-embedded and have their cached answers dropped.
+    """
+
+    def __init__(self, curated: Dict[str, Any], data_dir: str):
+        self.curated = curated
+        self.data_dir = data_dir
+        self.hashes = {name: self._hash(entry) for name, entry in curated.items()}
+        self.cut_off_points: Dict[str, Any] = {}
+        self.file_mtimes: Dict[str, int] = {}
+        self.mongo_fingerprint: Optional[str] = None
+        self.reload_requested = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.tasks: List[asyncio.Task] = []
+        self.stats = {"reloads": 0, "universities_changed": 0, "chunks_embedded": 0, "last_reload": None, "sources": []}
+
+    @staticmethod
+    def _hash(entry: Any) -> str:
+        return hashlib.sha256(json.dumps(entry, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _file_path(self, name: str) -> str:
+        return os.path.join(self.data_dir, f"{name}.json")
+
+    def _file_mtimes(self) -> Dict[str, int]:
+        mtimes = {}
+        for name in KNOWLEDGE_FILES:
+            try:
+                mtimes[name] = os.stat(self._file_path(name)).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def _read_files(self) -> Dict[str, Any]:
+        sources = {}
+        for name in KNOWLEDGE_FILES:
+            path = self._file_path(name)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    sources[name] = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Could not read {path}: {e}")
+        return sources
+
+    @staticmethod
+    def _db():
+        return db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
+
+    async def _read_mongo(self) -> Dict[str, Any]:
+        if not db_client:
+            return {}
+        db = self._db()
+        sources = {}
+        universities = {}
+        async for doc in db.universities_data.find({}, {"_id": 0, "university_code": 1, "data": 1}):
+            universities[doc["university_code"]] = doc.get("data") or {}
+        if universities:
+            sources["ghana_universities"] = universities
+        scholarships = {}
+        async for doc in db.scholarships_data.find({}, {"_id": 0, "scholarship_id": 1, "data": 1}):
+            scholarships[doc["scholarship_id"]] = doc.get("data") or {}
+        if scholarships:
+            sources["scholarships"] = scholarships
+        latest = await db.cut_off_points.find_one({}, {"_id": 0, "data": 1}, sort=[("academic_year", -1)])
+        if latest and latest.get("data"):
+            sources["cut_off_points"] = latest["data"]
+        return sources
+
+    async def _mongo_fingerprint(self) -> Optional[str]:
+        """Cheap change check: the scraper stores a content_hash on every document"""
+        if not db_client:
+            return None
+        db = self._db()
+        parts = []
+        for collection in ("universities_data", "scholarships_data", "cut_off_points"):
+            async for doc in db[collection].find({}, {"_id": 0, "content_hash": 1, "last_updated": 1}):
+                parts.append(f"{collection}:{doc.get('content_hash') or doc.get('last_updated')}")
+        return hashlib.sha256("|".join(sorted(parts)).encode("utf-8")).hexdigest()
+
+    def merge(self, sources: Dict[str, Any]) -> tuple:
+        """Overlay scraped records on a copy of the curated knowledge; returns (knowledge, raw records)"""
+        knowledge = copy.deepcopy(self.curated)
+        records = []
+        for code, data in (sources.get("ghana_universities") or {}).items():
+            if not isinstance(data, dict):
+                continue
+            name = UNIVERSITY_CODES.get(code.upper()) or data.get("full_name") or code
+            records.append({"university_code": code, "university": name, **data})
+            entry = knowledge.setdefault(name, {})
+            for key in SCRAPED_PROFILE_FIELDS:
+                if data.get(key) and key not in entry:
+                    entry[key] = data[key]
+            site = {key: data[key] for key in SCRAPED_SITE_FIELDS if data.get(key)}
+            if site:
+                entry["official_site"] = site
+
+        for year, table in (sources.get("cut_off_points") or {}).items():
+            if not isinstance(table, dict) or not re.fullmatch(r"\d{4}_\d{4}", year):
+                continue
+            for code, programs in table.items():
+                name = UNIVERSITY_CODES.get(code.upper(), code)
+                knowledge.setdefault(name, {}).setdefault("cut_off_points", {})[year.replace("_", "/")] = programs
+
+        # Scholarships go on their partner universities, or on every university when they have none
+        for key, data in (sources.get("scholarships") or {}).items():
+            if not isinstance(data, dict):
+                continue
+            summary = {field: data[field] for field in SCRAPED_SCHOLARSHIP_FIELDS if data.get(field)}
+            partners = {resolve_university(str(p)) or str(p) for p in data.get("partner_universities") or []}
+            for name in (partners & knowledge.keys()) if partners else knowledge.keys():
+                knowledge[name].setdefault("external_scholarships", {})[data.get("full_name") or key] = summary
+        return knowledge, records
+
+    async def reload(self, reason: str) -> List[str]:
+        """Re-read all sources and swap in a new snapshot if any university changed"""
+        async with self.lock:
+            self.file_mtimes = self._file_mtimes()
+            sources = await asyncio.to_thread(self._read_files)
+            loaded = list(sources)
+            try:
+                self.mongo_fingerprint = await self._mongo_fingerprint()
+                mongo_sources = await self._read_mongo()
+                sources.update(mongo_sources)
+                loaded += [f"mongo:{name}" for name in mongo_sources]
+            except Exception as e:
+                print(f"⚠️ Knowledge store could not read MongoDB, using files only: {e}")
+
+            self.cut_off_points = sources.get("cut_off_points") or {}
+            knowledge, records = self.merge(sources)
+            hashes = {name: self._hash(entry) for name, entry in knowledge.items()}
+            changed = {name for name in hashes.keys() | self.hashes.keys() if hashes.get(name) != self.hashes.get(name)}
+            self.stats["sources"] = loaded
+            if not changed:
+                return []
+
+            # Embed off the event loop, then swap snapshot and index together
+            index = await asyncio.to_thread(build_knowledge_index, knowledge, knowledge_index) if embedding_model is not None else None
+            swap_knowledge(knowledge, records, index, changed)
+            self.hashes = hashes
+            self.stats["reloads"] += 1
+            self.stats["universities_changed"] += len(changed)
+            self.stats["chunks_embedded"] += getattr(index, "embedded", 0)
+            self.stats["last_reload"] = datetime.now().isoformat()
+            print(f"🔄 Knowledge reloaded ({reason}): {len(changed)} universities changed, {getattr(index, 'embedded', 0)} chunks re-embedded")
+            return sorted(changed)
+
+    async def _poll(self):
+        """Reload when a scraper file's mtime or the MongoDB fingerprint changes"""
+        while True:
+            try:
+                await asyncio.wait_for(self.reload_requested.wait(), timeout=KNOWLEDGE_RELOAD_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            notified = self.reload_requested.is_set()
+            self.reload_requested.clear()
+            try:
+                if notified:
+                    await self.reload("change stream")
+                elif self._file_mtimes() != self.file_mtimes or await self._mongo_fingerprint() != self.mongo_fingerprint:
+                    await self.reload("source changed")
+            except Exception as e:
+                print(f"⚠️ Knowledge reload failed: {e}")
+
+    async def _watch_mongo(self):
+        """Wake the poller on MongoDB change events (replica sets/Atlas; standalone servers just poll)"""
+        pipeline = [{"$match": {"ns.coll": {"$in": ["universities_data", "scholarships_data", "cut_off_points"]}}}]
+        try:
+            async with self._db().watch(pipeline) as stream:
+                async for _ in stream:
+                    self.reload_requested.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ℹ️ MongoDB change stream unavailable, polling every {KNOWLEDGE_RELOAD_SECONDS:.0f}s: {e}")
+
+    def start(self):
+        if KNOWLEDGE_RELOAD_SECONDS <= 0 or self.tasks:
+            return
+        self.tasks.append(asyncio.create_task(self._poll()))
+        if db_client:
+            self.tasks.append(asyncio.create_task(self._watch_mongo()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "universities": len(GHANA_UNIVERSITIES_KNOWLEDGE), "version": knowledge_version}
+
+def swap_knowledge(knowledge: Dict[str, Any], records: List[Dict[str, Any]], index: Optional[KnowledgeVectorIndex], changed: set):
+    """Atomically publish a new knowledge snapshot with its vector index and drop stale derived state"""
+    global GHANA_UNIVERSITIES_KNOWLEDGE, ghana_universities_data, knowledge_index, knowledge_version
+    GHANA_UNIVERSITIES_KNOWLEDGE = knowledge
+    ghana_universities_data = records
+    if index is not None:
+        knowledge_index = index
+    knowledge_version += 1  # Keyword index recompiles lazily on next search
+    answer_cache.invalidate(changed)
+    fallback_templates.compile(knowledge, knowledge_version)
+
+knowledge_store = KnowledgeStore(CURATED_UNIVERSITIES_KNOWLEDGE, KNOWLEDGE_DATA_DIR)
+
+# Cut-off Point Engine
+UNIVERSITY_NAME_VARIATIONS = {
+    "university of ghana": "University of Ghana",
+    "ug": "University of Ghana",
+    "legon": "University of Ghana",
+    "knust": "Kwame Nkrumah University of Science and Technology",
+    "kwame nkrumah": "Kwame Nkrumah University of Science and Technology",
+    "kumasi": "Kwame Nkrumah University of Science and Technology",
+    "ucc": "University of Cape Coast",
+    "cape coast": "University of Cape Coast",
+    "uds": "University for Development Studies",
+    "tamale": "University for Development Studies",
+    "upsa": "University of Professional Studies, Accra"
+}
+ELIGIBILITY_PATTERN = re.compile(
+    r"\b(?:qualif\w*|eligib\w*|cut[\s-]?offs?|admission|admit\w*|get in|"
+    r"(?:which|what) (?:programs?|programmes?|courses?)|can i (?:study|do|apply|pursue|get|offer))\b",
+    re.IGNORECASE
+)
+AGGREGATE_PATTERN = re.compile(r"\b(?:aggregate|agg)\s*(?:of|is|=|:)?\s*(\d{1,2})\b|\b(\d{1,2})\s*(?:aggregate|agg)\b", re.IGNORECASE)
+BEST_AGGREGATE, WORST_AGGREGATE = 6, 36  # WASSCE aggregate range (lower is better)
+# Words that may precede a program name; anything else ("Computer Science") names a different program
+PROGRAM_LEAD_WORDS = {"study", "studying", "do", "read", "pursue", "offer", "take", "in", "into", "for", "of", "a", "an", "the", "and", "or", "to", "get", "apply", "about"}
+
+def resolve_university(text: str) -> Optional[str]:
+    """Full university name for a code, alias or name mentioned in text (whole words only)"""
+    text_lower = text.lower()
+    for variation, full_name in UNIVERSITY_NAME_VARIATIONS.items():
+        if re.search(rf"\b{re.escape(variation)}\b", text_lower):
+            return full_name
+    for full_name in GHANA_UNIVERSITIES_KNOWLEDGE:
+        if full_name.lower() in text_lower:
+            return full_name
+    return None
+
+def answer_cache_scope(university_name: Optional[str], message: str) -> Optional[str]:
+    """Semantic cache partition for a request: the university it is about, taken from the
+    selected university or else the message. None when neither names one, or when the message
+    names a different university than the one selected."""
+    selected = (resolve_university(university_name) or university_name.strip()) if university_name else None
+    mentioned = resolve_university(message)
+    if selected and mentioned and selected != mentioned:
+        return None
+    scope = selected or mentioned
+    return scope.lower() if scope else None
+
+class CutOffIndex:
+    """Latest-year cut-off aggregates sorted ascending, overall and per university.
+
+    A student qualifies where aggregate <= cut-off, so one bisect finds the first qualifying
+    entry and everything after it qualifies, most competitive first.
+    """
+
+    def __init__(self, cut_off_points: Dict[str, Any]):
+        self.source = cut_off_points
+        self.source_name = cut_off_points.get("source") or "Cut-off points"
+        years = sorted((k for k, v in cut_off_points.items() if isinstance(v, dict) and re.fullmatch(r"\d{4}_\d{4}", k)), reverse=True)
+        self.academic_year = cut_off_points.get("academic_year") or (years[0].replace("_", "/") if years else None)
+
+        entries = []
+        for code, programs in (cut_off_points[years[0]] if years else {}).items():
+            university = UNIVERSITY_CODES.get(code.upper(), code)
+            for program, cut_off in programs.items():
+                try:
+                    entries.append({"university": university, "university_code": code, "program": program, "cut_off": int(cut_off)})
+                except (TypeError, ValueError):
+                    continue
+        entries.sort(key=lambda e: (e["cut_off"], e["university"], e["program"]))
+        self.entries = entries
+        self.cut_offs = [e["cut_off"] for e in entries]
+        self.by_university: Dict[str, tuple] = {}
+        for entry in entries:
+            cut_offs, group = self.by_university.setdefault(entry["university"], ([], []))
+            cut_offs.append(entry["cut_off"])
+            group.append(entry)
+        self.program_patterns = {
+            e["program"]: re.compile(rf"(?:^|(\w+)\s+){re.escape(e['program'].lower())}\b") for e in entries
+        }
+
+    def match_programs(self, text: str) -> Optional[List[str]]:
+        """Programs named in free text, or None when the text names a program this index does not know"""
+        text_lower = text.lower()
+        matched, unknown = [], False
+        for name, pattern in self.program_patterns.items():
+            for match in pattern.finditer(text_lower):
+                if match.group(1) is None or match.group(1) in PROGRAM_LEAD_WORDS:
+                    matched.append(name)
+                    break
+                unknown = True
+        return matched if matched or not unknown else None
+
+    def eligible(self, aggregate: int, programs: Optional[List[str]] = None, university: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every program whose cut-off the aggregate meets, most competitive first"""
+        cut_offs, entries = self.by_university.get(university, ([], [])) if university else (self.cut_offs, self.entries)
+        results = entries[bisect_left(cut_offs, aggregate):]
+        if programs:
+            wanted = set(programs)
+            results = [e for e in results if e["program"] in wanted]
+        return [{**e, "margin": e["cut_off"] - aggregate} for e in results]
+
+    def near_misses(self, aggregate: int, programs: Optional[List[str]] = None, university: Optional[str] = None, limit: int = 3) -> List[Dict[str, Any]]:
+        """The closest programs just out of reach (cut-off below the aggregate)"""
+        cut_offs, entries = self.by_university.get(university, ([], [])) if university else (self.cut_offs, self.entries)
+        missed = entries[:bisect_left(cut_offs, aggregate)]
+        if programs:
+            wanted = set(programs)
+            missed = [e for e in missed if e["program"] in wanted]
+        return [{**e, "margin": e["cut_off"] - aggregate} for e in reversed(missed[-limit:])]
+
+def get_cut_off_index() -> CutOffIndex:
+    """Return the cut-off index, rebuilding it when the knowledge store loaded new cut-offs"""
+    global cut_off_index
+    if cut_off_index is None or cut_off_index.source is not knowledge_store.cut_off_points:
+        cut_off_index = CutOffIndex(knowledge_store.cut_off_points)
+    return cut_off_index
+
+def answer_eligibility_question(message: str, university_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Answer "which programs can I get with aggregate N" from the cut-off index; None if not applicable"""
+    match = AGGREGATE_PATTERN.search(message)
+    if not match or not ELIGIBILITY_PATTERN.search(message):
+        return None
+    aggregate = int(match.group(1) or match.group(2))
+    index = get_cut_off_index()
+    if not index.entries or not BEST_AGGREGATE <= aggregate <= WORST_AGGREGATE:
+        return None
+
+    university = university_name or resolve_university(message)
+    if university and university not in index.by_university:
+        return None  # No cut-offs for that university: let retrieval + LLM handle it
+    programs = index.match_programs(message)
+    if programs is None:
+        return None  # Asked about a program without cut-off data
+    results = index.eligible(aggregate, programs or None, university)
+
+    scope = "".join([f" for {', '.join(programs)}" if programs else "", f" at {university}" if university else ""])
+    heading = f"**With aggregate {aggregate}{scope}** ({index.academic_year} cut-offs)"
+    lines = [heading, ""]
+    if results:
+        lines.append(f"You meet the cut-off for {len(results)} programme{'s' if len(results) != 1 else ''}, most competitive first:")
+        for i, entry in enumerate(results[:15], 1):
+            lines.append(f"{i}. **{entry['program']}** - {entry['university']} (cut-off {entry['cut_off']})")
+        if len(results) > 15:
+            lines.append(f"...and {len(results) - 15} more.")
+    else:
+        lines.append("Your aggregate does not meet any matching cut-off this year.")
+        misses = index.near_misses(aggregate, programs or None, university)
+        if misses:
+            lines.append("Closest options:")
+            lines.extend(f"- **{e['program']}** - {e['university']} (cut-off {e['cut_off']}, {-e['margin']} point{'s' if e['margin'] != -1 else ''} away)" for e in misses)
+    lines += ["", "Cut-offs change every year and some programmes also require specific subject grades, so confirm with the university before applying."]
+
+    return {
+        "reply": "\n".join(lines),
+        "sources": [{"source": index.source_name, "type": "cut_off_points", "academic_year": index.academic_year, "confidence": 0.95}],
+        "confidence": 0.95,
+        "results": results
+    }
+
+# Intent Router
+STRUCTURED_INTENTS = ("fees", "requirements", "deadlines", "contact", "scholarships", "cut_offs", "programs")
+INTENT_EXAMPLES = {
+    "fees": [
+        "How much are the school fees?", "What is the tuition for international students?",
+        "How much does accommodation cost on campus?", "What are the fees for first year students?",
+        "How much will I pay per semester?", "What is the cost of studying medicine?",
+        "Fees for business administration", "Is the hostel fee included in tuition?",
+    ],
+    "requirements": [
+        "What are the admission requirements?", "What do I need to get admitted?",
+        "Which WASSCE subjects are required for engineering?", "What are the entry requirements for law?",
+        "Do I need elective maths for computer science?", "Minimum grades needed for admission",
+        "Is there an entrance exam?", "What qualifications does the university accept?",
+    ],
+    "deadlines": [
+        "When is the application deadline?", "When do applications close?",
+        "What is the last day to apply?", "When does the admission portal open?",
+        "Is it too late to apply this year?", "Application closing date",
+        "When will admission lists be released?", "When should I submit my application?",
+    ],
+    "contact": [
+        "What is the phone number of the admissions office?", "How can I contact the university?",
+        "What is the admissions email address?", "Where is the university located?",
+        "What is the official website?", "Who do I call about my application?",
+        "Admissions office contact details", "What is the postal address?",
+    ],
+    "scholarships": [
+        "What scholarships are available?", "Are there scholarships for needy students?",
+        "How do I apply for a scholarship?", "Is there financial aid for brilliant students?",
+        "Scholarships for students from the north", "Do they offer sports scholarships?",
+        "Can I get a bursary?", "Merit scholarships for first year students",
+    ],
+    "cut_offs": [
+        "What is the cut-off point for medicine?", "What aggregate do I need for law?",
+        "Cut-off points for engineering programmes", "What was last year's cut-off for nursing?",
+        "What is the cut off aggregate for business?", "Which programmes have the lowest cut-off?",
+        "Cut-off aggregate for computer science", "How competitive is the cut-off for pharmacy?",
+    ],
+    "programs": [
+        "What programmes does the university offer?", "Which courses are available?",
+        "Does the university offer nursing?", "How long is the computer science programme?",
+        "List of undergraduate programmes", "What can I study there?",
+        "What are the career prospects for economics graduates?", "Is architecture offered?",
+    ],
+    "open_ended": [
+        "Which university is better for me?", "Should I choose engineering or medicine?",
+        "Compare studying at UG and KNUST", "What is student life like?",
+        "Tell me about the university", "I am confused about what to study, can you advise me?",
+        "Why is KNUST popular?", "Help me plan my application strategy",
+    ],
+}
+INTENT_KEYWORDS = {
+    "fees": ["fee", "fees", "tuition", "cost", "costs", "how much", "pay", "price"],
+    "requirements": ["requirement", "requirements", "entry", "entrance", "qualification", "qualifications", "wassce subjects", "grades needed"],
+    "deadlines": ["deadline", "deadlines", "closing date", "last day", "when do applications", "when does the portal", "when is the application"],
+    "contact": ["contact", "phone", "telephone", "email", "e-mail", "address", "website", "call"],
+    "scholarships": ["scholarship", "scholarships", "bursary", "bursaries", "financial aid", "grant"],
+    "cut_offs": ["cut-off", "cut-offs", "cut off", "cutoff", "cutoffs", "aggregate"],
+    "programs": ["programs", "programmes", "courses", "offer", "offered", "duration", "career prospects"],
+}
+INTENT_KEYWORD_PATTERNS = {
+    intent: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b", re.IGNORECASE)
+    for intent, keywords in INTENT_KEYWORDS.items()
+}
+# Advice and comparisons need reasoning over the facts, so they always go to the LLM
+OPEN_ENDED_PATTERN = re.compile(r"\b(?:compare|comparison|better|best|should i|recommend\w*|advi[cs]e|versus|vs|why|difference|explain|help me)\b", re.IGNORECASE)
+INTENT_TITLES = {
+    "fees": "Fees", "requirements": "Admission requirements", "deadlines": "Application deadlines",
+    "contact": "Contact details", "scholarships": "Scholarships", "cut_offs": "Cut-off points", "programs": "Programmes",
+}
+INTENT_ANSWER_MAX_UNIVERSITIES = 5  # Universities listed when the query names none
+
+def keyword_intent(query: str) -> Dict[str, Any]:
+    """Rule-based intent: a structured intent only when exactly one keyword family matches"""
+    if OPEN_ENDED_PATTERN.search(query):
+        return {"intent": "open_ended", "confidence": 0.0, "method": "keywords"}
+    matched = [intent for intent, pattern in INTENT_KEYWORD_PATTERNS.items() if pattern.search(query)]
+    if len(matched) == 1:
+        return {"intent": matched[0], "confidence": 0.6, "method": "keywords"}
+    return {"intent": "open_ended", "confidence": 0.0, "method": "keywords"}
+
+class IntentClassifier:
+    """Nearest-centroid classifier over the shared query embeddings.
+
+    Each intent's centroid is the normalized mean of its example embeddings, so classifying
+    costs one (intents x dim) dot product on the vector /respond already computes. Below
+    INTENT_MIN_SIMILARITY, when the top two intents are closer than INTENT_MIN_MARGIN, or when
+    the keyword rules name a different structured intent, the keyword rules decide instead.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.intents = list(INTENT_EXAMPLES)
+        self.centroids = None
+        if model is not None:
+            vectors = embed_texts([example for intent in self.intents for example in INTENT_EXAMPLES[intent]])
+            rows, start = [], 0
+            for intent in self.intents:
+                centroid = vectors[start:start + len(INTENT_EXAMPLES[intent])].mean(axis=0)
+                rows.append(centroid / (np.linalg.norm(centroid) or 1.0))
+                start += len(INTENT_EXAMPLES[intent])
+            self.centroids = np.stack(rows).astype(np.float32)
+
+    def classify(self, query: str, query_vector: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        if self.centroids is None or OPEN_ENDED_PATTERN.search(query):
+            return keyword_intent(query)
+        if query_vector is None:
+            query_vector = embed_query(query)
+        scores = self.centroids @ np.asarray(query_vector, dtype=np.float32)
+        best, second = np.argsort(-scores)[:2]
+        by_keywords = keyword_intent(query)
+        if by_keywords["intent"] != "open_ended" and by_keywords["intent"] != self.intents[best]:
+            return by_keywords  # Explicit vocabulary ("deadline", "scholarship") beats a near neighbour
+        if scores[best] >= INTENT_MIN_SIMILARITY and scores[best] - scores[second] >= INTENT_MIN_MARGIN:
+            return {"intent": self.intents[best], "confidence": round(float(scores[best]), 4), "method": "embedding"}
+        return by_keywords
+
+def get_intent_classifier() -> IntentClassifier:
+    """Return the intent classifier, rebuilding its centroids when the embedding model changes"""
+    global intent_classifier
+    if intent_classifier is None or intent_classifier.model is not embedding_model:
+        intent_classifier = IntentClassifier(embedding_model)
+    return intent_classifier
+
+def mentioned_universities(text: str) -> List[str]:
+    """Every university named in text by code, alias or full name, in knowledge-base order"""
+    text_lower = text.lower()
+    found = {full_name for variation, full_name in UNIVERSITY_NAME_VARIATIONS.items()
+             if re.search(rf"\b{re.escape(variation)}\b", text_lower)}
+    return [name for name in GHANA_UNIVERSITIES_KNOWLEDGE if name in found or name.lower() in text_lower]
+
+def _label(key: str) -> str:
+    return str(key).replace("_", " ").capitalize()
+
+def _intent_lines(intent: str, uni_data: Dict[str, Any], text_lower: str) -> List[str]:
+    """Bullet lines answering one structured intent for one university (empty when there is no data)"""
+    programs = uni_data.get("programs") or {}
+    named = [p for p in programs if p.lower() in text_lower]
+    details = {p: programs[p] for p in (programs if isinstance(programs, dict) else ()) if isinstance(programs[p], dict)}
+    admission = _admission_requirements(uni_data)
+    lines = []
+
+    if intent == "fees":
+        fees = _current_fees(uni_data)
+        lines += [f"- {p}: {details[p]['fees_2024']}" for p in named if details.get(p, {}).get("fees_2024")]
+        lines += [f"- {_label(k)}: {v}" for k, v in fees.items() if k not in ("last_updated", "note")]
+        if not fees and isinstance(uni_data.get("fees"), str):
+            lines.append(f"- Tuition: {uni_data['fees']}")
+        if lines and admission.get("application_fee"):
+            lines.append(f"- Application fee: {admission['application_fee']}")
+        if fees.get("note"):
+            lines.append(f"- Note: {fees['note']}")
+    elif intent == "requirements":
+        lines += [f"- {p}: {details[p]['requirements']}" for p in named if details.get(p, {}).get("requirements")]
+        lines += [f"- {_label(k)}: {admission[k]}" for k in ("general", "entrance_exam", "online_portal") if admission.get(k)]
+    elif intent == "deadlines":
+        lines += [f"- {_label(k)}: {admission[k]}" for k in ("application_deadline", "current_application_status", "application_fee", "online_portal") if admission.get(k)]
+    elif intent == "contact":
+        contact = uni_data.get("contact")
+        if isinstance(contact, dict):
+            lines += [f"- {_label(k)}: {v}" for k, v in contact.items() if v]
+        elif contact:
+            lines.append(f"- Phone: {contact}")
+        if uni_data.get("website"):
+            lines.append(f"- Website: {uni_data['website']}")
+    elif intent == "scholarships":
+        scholarships = uni_data.get("scholarships") or {}
+        if isinstance(scholarships, dict):
+            lines += [f"- {_label(k)}: {v}" for k, v in scholarships.items()]
+        else:
+            lines += [f"- {s}" for s in scholarships]
+        lines += [f"- {name}: {_flatten_field(details)}" for name, details in (uni_data.get("external_scholarships") or {}).items()]
+    elif intent == "cut_offs":
+        years = sorted(k for k, v in (uni_data.get("cut_off_points") or {}).items() if isinstance(v, dict))
+        if years:
+            cut_offs = uni_data["cut_off_points"][years[-1]]
+            wanted = [p for p in cut_offs if p.lower() in text_lower] or list(cut_offs)
+            lines.append(f"- Academic year: {years[-1]}")
+            lines += [f"- {p}: aggregate {cut_offs[p]}" for p in sorted(wanted, key=lambda p: cut_offs[p])]
+    elif intent == "programs":
+        for p in named or list(programs):
+            extra = [details[p][k] for k in ("duration", "career_prospects") if details.get(p, {}).get(k)]
+            lines.append(f"- {p}" + (f" ({'; '.join(extra)})" if extra else ""))
+    return lines
+
+def answer_structured_intent(message: str, intent: str, university_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Answer a fees/requirements/deadlines/contact/scholarships/cut-offs/programs question from the
+    knowledge base; None when the knowledge base has nothing for it"""
+    if intent not in STRUCTURED_INTENTS:
+        return None
+    knowledge = GHANA_UNIVERSITIES_KNOWLEDGE
+    named = [university_name] if university_name in knowledge else mentioned_universities(message)
+    if university_name and not named:
+        return None
+    text_lower = message.lower()
+
+    sections = []
+    for uni_name in named or knowledge:
+        lines = _intent_lines(intent, knowledge[uni_name], text_lower)
+        if lines:
+            sections.append((uni_name, lines))
+        if not named and len(sections) == INTENT_ANSWER_MAX_UNIVERSITIES:
+            break
+    if not sections or (named and len(sections) < len(named)):
+        return None  # Missing data for a university that was asked about: let retrieval + LLM handle it
+
+    reply = [f"**{INTENT_TITLES[intent]}**", ""]
+    for uni_name, lines in sections:
+        reply += [f"### {uni_name}", *lines, ""]
+    if not named:
+        reply.append("Ask about a specific university for its full details.")
+    reply.append("This comes from our university knowledge base; please confirm with the admissions office before you apply.")
+
+    return {
+        "reply": "\n".join(reply),
+        "sources": [{"source": uni_name, "type": "local_knowledge", "confidence": 0.9} for uni_name, _ in sections],
+        "confidence": 0.9,
+        "intent": intent
+    }
+
+def route_structured_query(message: str, university_name: Optional[str] = None, query_vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+    """Classify the query and answer it directly when it is a structured intent; None sends it to the LLM"""
+    if not INTENT_ROUTING_ENABLED:
+        return None
+    with STAGE_SECONDS.time(stage="intent_classify"):
+        classified = get_intent_classifier().classify(message, query_vector)
+        direct = answer_structured_intent(message, classified["intent"], university_name)
+    QUERY_INTENTS.inc(intent=classified["intent"], method=classified["method"], answered=str(direct is not None).lower())
+    return direct
+
+async def ensure_indexes():
+    """Create the indexes this service relies on (idempotent)"""
+    try:
+        db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
+        await db.extraction_cache.create_index("last_used", expireAfterSeconds=EXTRACTION_CACHE_TTL_DAYS * 86400)
+        await db.rag_logs.create_index([("conversation_id", 1), ("timestamp", 1), ("_id", 1)])
+        await db.rag_conversations.create_index([("user_id", 1), ("conversation_id", 1)], unique=True)
+        await db.rag_conversations.create_index([("user_id", 1), ("last_active", -1), ("conversation_id", -1)])
+    except Exception as e:
+        print(f"⚠️ Index creation failed: {e}")
+        return
+    try:
+        if CONVERSATION_ROLLUP_REBUILD or (
+            await db.rag_conversations.estimated_document_count() == 0
+            and await db.rag_logs.estimated_document_count() > 0
+        ):
+            # A whole-collection aggregation: run it in the background instead of blocking startup
+            global conversation_rollup_task, conversation_rollups_ready
+            conversation_rollups_ready = False
+            conversation_rollup_task = asyncio.create_task(rebuild_conversation_rollups(db))
+            print("🔄 Rebuilding conversation rollups in the background; listing from rag_logs until done")
+    except Exception as e:
+        print(f"⚠️ Conversation rollup rebuild failed: {e}")
+
+async def rebuild_conversation_rollups(db):
+    """Recompute rag_conversations from the full rag_logs history (one-off backfill).
+
+    Marks the rollup ready when done; on failure lists keep aggregating rag_logs.
+    """
+    global conversation_rollups_ready
+    started = time.perf_counter()
+    pipeline = [
+        {"$match": {"conversation_id": {"$nin": [None, ""]}}},
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "conversation_id": "$conversation_id"},
+            "title": {"$first": "$query"},
+            "started_at": {"$min": "$timestamp"},
+            "last_active": {"$max": "$timestamp"},
+            "message_count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "conversation_id": "$_id.conversation_id",
+            "title": {"$substrCP": [{"$ifNull": ["$title", "Untitled conversation"]}, 0, 120]},
+            "started_at": 1,
+            "last_active": 1,
+            "message_count": 1
+        }},
+        {"$merge": {"into": "rag_conversations", "on": ["user_id", "conversation_id"], "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+    try:
+        async for _ in db.rag_logs.aggregate(pipeline, allowDiskUse=True):
+            pass
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"⚠️ Conversation rollup rebuild failed, listing from rag_logs: {e}")
+        return
+    conversation_rollups_ready = True
+    print(f"✅ Rebuilt conversation rollups in {time.perf_counter() - started:.1f}s")
+
 async def initialize_services():
     """Initialize all services on startup"""
-    global embedding_model, groq_client, db_client
-    
+    global embedding_model, groq_async_client, db_client, knowledge_index
+
     print("🚀 Initializing Glinax RAG+CAG Services...")
-    
+
     try:
+        # Compile the keyword index (no model required)
+        print(f"📚 Keyword index ready: {len(get_keyword_index().postings)} terms")
+
         # Initialize embedding model
         print("📊 Loading embedding model...")
         embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
         print("✅ Embedding model loaded successfully")
-        
+
+        # Embed the knowledge base once for dense retrieval
+        try:
+            knowledge_index = build_knowledge_index(GHANA_UNIVERSITIES_KNOWLEDGE)
+            print(f"✅ Indexed {len(knowledge_index.chunks)} knowledge chunks ({knowledge_index.backend} backend)")
+        except Exception as e:
+            knowledge_index = None
+            print(f"⚠️ Knowledge index build failed, using keyword search: {e}")
+
         # Initialize Groq client
         groq_api_key = os.getenv('GROQ_API_KEY')
         if groq_api_key:
-            groq_client = Groq(api_key=groq_api_key)
-            print("✅ Groq client initialized")
+            groq_async_client = AsyncGroq(api_key=groq_api_key, timeout=GROQ_TIMEOUT_SECONDS)
+            print(f"✅ Groq client initialized (max {GROQ_MAX_CONCURRENCY} concurrent generations)")
         else:
             print("⚠️ GROQ_API_KEY not found, will use fallback responses")
         
@@ -269,6 +1405,7 @@ async def initialize_services():
             db_client = motor.motor_asyncio.AsyncIOMotorClient(mongodb_uri)
             await db_client.admin.command('ping')
             print("✅ MongoDB connected successfully")
+            await ensure_indexes()
         else:
             print("⚠️ MongoDB URI not found")
         
@@ -277,30 +1414,17 @@ async def initialize_services():
     except Exception as e:
         print(f"❌ Service initialization error: {e}")
 
-def search_local_knowledge(query: str, university_name: str = None) -> Dict[str, Any]:
+@STAGE_SECONDS.timed(stage="local_search")
+def search_local_knowledge(query: str, university_name: str = None, query_vector: Optional[np.ndarray] = None) -> Dict[str, Any]:
     """Search local Ghana universities knowledge base"""
     
     query_lower = query.lower()
     results = []
     confidence = 0.0
     
-    # Check for university name variations
-    uni_name_variations = {
-        "university of ghana": "University of Ghana",
-        "ug": "University of Ghana", 
-        "legon": "University of Ghana",
-        "knust": "Kwame Nkrumah University of Science and Technology",
-        "kwame nkrumah": "Kwame Nkrumah University of Science and Technology",
-        "kumasi": "Kwame Nkrumah University of Science and Technology",
-        "ucc": "University of Cape Coast",
-        "cape coast": "University of Cape Coast",
-        "uds": "University for Development Studies",
-        "tamale": "University for Development Studies"
-    }
-    
     # Find university from query if not provided
     if not university_name:
-        for variation, full_name in uni_name_variations.items():
+        for variation, full_name in UNIVERSITY_NAME_VARIATIONS.items():
             if variation in query_lower:
                 university_name = full_name
                 break
@@ -315,72 +1439,154 @@ def search_local_knowledge(query: str, university_name: str = None) -> Dict[str,
                 "relevance": 0.98
             })
             confidence = 0.98
-    
-    # Search all universities for relevant information
-    for uni_name, uni_data in GHANA_UNIVERSITIES_KNOWLEDGE.items():
-        if university_name and uni_name == university_name:
-            continue  # Already added above
-            
-        relevance = 0.0
-        
-        # Program-specific matching
-        if "programs" in uni_data and isinstance(uni_data["programs"], dict):
-            for program_name, program_data in uni_data["programs"].items():
-                program_text = f"{program_name} {json.dumps(program_data)}".lower()
-                if any(word in program_text for word in query_lower.split()):
-                    relevance += 0.4
-        
-        # Check for keyword matches
-        text_to_search = f"{uni_name} {json.dumps(uni_data)}".lower()
-        
-        # High-value keywords
-        high_keywords = ["computer science", "engineering", "medicine", "business"]
-        for keyword in high_keywords:
-            if keyword in query_lower and keyword in text_to_search:
-                relevance += 0.6
-        
-        # Standard keywords
-        keywords = ["admission", "fee", "fees", "cost", "program", "scholarship", "contact", "requirement"]
-        for keyword in keywords:
-            if keyword in query_lower and keyword in text_to_search:
-                relevance += 0.3
-        
-        # Direct text matching for specific terms
-        query_words = query_lower.split()
-        for word in query_words:
-            if len(word) > 3 and word in text_to_search:
-                relevance += 0.2
-        
-        if relevance > 0.4:
+
+    # Score chunks densely (one batched dot product) and lexically (BM25 posting-list merge)
+    matches = []
+    if knowledge_index is not None and embedding_model is not None:
+        matches.extend(m for m in search_knowledge_vectors(query, query_vector=query_vector) if m["score"] >= VECTOR_MIN_SIMILARITY)
+    matches.extend(m for m in get_keyword_index().search(query) if m["score"] >= LEXICAL_MIN_RELEVANCE)
+
+    # Fuse per university: relevance is the best chunk score from either retriever
+    matches_by_uni: Dict[str, List[Dict[str, Any]]] = {}
+    for match in sorted(matches, key=lambda m: m["score"], reverse=True):
+        uni_matches = matches_by_uni.setdefault(match["university"], [])
+        if all(m["title"] != match["title"] for m in uni_matches):
+            uni_matches.append(match)
+
+    for result in results:
+        result["matches"] = matches_by_uni.pop(result["source"], [])
+
+    for uni_name, uni_matches in matches_by_uni.items():
+        uni_data = GHANA_UNIVERSITIES_KNOWLEDGE.get(uni_name)
+        if uni_data:
             results.append({
                 "source": uni_name,
                 "data": uni_data,
-                "relevance": min(relevance, 0.95)
+                "relevance": round(min(uni_matches[0]["score"], 0.95), 4),
+                "matches": uni_matches
             })
-    
+
     # Sort by relevance and take top 3
     results = sorted(results, key=lambda x: x["relevance"], reverse=True)[:3]
-    
+
     return {
         "results": results,
         "confidence": confidence or (max([r["relevance"] for r in results]) if results else 0.0)
     }
 
+OFFICIAL_UNIVERSITY_DOMAINS = ['ug.edu.gh', 'knust.edu.gh', 'ucc.edu.gh', 'uds.edu.gh', 'upsa.edu.gh', 'uenr.edu.gh', 'uhas.edu.gh']
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared keep-alive HTTP client for outbound web search calls"""
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(15.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+        )
+    return http_client
+
+def normalize_search_query(query: str) -> str:
+    """Cache/coalescing key for a web query"""
+    return " ".join(query.lower().split())
+
+@STAGE_SECONDS.timed(stage="web_search")
 async def search_web_realtime(query: str) -> Dict[str, Any]:
-    """Search web for real-time information using DuckDuckGo or SerpAPI if available"""
+    """Search web for real-time information using DuckDuckGo and/or SerpAPI, cached and coalesced"""
+    key = normalize_search_query(query)
+
+    cached = web_search_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        web_search_cache.move_to_end(key)
+        web_search_stats["cache_hits"] += 1
+        return cached[1]
+
+    # Request coalescing: concurrent identical queries share one upstream search, which is
+    # cancelled once every caller waiting on it has gone (e.g. speculative search on the fast path)
+    inflight = web_search_inflight.get(key)
+    if inflight is None:
+        task = asyncio.ensure_future(_search_web_uncached(query))
+        inflight = web_search_inflight[key] = {"task": task, "waiters": 0}
+        task.add_done_callback(lambda done: _finish_web_search(key, inflight, done))
+    else:
+        web_search_stats["coalesced"] += 1
+
+    inflight["waiters"] += 1
+    try:
+        return await asyncio.shield(inflight["task"])
+    finally:
+        inflight["waiters"] -= 1
+        if inflight["waiters"] == 0 and not inflight["task"].done():
+            inflight["task"].cancel()
+
+def _finish_web_search(key: str, inflight: Dict[str, Any], task: asyncio.Future) -> None:
+    """Done-callback of an upstream search: release the in-flight slot and cache a useful result"""
+    if web_search_inflight.get(key) is inflight:
+        del web_search_inflight[key]
+    if task.cancelled() or task.exception() is not None:
+        return
+    result = task.result()
+    if result.get("results"):
+        web_search_cache[key] = (time.monotonic() + WEB_SEARCH_CACHE_TTL_SECONDS, result)
+        web_search_cache.move_to_end(key)
+        while len(web_search_cache) > WEB_SEARCH_CACHE_MAX_ENTRIES:
+            web_search_cache.popitem(last=False)
+
+@STAGE_SECONDS.timed(stage="web_search_upstream")
+async def _search_web_uncached(query: str) -> Dict[str, Any]:
+    """Run the configured providers in parallel and merge whatever finishes before the deadline"""
+    providers = []
     try:
         serpapi_key = os.getenv('SERPAPI_KEY')
         if serpapi_key:
-            return await search_with_serpapi(query, serpapi_key)
+            providers.append(asyncio.ensure_future(search_with_serpapi(query, serpapi_key)))
+        if not serpapi_key or WEB_SEARCH_PARALLEL:
+            providers.append(asyncio.ensure_future(search_with_duckduckgo(query)))
+        web_search_stats["upstream_calls"] += len(providers)
+
+        done, pending = await asyncio.wait(providers, timeout=WEB_SEARCH_DEADLINE_SECONDS)
+        if pending:
+            web_search_stats["deadline_exceeded"] += 1
+            print(f"⏱️ Web search deadline ({WEB_SEARCH_DEADLINE_SECONDS}s) reached, returning partial results")
+            for task in pending:
+                task.cancel()
+
+        # Merge in provider order (SerpAPI first), de-duplicating by URL
+        results, seen_urls, confidence = [], set(), 0.0
+        for task in providers:
+            if task not in done or task.cancelled() or task.exception():
+                continue
+            provider_result = task.result()
+            confidence = max(confidence, provider_result.get("confidence", 0.0))
+            for item in provider_result.get("results", []):
+                url = item.get("url") or ""
+                if url and url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                results.append(item)
+        return {"results": results, "confidence": confidence if results else 0.0}
+    except asyncio.CancelledError:
+        for task in providers:
+            task.cancel()
+        raise
+    except Exception as e:
+        ERRORS.inc(stage="web_search")
+        print(f"⚠️ Web search error (continuing with local knowledge): {e}")
+        return {"results": [], "confidence": 0.0}
 
-        # Use DuckDuckGo Search as default real web search
+async def search_with_duckduckgo(query: str) -> Dict[str, Any]:
+    """Search using DuckDuckGo (the client is synchronous, so it runs in a worker thread)"""
+    try:
         from duckduckgo_search import DDGS
-        ddgs = DDGS()
         current_year = datetime.now().year
         enhanced_query = f"{query} Ghana universities {current_year} official site"
-        results = []
         # Use text search for snippets and URLs; limit to reasonable amount
-        for item in ddgs.text(enhanced_query, region='wt-wt', safesearch='moderate', max_results=8):
+        items = await asyncio.to_thread(
+            DDGS(timeout=int(WEB_SEARCH_DEADLINE_SECONDS) or 1).text,
+            enhanced_query, region='wt-wt', safesearch='moderate', max_results=8
+        )
+        results = []
+        for item in items or []:
             if not isinstance(item, dict):
                 continue
             url = item.get('href') or item.get('url') or ''
@@ -388,7 +1594,7 @@ async def search_web_realtime(query: str) -> Dict[str, Any]:
             snippet = item.get('body') or item.get('snippet') or ''
             # Prioritize official Ghana university domains
             domain = (url or '').lower()
-            source_type = 'official_website' if any(d in domain for d in ['ug.edu.gh','knust.edu.gh','ucc.edu.gh','uds.edu.gh','upsa.edu.gh','uenr.edu.gh','uhas.edu.gh']) else 'web_search'
+            source_type = 'official_website' if any(d in domain for d in OFFICIAL_UNIVERSITY_DOMAINS) else 'web_search'
             results.append({
                 'title': title,
                 'url': url,
@@ -398,16 +1604,17 @@ async def search_web_realtime(query: str) -> Dict[str, Any]:
             })
         return {'results': results, 'confidence': 0.75 if results else 0.0}
     except Exception as e:
-        print(f"⚠️ Web search error (continuing with local knowledge): {e}")
+        ERRORS.inc(stage="duckduckgo")
+        print(f"⚠️ DuckDuckGo search error: {e}")
         return {"results": [], "confidence": 0.0}
 
 async def search_with_serpapi(query: str, api_key: str) -> Dict[str, Any]:
-    """Search using SerpAPI"""
+    """Search using SerpAPI over the shared async HTTP client"""
     try:
         # Enhanced query for current year information
         current_year = datetime.now().year
         enhanced_query = f"{query} Ghana universities admission {current_year} latest"
-        
+
         url = "https://serpapi.com/search"
         params = {
             "engine": "google",
@@ -418,15 +1625,15 @@ async def search_with_serpapi(query: str, api_key: str) -> Dict[str, Any]:
             "hl": "en",
             "gl": "gh"
         }
-        
-        response = requests.get(url, params=params, timeout=15)
+
+        response = await get_http_client().get(url, params=params, timeout=15)
         data = response.json()
-        
+
         results = []
         for result in data.get("organic_results", [])[:5]:
             # Filter for Ghana university domains
             url = result.get("link", "")
-            if any(domain in url.lower() for domain in ["ug.edu.gh", "knust.edu.gh", "ucc.edu.gh", "uds.edu.gh", "upsa.edu.gh"]):
+            if any(domain in url.lower() for domain in OFFICIAL_UNIVERSITY_DOMAINS):
                 results.append({
                     "title": result.get("title", ""),
                     "url": url,
@@ -442,13 +1649,14 @@ async def search_with_serpapi(query: str, api_key: str) -> Dict[str, Any]:
                     "source": "web_search",
                     "priority": "medium"
                 })
-        
+
         return {
             "results": results,
             "confidence": 0.8 if results else 0.0
         }
-        
+
     except Exception as e:
+        ERRORS.inc(stage="serpapi")
         print(f"❌ SerpAPI error: {e}")
         return {"results": [], "confidence": 0.0}
 
@@ -456,15 +1664,7 @@ async def search_with_serpapi(query: str, api_key: str) -> Dict[str, Any]:
 # async def search_web_direct(query: str) -> Dict[str, Any]:
 
     pass  # deprecated simulated search body removed
-def generate_response_with_groq(query: str, context: str, sources: List[Dict]) -> str:
-    """Generate response using Groq LLM with enhanced file processing capabilities"""
-    
-    try:
-        if not groq_client:
-            return generate_smart_fallback_response(query, context, sources)
-        
-        # Enhanced system prompt for Ghana context with file processing
-        system_prompt = """You are Glinax, a highly professional AI assistant specializing in Ghanaian university admissions and education. You have advanced capabilities to analyze uploaded files and provide contextual guidance.
+GLINAX_SYSTEM_PROMPT = """You are Glinax, a highly professional AI assistant specializing in Ghanaian university admissions and education. You have advanced capabilities to analyze uploaded files and provide contextual guidance.
 
 Your core competencies:
 - Expert knowledge of Ghana's university system and admission requirements
@@ -500,128 +1700,295 @@ For university information, ALWAYS provide:
 
 When files are uploaded, provide specific analysis and recommendations based on the content."""
 
-        # Prepare user message with context
-        user_message = f"""
+# Prompt Assembly
+PROMPT_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]|\n\s*")  # ~1 token per 4-character word piece, symbol or line break (with its indent)
+PROMPT_INSTRUCTIONS = "Please provide a helpful, accurate response based on the available information."
+PROMPT_MAX_SOURCES = 12
+
+def count_tokens(text: str) -> int:
+    """Estimated prompt tokens; errs high for long words, so budgets stay under the model's real count"""
+    return len(PROMPT_TOKEN_PATTERN.findall(text)) if text else 0
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text after max_tokens estimated tokens"""
+    if max_tokens <= 0:
+        return ""
+    for position, match in enumerate(PROMPT_TOKEN_PATTERN.finditer(text)):
+        if position == max_tokens:
+            return text[:match.start()].rstrip() + " …"
+    return text
+
+def knowledge_context_blocks(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Compact context for one local search result: every knowledge chunk of the university,
+    scored by the retriever where it matched and below every match otherwise"""
+    scores = {m["text"]: m["score"] for m in result.get("matches", [])}
+    base = result.get("relevance", 0.0) * 0.5
+    return [
+        {"source": result["source"], "text": chunk["text"], "score": scores.get(chunk["text"], base)}
+        for chunk in build_knowledge_chunks({result["source"]: result.get("data", {})})
+    ]
+
+def context_text(blocks: List[Dict[str, Any]]) -> str:
+    """Plain-text context (fallback responses, logs) from ranked context blocks"""
+    return "\n\n".join(block["text"] for block in blocks)
+
+def compact_sources(sources: List[Dict]) -> str:
+    """One line per distinct source instead of the indented JSON dump"""
+    lines, seen = [], set()
+    for source in sources or []:
+        key = (source.get("source"), source.get("url"))
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(f"- {source.get('source')} ({source.get('type', 'source')})" + (f" {source['url']}" if source.get("url") else ""))
+    if len(lines) > PROMPT_MAX_SOURCES:
+        lines = lines[:PROMPT_MAX_SOURCES] + [f"- ...and {len(lines) - PROMPT_MAX_SOURCES} more"]
+    return "\n".join(lines)
+
+def assemble_prompt(query: str, context: Any, sources: List[Dict], documents: Optional[List[Dict[str, str]]] = None,
+                    budget: Optional[int] = None) -> Dict[str, Any]:
+    """Groq messages that fit a prompt-token budget.
+
+    `context` is a list of {"text", "score"} blocks (or plain text, split on blank lines and
+    kept in order). Uploaded documents come first, capped at PROMPT_DOCUMENT_SHARE of the room
+    left after the system prompt, question and sources; context blocks follow best score first,
+    the first one that does not fit is truncated and the rest are dropped.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    if isinstance(context, str):
+        parts = [p for p in context.split("\n\n") if p.strip()]
+        blocks = [{"text": p, "score": -i} for i, p in enumerate(parts)]
+    else:
+        blocks = sorted(context or [], key=lambda b: b.get("score", 0.0), reverse=True)
+
+    query = truncate_to_tokens(query, budget // 4)
+    sources_text = compact_sources(sources)
+    frame = f"\nQuestion: {query}\n\nAvailable Information:\n\n\nSources:\n{sources_text}\n\n{PROMPT_INSTRUCTIONS}\n"
+    used = count_tokens(GLINAX_SYSTEM_PROMPT) + count_tokens(frame)
+    room = max(budget - used, 0)
+
+    # Every section costs its tokens plus one for the blank line that separates it; a cut costs
+    # one more for the ellipsis
+    sections, truncated, dropped = [], 0, 0
+    if documents:
+        document_room = int(room * PROMPT_DOCUMENT_SHARE) if blocks else room
+        for document in documents:
+            text = f"[Document: {document['name']}]\n{document['text']}"
+            tokens = count_tokens(text) + 1
+            if tokens > document_room:
+                text, truncated = truncate_to_tokens(text, document_room - 2), truncated + 1
+                tokens = count_tokens(text) + 1
+            if text:
+                sections.append(text)
+                document_room -= tokens
+                room -= tokens
+
+    for block in blocks:
+        tokens = count_tokens(block["text"]) + 1
+        if tokens <= room:
+            sections.append(block["text"])
+            room -= tokens
+        elif room >= 32:
+            sections.append(truncate_to_tokens(block["text"], room - 2))
+            truncated += 1
+            room = 0
+        else:
+            dropped += 1
+
+    information = "\n\n".join(sections)
+    user_message = f"""
 Question: {query}
 
 Available Information:
-{context}
+{information}
 
-Sources: {json.dumps(sources, indent=2)}
+Sources:
+{sources_text}
 
-Please provide a helpful, accurate response based on the available information.
+{PROMPT_INSTRUCTIONS}
 """
+    prompt_tokens = count_tokens(GLINAX_SYSTEM_PROMPT) + count_tokens(user_message)
+    PROMPT_TOKENS.observe(prompt_tokens)
+    return {
+        "messages": [
+            {"role": "system", "content": GLINAX_SYSTEM_PROMPT},
+            {"role": "user", "content": user_message}
+        ],
+        "prompt_tokens": prompt_tokens,
+        "context_blocks": len(sections),
+        "truncated": truncated,
+        "dropped": dropped
+    }
 
-        # Generate response with current supported model
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model="llama-3.1-8b-instant",  # Current working model
-            temperature=0.3,
-            max_tokens=1024
-        )
-        
+@asynccontextmanager
+async def llm_slot():
+    """Acquire a slot in the bounded LLM pool, tracking queue depth and in-flight calls"""
+    llm_pool_stats["waiting"] += 1
+    llm_pool_stats["max_waiting"] = max(llm_pool_stats["max_waiting"], llm_pool_stats["waiting"])
+    try:
+        await llm_semaphore.acquire()
+    finally:
+        llm_pool_stats["waiting"] -= 1
+    llm_pool_stats["in_flight"] += 1
+    try:
+        yield
+    finally:
+        llm_pool_stats["in_flight"] -= 1
+        llm_semaphore.release()
+
+async def complete_with_groq(query: str, context: str, sources: List[Dict], prompt: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Async Groq completion through the bounded pool; None when unavailable, timed out or failed.
+
+    Pass `prompt` (from assemble_prompt) to reuse a prompt the caller already assembled and reported.
+    """
+
+    if not groq_async_client:
+        return None
+
+    try:
+        async with llm_slot():
+            started = time.perf_counter_ns()
+            chat_completion = await asyncio.wait_for(
+                groq_async_client.chat.completions.create(
+                    messages=(prompt or assemble_prompt(query, context, sources))["messages"],
+                    model=GROQ_MODEL,
+                    temperature=0.3,
+                    max_tokens=1024
+                ),
+                timeout=GROQ_TIMEOUT_SECONDS
+            )
+            STAGE_SECONDS.observe_ns(started, stage="groq_generation")
+        llm_pool_stats["completed"] += 1
+        GROQ_REQUESTS.inc(mode="complete", outcome="completed")
         return chat_completion.choices[0].message.content
-        
+
+    except asyncio.TimeoutError:
+        llm_pool_stats["timeouts"] += 1
+        GROQ_REQUESTS.inc(mode="complete", outcome="timeout")
+        ERRORS.inc(stage="groq_generation")
+        print(f"⏱️ Groq generation timed out after {GROQ_TIMEOUT_SECONDS}s, using fallback")
+        return None
     except Exception as e:
+        llm_pool_stats["errors"] += 1
+        GROQ_REQUESTS.inc(mode="complete", outcome="error")
+        ERRORS.inc(stage="groq_generation")
         print(f"❌ Groq generation error: {e}")
+        return None
+
+async def generate_response_with_groq_async(query: str, context: str, sources: List[Dict], prompt: Optional[Dict[str, Any]] = None) -> str:
+    """Generate response with the async Groq client without blocking the event loop"""
+    reply = await complete_with_groq(query, context, sources, prompt)
+    if reply is None:
         return generate_smart_fallback_response(query, context, sources)
+    return reply
 
-def generate_smart_fallback_response(query: str, context: str, sources: List[Dict]) -> str:
-    """Generate intelligent fallback response that actually uses provided sources.
+async def stream_response_with_groq(query: str, context: str, sources: List[Dict], status: Optional[Dict[str, Any]] = None,
+                                    prompt: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """Yield reply tokens from a streamed Groq completion; falls back to one non-streamed chunk.
 
-    - Prefer official university sources from web search when LLM is unavailable.
-    - Fall back to local knowledge base summaries.
-    - Include URLs and snippets where available.
+    If a status dict is given, status["completed"] is set once the LLM stream finished cleanly.
     """
 
-    query_lower = query.lower()
-
-    # 1) If web sources are available, synthesize an answer using them (prioritize official)
-    web_items = []
-    official_items = []
-    for s in sources or []:
-        if s.get('type') in ('web_search', 'official_website') or s.get('source') in ('web_search', 'official_website'):
-            title = s.get('source') if s.get('type') == 'local_knowledge' else s.get('source')
-            web_items.append({
-                'title': title or 'Web Result',
-                'url': s.get('url') or '',
-                'snippet': s.get('snippet') or s.get('body') or ''
-            })
-    # If sources did not include snippet/body, try to parse from context lines
-    if not web_items and context:
-        for line in context.splitlines():
-            if line.startswith('Web Result:'):
-                web_items.append({'title': 'Web Result', 'url': '', 'snippet': line.replace('Web Result:', '').strip()})
-
-    for item in web_items:
-        url = (item.get('url') or '').lower()
-        if any(d in url for d in ['ug.edu.gh','knust.edu.gh','ucc.edu.gh','uds.edu.gh','upsa.edu.gh','uenr.edu.gh','uhas.edu.gh']):
-            official_items.append(item)
-
-    if web_items:
-        header = "Here’s what I found from recent web results:"
-        lines = [header, ""]
-        prioritized = (official_items or web_items)[:5]
-        for r in prioritized:
-            title = r.get('title') or 'Web Result'
-            url = r.get('url') or ''
-            snippet = r.get('snippet') or ''
-            bullet = f"• {title}: {snippet}"
-            if url:
-                bullet += f" (Source: {url})"
-            lines.append(bullet)
-        lines.append("")
-        lines.append("If you want, I can fetch more details or verify this from additional sources.")
-        return "\n".join(lines)
+    if not groq_async_client:
+        yield generate_smart_fallback_response(query, context, sources)
+        return
 
-    # 2) Fall back to local knowledge flow (existing structured summaries)
-    # Direct access to knowledge base for accurate responses
-    relevant_universities = []
-
-    # Identify universities mentioned in query
-    university_keywords = {
-        "university of ghana": "University of Ghana",
-        "ug": "University of Ghana",
-        "legon": "University of Ghana",
-        "knust": "Kwame Nkrumah University of Science and Technology",
-        "kwame nkrumah": "Kwame Nkrumah University of Science and Technology",
-        "kumasi": "Kwame Nkrumah University of Science and Technology",
-        "ucc": "University of Cape Coast",
-        "cape coast": "University of Cape Coast",
-        "uds": "University for Development Studies",
-        "tamale": "University for Development Studies"
-    }
-    
-    # Find mentioned universities
-    for keyword, uni_name in university_keywords.items():
-        if keyword in query_lower:
-            if uni_name in GHANA_UNIVERSITIES_KNOWLEDGE:
-                relevant_universities.append(uni_name)
-    
-    # If no specific university mentioned, include major ones based on query type
-    if not relevant_universities:
-        if any(word in query_lower for word in ["computer", "technology", "engineering"]):
-            relevant_universities = ["University of Ghana", "Kwame Nkrumah University of Science and Technology"]
-        elif any(word in query_lower for word in ["medicine", "medical", "doctor"]):
-            relevant_universities = ["University of Ghana", "Kwame Nkrumah University of Science and Technology"]
-        else:
-            relevant_universities = ["University of Ghana", "Kwame Nkrumah University of Science and Technology"]
-    
-    # Computer Science specific queries
-    if any(word in query_lower for word in ["computer science", "computer", "programming", "software"]):
-        response = "COMPUTER SCIENCE PROGRAMS IN GHANA\n\n"
-        
-        # Always show UG Computer Science data
-        ug_data = GHANA_UNIVERSITIES_KNOWLEDGE.get("University of Ghana", {})
-        if "programs" in ug_data and "Computer Science" in ug_data["programs"]:
-            cs_program = ug_data["programs"]["Computer Science"]
-            ug_contact = ug_data.get('contact', {})
-            ug_fees = ug_data.get('current_fees_2024', {})
-            
-            response += f"""UNIVERSITY OF GHANA - COMPUTER SCIENCE
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + GROQ_TIMEOUT_SECONDS
+    emitted = False
+    try:
+        async with llm_slot():
+            started = time.perf_counter_ns()
+            stream = await asyncio.wait_for(
+                groq_async_client.chat.completions.create(
+                    messages=(prompt or assemble_prompt(query, context, sources))["messages"],
+                    model=GROQ_MODEL,
+                    temperature=0.3,
+                    max_tokens=1024,
+                    stream=True
+                ),
+                timeout=GROQ_TIMEOUT_SECONDS
+            )
+            iterator = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=max(deadline - loop.time(), 0.001))
+                except StopAsyncIteration:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not emitted:
+                        STAGE_SECONDS.observe_ns(started, stage="groq_first_token")
+                    emitted = True
+                    yield delta
+            STAGE_SECONDS.observe_ns(started, stage="groq_stream")
+        llm_pool_stats["completed"] += 1
+        GROQ_REQUESTS.inc(mode="stream", outcome="completed")
+        if status is not None:
+            status["completed"] = True
+
+    except asyncio.TimeoutError:
+        llm_pool_stats["timeouts"] += 1
+        GROQ_REQUESTS.inc(mode="stream", outcome="timeout")
+        ERRORS.inc(stage="groq_stream")
+        print(f"⏱️ Groq stream timed out after {GROQ_TIMEOUT_SECONDS}s")
+        if not emitted:
+            yield generate_smart_fallback_response(query, context, sources)
+    except Exception as e:
+        llm_pool_stats["errors"] += 1
+        GROQ_REQUESTS.inc(mode="stream", outcome="error")
+        ERRORS.inc(stage="groq_stream")
+        print(f"❌ Groq streaming error: {e}")
+        if not emitted:
+            yield generate_smart_fallback_response(query, context, sources)
+
+# Fallback Templates
+FALLBACK_INTENT_KEYWORDS = [
+    ("computer", ["computer science", "computer", "programming", "software"]),
+    ("fees", ["fee", "cost", "money", "pay", "tuition"]),
+    ("admission", ["admission", "apply", "requirement", "entry"]),
+]
+FALLBACK_TECH_UNIVERSITIES = ("University of Ghana", "Kwame Nkrumah University of Science and Technology")
+
+def fallback_intent(query: str) -> str:
+    """Which structured summary the local fallback serves for a query"""
+    query_lower = query.lower()
+    for intent, keywords in FALLBACK_INTENT_KEYWORDS:
+        if any(word in query_lower for word in keywords):
+            return intent
+    return "general"
+
+def _contact_field(uni_data: Dict[str, Any], field: str, default: str) -> str:
+    """Contact detail from either a contact dict or a bare phone-number string"""
+    contact = uni_data.get("contact")
+    if isinstance(contact, dict):
+        return contact.get(field, default)
+    if isinstance(contact, str) and contact and field == "phone":
+        return contact
+    return default
+
+def _current_fees(uni_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The newest current_fees_<year> block (empty when the university only lists a fee range)"""
+    keys = sorted(k for k in uni_data if k.startswith("current_fees") and isinstance(uni_data[k], dict))
+    return uni_data[keys[-1]] if keys else {}
+
+def _admission_requirements(uni_data: Dict[str, Any]) -> Dict[str, Any]:
+    requirements = uni_data.get("admission_requirements", {})
+    return requirements if isinstance(requirements, dict) else {"general": requirements}
+
+def _render_computer_fallback(knowledge: Dict[str, Any], universities: tuple) -> str:
+    ug_name, knust_name = FALLBACK_TECH_UNIVERSITIES
+    response = "COMPUTER SCIENCE PROGRAMS IN GHANA\n\n"
+
+    # Always show UG Computer Science data
+    ug_data = knowledge.get(ug_name, {}) if ug_name in universities else {}
+    ug_programs = ug_data.get("programs")
+    if isinstance(ug_programs, dict) and "Computer Science" in ug_programs:
+        cs_program = ug_programs["Computer Science"]
+        ug_fees = _current_fees(ug_data)
+        ug_admission = _admission_requirements(ug_data)
+
+        response += f"""UNIVERSITY OF GHANA - COMPUTER SCIENCE
             
 Duration: {cs_program.get('duration', '4 years')}
 Requirements: {cs_program.get('requirements', 'WASSCE Credits in Math, Physics, English')}
@@ -630,21 +1997,22 @@ Total Cost: {ug_fees.get('ghanaian_students', 'GHS 6,500-15,000')} + Accommodati
 Career Options: {cs_program.get('career_prospects', 'Software Developer, Data Scientist')}
 
 Application Info:
-- Phone: {ug_contact.get('phone', '+233-30-213-8501')}
-- Email: {ug_contact.get('email', 'admissions@ug.edu.gh')}
-- Deadline: {ug_data.get('admission_requirements', {}).get('application_deadline', 'March 31, 2024')}
-- Fee: {ug_data.get('admission_requirements', {}).get('application_fee', 'GHS 200')}
+- Phone: {_contact_field(ug_data, 'phone', '+233-30-213-8501')}
+- Email: {_contact_field(ug_data, 'email', 'admissions@ug.edu.gh')}
+- Deadline: {ug_admission.get('application_deadline', 'March 31, 2024')}
+- Fee: {ug_admission.get('application_fee', 'GHS 200')}
 
 """
-        
-        # Always show KNUST Computer Engineering data
-        knust_data = GHANA_UNIVERSITIES_KNOWLEDGE.get("Kwame Nkrumah University of Science and Technology", {})
-        if "programs" in knust_data and "Computer Engineering" in knust_data["programs"]:
-            ce_program = knust_data["programs"]["Computer Engineering"]
-            knust_contact = knust_data.get('contact', {})
-            knust_fees = knust_data.get('current_fees_2024', {})
-            
-            response += f"""KNUST - COMPUTER ENGINEERING
+
+    # Always show KNUST Computer Engineering data
+    knust_data = knowledge.get(knust_name, {}) if knust_name in universities else {}
+    knust_programs = knust_data.get("programs")
+    if isinstance(knust_programs, dict) and "Computer Engineering" in knust_programs:
+        ce_program = knust_programs["Computer Engineering"]
+        knust_fees = _current_fees(knust_data)
+        knust_admission = _admission_requirements(knust_data)
+
+        response += f"""KNUST - COMPUTER ENGINEERING
             
 Duration: {ce_program.get('duration', '4 years')}
 Requirements: {ce_program.get('requirements', 'WASSCE A1-C6 in Math, Physics, Chemistry')}
@@ -653,59 +2021,67 @@ Total Cost: {knust_fees.get('ghanaian_students', 'GHS 8,000-18,000')} + Accommod
 Career Options: {ce_program.get('career_prospects', 'Software Engineer, Systems Analyst')}
 
 Application Info:
-- Phone: {knust_contact.get('phone', '+233-32-206-0331')}
-- Email: {knust_contact.get('email', 'admissions@knust.edu.gh')}
-- Deadline: {knust_data.get('admission_requirements', {}).get('application_deadline', 'April 15, 2024')}
-- Fee: {knust_data.get('admission_requirements', {}).get('application_fee', 'GHS 250')}
+- Phone: {_contact_field(knust_data, 'phone', '+233-32-206-0331')}
+- Email: {_contact_field(knust_data, 'email', 'admissions@knust.edu.gh')}
+- Deadline: {knust_admission.get('application_deadline', 'April 15, 2024')}
+- Fee: {knust_admission.get('application_fee', 'GHS 250')}
 
 """
-        
-        response += "RECOMMENDATION: Both universities offer excellent tech programs. UG focuses more on computer science theory, while KNUST emphasizes engineering applications."
-        return response
-    
-    # Fees-related queries  
-    elif any(word in query_lower for word in ["fee", "cost", "money", "pay", "tuition"]):
-        response = "UNIVERSITY FEES INFORMATION (2024)\n\n"
-        
-        for uni_name, uni_data in GHANA_UNIVERSITIES_KNOWLEDGE.items():
-            response += f"## {uni_name}\n"
-            
-            if "current_fees_2024" in uni_data:
-                fees = uni_data["current_fees_2024"]
-                response += f"""
+
+    response += "RECOMMENDATION: Both universities offer excellent tech programs. UG focuses more on computer science theory, while KNUST emphasizes engineering applications."
+    return response
+
+def _render_fees_fallback(knowledge: Dict[str, Any], universities: tuple) -> str:
+    parts = ["UNIVERSITY FEES INFORMATION (2024)\n\n"]
+
+    for uni_name in universities:
+        uni_data = knowledge[uni_name]
+        parts.append(f"## {uni_name}\n")
+
+        fees = _current_fees(uni_data)
+        admission = _admission_requirements(uni_data)
+        if fees:
+            parts.append(f"""
 **Ghanaian Students:** {fees.get('ghanaian_students', 'Contact university')}
 **International Students:** {fees.get('international_students', 'Contact university')}
 **Accommodation:** {fees.get('residential_fees', 'GHS 2,500 - 5,000')}
 **Other Fees:** {fees.get('other_fees', 'Registration and library fees apply')}
 
-**Application Fee:** {uni_data.get('admission_requirements', {}).get('application_fee', 'Contact university')}
-**Deadline:** {uni_data.get('admission_requirements', {}).get('application_deadline', 'Check university website')}
+**Application Fee:** {admission.get('application_fee', 'Contact university')}
+**Deadline:** {admission.get('application_deadline', 'Check university website')}
 
-Contact: {uni_data.get('contact', {}).get('phone', 'See university website')}
-"""
-        
-        if not GHANA_UNIVERSITIES_KNOWLEDGE:
-            response += """
+Contact: {_contact_field(uni_data, 'phone', 'See university website')}
+""")
+        elif isinstance(uni_data.get("fees"), str):
+            parts.append(f"""
+**Tuition:** {uni_data['fees']}
+
+Contact: {_contact_field(uni_data, 'phone', 'See university website')}
+""")
+
+    if not universities:
+        parts.append("""
 **General Fee Ranges for Ghanaian Public Universities:**
 - Arts/Business Programs: GHS 6,000 - 8,000 per year
 - Science Programs: GHS 8,000 - 12,000 per year  
 - Engineering: GHS 10,000 - 15,000 per year
 - Medicine: GHS 15,000 - 18,000 per year
 - Accommodation: GHS 2,500 - 5,000 per year
-"""
-        
-        return response + "\n**Note:** Fees change annually. Always confirm current rates with the university admissions office."
-    
-    # Admission requirements queries
-    elif any(word in query_lower for word in ["admission", "apply", "requirement", "entry"]):
-        response = "UNIVERSITY ADMISSION REQUIREMENTS\n\n"
-        
-        for uni_name, uni_data in GHANA_UNIVERSITIES_KNOWLEDGE.items():
-            response += f"## {uni_name}\n"
-            
-            if "admission_requirements" in uni_data:
-                req = uni_data["admission_requirements"]
-                response += f"""
+""")
+
+    parts.append("\n**Note:** Fees change annually. Always confirm current rates with the university admissions office.")
+    return "".join(parts)
+
+def _render_admission_fallback(knowledge: Dict[str, Any], universities: tuple) -> str:
+    parts = ["UNIVERSITY ADMISSION REQUIREMENTS\n\n"]
+
+    for uni_name in universities:
+        uni_data = knowledge[uni_name]
+        parts.append(f"## {uni_name}\n")
+
+        if "admission_requirements" in uni_data:
+            req = _admission_requirements(uni_data)
+            parts.append(f"""
 **General Requirements:** {req.get('general', 'WASSCE with 6 credits including English & Math')}
 **Application Deadline:** {req.get('application_deadline', 'Check university website')}
 **Application Fee:** {req.get('application_fee', 'GHS 200-300')}
@@ -713,12 +2089,12 @@ Contact: {uni_data.get('contact', {}).get('phone', 'See university website')}
 
 **How to Apply:**
 1. Visit: {uni_data.get('website', 'university website')}
-2. Call: {uni_data.get('contact', {}).get('phone', 'university admissions')}
-3. Email: {uni_data.get('contact', {}).get('email', 'admissions office')}
-"""
-        
-        if not GHANA_UNIVERSITIES_KNOWLEDGE:
-            response += """
+2. Call: {_contact_field(uni_data, 'phone', 'university admissions')}
+3. Email: {_contact_field(uni_data, 'email', 'admissions office')}
+""")
+
+    if not universities:
+        parts.append("""
 **Standard Requirements for Ghanaian Universities:**
 - WASSCE certificate with minimum 6 credits (A1-C6)
 - English Language and Mathematics are mandatory
@@ -731,30 +2107,30 @@ Contact: {uni_data.get('contact', {}).get('phone', 'See university website')}
 3. Submit required documents
 4. Pay application fees
 5. Wait for admission decisions
-"""
-        
-        return response + "\n**Pro Tip:** Start your applications early and apply to multiple universities to increase your chances!"
-    
-    # Default comprehensive response
-    else:
-        response = "GHANAIAN UNIVERSITIES INFORMATION\n\n"
-        
-        if GHANA_UNIVERSITIES_KNOWLEDGE:
-            for uni_name, uni_data in GHANA_UNIVERSITIES_KNOWLEDGE.items():
-                response += f"""## {uni_name}
+""")
+
+    parts.append("\n**Pro Tip:** Start your applications early and apply to multiple universities to increase your chances!")
+    return "".join(parts)
+
+def _render_general_fallback(knowledge: Dict[str, Any], universities: tuple) -> str:
+    parts = ["GHANAIAN UNIVERSITIES INFORMATION\n\n"]
+
+    for uni_name in universities:
+        uni_data = knowledge[uni_name]
+        parts.append(f"""## {uni_name}
                 
 **Established:** {uni_data.get('established', 'See website')}
 **Location:** {uni_data.get('location', 'Ghana')}
 **Motto:** {uni_data.get('motto', 'Excellence in education')}
 
 **Contact Information:**
-Phone: {uni_data.get('contact', {}).get('phone', 'Check website')}
-Email: {uni_data.get('contact', {}).get('email', 'See official website')}
+Phone: {_contact_field(uni_data, 'phone', 'Check website')}
+Email: {_contact_field(uni_data, 'email', 'See official website')}
 Website: {uni_data.get('website', 'Official website')}
 
-"""
-        
-        response += """
+""")
+
+    parts.append("""
 ## What I Can Help You With:
 
 - **Program Information** - Ask about specific courses
@@ -770,30 +2146,226 @@ Website: {uni_data.get('website', 'Official website')}
 - "What scholarships are available at UCC?"
 
 Feel free to ask specific questions about any Ghanaian university!
-"""
-        
-        return response
+""")
+    return "".join(parts)
+
+FALLBACK_RENDERERS = {
+    "computer": _render_computer_fallback,
+    "fees": _render_fees_fallback,
+    "admission": _render_admission_fallback,
+    "general": _render_general_fallback,
+}
+
+class FallbackTemplateCache:
+    """Local-knowledge fallback answers pre-rendered per (intent, universities).
+
+    The summaries only depend on the knowledge snapshot, so they are compiled once per
+    knowledge_version (eagerly by swap_knowledge) instead of on every fallback request.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.knowledge: Dict[str, Any] = {}
+        self.default_scope: Dict[str, tuple] = {}
+        self.templates: Dict[tuple, str] = {}
+        self.stats = {"hits": 0, "renders": 0, "compiles": 0, "compile_ms": 0.0}
+
+    def compile(self, knowledge: Dict[str, Any], version: int):
+        """Render every intent's default summary for a knowledge snapshot"""
+        started = time.perf_counter()
+        all_universities = tuple(knowledge)
+        self.default_scope = {
+            intent: (tuple(u for u in FALLBACK_TECH_UNIVERSITIES if u in knowledge) if intent == "computer" else all_universities)
+            for intent in FALLBACK_RENDERERS
+        }
+        self.knowledge = knowledge
+        self.templates = {
+            (intent, scope): FALLBACK_RENDERERS[intent](knowledge, scope)
+            for intent, scope in self.default_scope.items()
+        }
+        self.version = version
+        self.stats["compiles"] += 1
+        self.stats["compile_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    def get(self, intent: str, universities: Optional[tuple] = None) -> str:
+        if self.version != knowledge_version:
+            self.compile(GHANA_UNIVERSITIES_KNOWLEDGE, knowledge_version)
+        key = (intent, universities if universities is not None else self.default_scope[intent])
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = FALLBACK_RENDERERS[intent](self.knowledge, tuple(u for u in key[1] if u in self.knowledge))
+            self.stats["renders"] += 1
+        else:
+            self.stats["hits"] += 1
+        return template
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "templates": len(self.templates), "version": self.version}
+
+fallback_templates = FallbackTemplateCache()
+
+# Last resort when even the fallback renderer fails
+MINIMAL_FALLBACK_REPLY = "I apologize, but I'm having technical difficulties. Please try asking about specific universities like University of Ghana, KNUST, UCC, or UDS, and I'll do my best to help with admissions information."
+
+def generate_smart_fallback_response(query: str, context: str, sources: List[Dict]) -> str:
+    """Generate intelligent fallback response that actually uses provided sources.
+
+    - Prefer official university sources from web search when LLM is unavailable.
+    - Fall back to local knowledge base summaries.
+    - Include URLs and snippets where available.
+    """
+
+    SMART_FALLBACKS.inc()
+
+    # 1) If web sources are available, synthesize an answer using them (prioritize official)
+    web_items = []
+    official_items = []
+    for s in sources or []:
+        if s.get('type') in ('web_search', 'official_website') or s.get('source') in ('web_search', 'official_website'):
+            title = s.get('source') if s.get('type') == 'local_knowledge' else s.get('source')
+            web_items.append({
+                'title': title or 'Web Result',
+                'url': s.get('url') or '',
+                'snippet': s.get('snippet') or s.get('body') or ''
+            })
+    # If sources did not include snippet/body, try to parse from context lines
+    if not web_items and context:
+        for line in context.splitlines():
+            if line.startswith('Web Result:'):
+                web_items.append({'title': 'Web Result', 'url': '', 'snippet': line.replace('Web Result:', '').strip()})
+
+    for item in web_items:
+        url = (item.get('url') or '').lower()
+        if any(d in url for d in OFFICIAL_UNIVERSITY_DOMAINS):
+            official_items.append(item)
+
+    if web_items:
+        header = "Here’s what I found from recent web results:"
+        lines = [header, ""]
+        prioritized = (official_items or web_items)[:5]
+        for r in prioritized:
+            title = r.get('title') or 'Web Result'
+            url = r.get('url') or ''
+            snippet = r.get('snippet') or ''
+            bullet = f"• {title}: {snippet}"
+            if url:
+                bullet += f" (Source: {url})"
+            lines.append(bullet)
+        lines.append("")
+        lines.append("If you want, I can fetch more details or verify this from additional sources.")
+        return "\n".join(lines)
+
+    # 2) Fall back to the local knowledge summary for the query intent (pre-rendered per knowledge snapshot)
+    return fallback_templates.get(fallback_intent(query))
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services when app starts"""
     await initialize_services()
+    try:
+        await knowledge_store.reload("startup")
+    except Exception as e:
+        print(f"⚠️ Knowledge store load failed, serving curated knowledge only: {e}")
+    knowledge_store.start()
+    if db_client:
+        rag_log_writer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued logs and release pooled connections when app stops"""
+    await knowledge_store.stop()
+    await rag_log_writer.stop()
+    if conversation_rollup_task is not None and not conversation_rollup_task.done():
+        conversation_rollup_task.cancel()
+    if http_client is not None:
+        await http_client.aclose()
+    if extraction_pool is not None:
+        extraction_pool.shutdown(wait=False, cancel_futures=True)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "glinax-rag", "version": "2.0.0"}
 
+@app.get("/stats")
+async def service_stats():
+    """Runtime counters for the service pools and caches"""
+    return {
+        "llm_pool": {**llm_pool_stats, "max_concurrency": GROQ_MAX_CONCURRENCY, "timeout_seconds": GROQ_TIMEOUT_SECONDS},
+        "answer_cache": answer_cache.snapshot(),
+        "fallback_templates": fallback_templates.snapshot(),
+        "web_search": {**web_search_stats, "cached_queries": len(web_search_cache), "in_flight": len(web_search_inflight)},
+        "extraction_cache": extraction_cache.snapshot(),
+        "rag_logs": rag_log_writer.snapshot(),
+        "knowledge": knowledge_store.snapshot()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latency histograms, routing counters and errors"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/eligibility")
+async def eligibility(
+    aggregate: int = Query(..., ge=BEST_AGGREGATE, le=WORST_AGGREGATE, description="WASSCE aggregate (6 best - 36)"),
+    program: Optional[str] = Query(None, description="Filter by program name (case-insensitive substring)"),
+    university: Optional[str] = Query(None, description="University code, alias or full name"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Programs a WASSCE aggregate qualifies for, most competitive first"""
+    started = time.perf_counter_ns()
+    index = get_cut_off_index()
+    university_name = resolve_university(university) if university else None
+    if university and not university_name:
+        university_name = UNIVERSITY_CODES.get(university.upper(), university)
+    programs = [name for name in index.program_patterns if program.lower() in name.lower()] if program else None
+    results = [] if programs == [] else index.eligible(aggregate, programs, university_name)
+    elapsed_us = (time.perf_counter_ns() - started) / 1000
+    return {
+        "success": True,
+        "aggregate": aggregate,
+        "academic_year": index.academic_year,
+        "university": university_name,
+        "count": len(results),
+        "programs": results[:limit],
+        "lookup_us": round(elapsed_us, 1)
+    }
+
 # Conversation history endpoints
-@app.get("/api/chat/conversations")
-async def list_conversations(current=Depends(get_current_user)):
-    if not db_client:
-        raise HTTPException(status_code=503, detail="Database not available")
+def encode_conversation_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque keyset cursor: position after (last_active, conversation_id) of the last item"""
+    last = doc.get("last_active")
+    payload = {"t": last.isoformat() if isinstance(last, datetime) else None, "c": doc.get("conversation_id")}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+def decode_conversation_cursor(cursor: str) -> Dict[str, Any]:
     try:
-        db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
-        effective_user_id = current["user_id"]
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {"last_active": datetime.fromisoformat(payload["t"]), "conversation_id": payload["c"]}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def fetch_conversation_page(user_id: str, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    """One page of a user's conversations from the rag_conversations rollup, newest first.
+
+    Served by the (user_id, last_active, conversation_id) index, so cost is O(page size). While
+    the rollup is being backfilled the same page is aggregated from the user's rag_logs instead.
+    """
+    db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
+    after_cursor: Dict[str, Any] = {}
+    if cursor:
+        after = decode_conversation_cursor(cursor)
+        after_cursor["$or"] = [
+            {"last_active": {"$lt": after["last_active"]}},
+            {"last_active": after["last_active"], "conversation_id": {"$lt": after["conversation_id"]}}
+        ]
+    sort = [("last_active", -1), ("conversation_id", -1)]
+    if conversation_rollups_ready:
+        projection = {"_id": 0, "conversation_id": 1, "title": 1, "last_active": 1, "message_count": 1}
+        docs = await db.rag_conversations.find({"user_id": user_id, **after_cursor}, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+    else:
         pipeline = [
-            {"$match": {"user_id": effective_user_id}},
+            {"$match": {"user_id": user_id, "conversation_id": {"$nin": [None, ""]}}},
             {"$sort": {"conversation_id": 1, "timestamp": 1}},
             {"$group": {
                 "_id": "$conversation_id",
@@ -801,19 +2373,37 @@ async def list_conversations(current=Depends(get_current_user)):
                 "last_active": {"$max": "$timestamp"},
                 "message_count": {"$sum": 1}
             }},
-            {"$sort": {"last_active": -1}}
+            {"$project": {"_id": 0, "conversation_id": "$_id", "title": 1, "last_active": 1, "message_count": 1}},
+            *([{"$match": after_cursor}] if after_cursor else []),
+            {"$sort": dict(sort)},
+            {"$limit": limit + 1}
         ]
-        cursor = db.rag_logs.aggregate(pipeline)
+        docs = await db.rag_logs.aggregate(pipeline).to_list(length=limit + 1)
+    next_cursor = encode_conversation_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {"items": docs[:limit], "next_cursor": next_cursor}
+
+@app.get("/api/chat/conversations")
+async def list_conversations(
+    current=Depends(get_current_user),
+    limit: int = Query(CONVERSATION_PAGE_SIZE, ge=1, le=200),
+    cursor: Optional[str] = Query(None)
+):
+    if not db_client:
+        raise HTTPException(status_code=503, detail="Database not available")
+    try:
+        page = await fetch_conversation_page(current["user_id"], limit, cursor)
         items = []
-        async for doc in cursor:
+        for doc in page["items"]:
             last = doc.get("last_active")
             items.append({
-                "conversation_id": str(doc.get("_id")),
+                "conversation_id": str(doc.get("conversation_id")),
                 "title": (doc.get("title") or "Untitled conversation")[:120],
                 "last_active_date": last.isoformat() if isinstance(last, datetime) else str(last or ""),
                 "message_count": int(doc.get("message_count") or 0)
             })
-        return {"success": True, "history": items}
+        return {"success": True, "history": items, "next_cursor": page["next_cursor"]}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Conversations list error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch conversation history")
@@ -839,66 +2429,434 @@ async def list_conversations_demo():
 
 # Existing history endpoints
 @app.get("/history/{user_id}")
-async def get_history(user_id: str):
+async def get_history(
+    user_id: str,
+    limit: int = Query(CONVERSATION_PAGE_SIZE, ge=1, le=200),
+    cursor: Optional[str] = Query(None)
+):
     if not db_client:
         raise HTTPException(status_code=503, detail="Database not available")
     try:
-        db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
-        pipeline = [
-            {"$match": {"user_id": user_id}},
-            {"$sort": {"conversation_id": 1, "timestamp": 1}},
-            {"$group": {
-                "_id": "$conversation_id",
-                "title": {"$first": "$query"},
-                "last_active": {"$max": "$timestamp"},
-                "message_count": {"$sum": 1}
-            }},
-            {"$sort": {"last_active": -1}}
-        ]
-        cursor = db.rag_logs.aggregate(pipeline)
+        page = await fetch_conversation_page(user_id, limit, cursor)
         items = []
-        async for doc in cursor:
+        for doc in page["items"]:
             items.append({
-                "conversation_id": doc.get("_id"),
+                "conversation_id": doc.get("conversation_id"),
                 "title": (doc.get("title") or "Untitled conversation")[:120],
                 "last_active": (doc.get("last_active").isoformat() if isinstance(doc.get("last_active"), datetime) else str(doc.get("last_active"))),
                 "message_count": int(doc.get("message_count", 0))
             })
-        return {"success": True, "history": items}
+        return {"success": True, "history": items, "next_cursor": page["next_cursor"]}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ History aggregation error: {e}")
+        print(f"❌ History listing error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch history")
 
+def encode_thread_cursor(doc: Dict[str, Any]) -> Optional[str]:
+    """Opaque keyset cursor at (timestamp, _id) of a rag_logs exchange"""
+    ts = doc.get("timestamp")
+    if not isinstance(ts, datetime):
+        return None
+    payload = {"t": ts.isoformat(), "i": str(doc.get("_id"))}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+def parse_thread_position(value: Optional[str], name: str) -> Optional[Dict[str, Any]]:
+    """Decode a `before`/`after` thread position: a cursor from next_before/next_after, or a bare ISO timestamp"""
+    if not value:
+        return None
+    try:
+        return {"timestamp": datetime.fromisoformat(value), "_id": None}
+    except ValueError:
+        pass
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value.encode("ascii")))
+        return {"timestamp": datetime.fromisoformat(payload["t"]), "_id": ObjectId(payload["i"])}
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid '{name}' cursor, expected next_before/next_after or ISO 8601")
+
+def thread_position_filter(position: Dict[str, Any], op: str) -> Dict[str, Any]:
+    """Exchanges strictly past `position` in (timestamp, _id) order; `op` is "$lt" or "$gt"."""
+    if position["_id"] is None:
+        return {"timestamp": {op: position["timestamp"]}}
+    return {"$or": [
+        {"timestamp": {op: position["timestamp"]}},
+        {"timestamp": position["timestamp"], "_id": {op: position["_id"]}}
+    ]}
+
+def rag_log_to_messages(doc: Dict[str, Any], include_sources: bool) -> List[Dict[str, Any]]:
+    """Expand one rag_logs exchange into its user and assistant thread messages"""
+    ts = doc.get("timestamp")
+    ts_iso = ts.isoformat() if isinstance(ts, datetime) else str(ts)
+    messages = []
+    if doc.get("query"):
+        messages.append({"role": "user", "content": doc["query"], "timestamp": ts_iso})
+    if doc.get("response"):
+        meta = {"confidence": doc.get("confidence")}
+        if include_sources:
+            meta["sources"] = doc.get("sources", [])
+        messages.append({"role": "assistant", "content": doc["response"], "timestamp": ts_iso, "meta": meta})
+    return messages
+
 @app.get("/history/chat/{conversation_id}")
-async def get_conversation(conversation_id: str):
+async def get_conversation(
+    conversation_id: str,
+    before: Optional[str] = Query(None, description="Only exchanges older than this cursor (next_before) or ISO timestamp"),
+    after: Optional[str] = Query(None, description="Only exchanges newer than this cursor (next_after) or ISO timestamp"),
+    limit: int = Query(THREAD_PAGE_SIZE, ge=1, le=500),
+    include_sources: bool = Query(True),
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """One page of a conversation thread, served by the (conversation_id, timestamp, _id) index.
+
+    Without `after` the newest `limit` exchanges (optionally older than `before`) are returned;
+    pass `next_before` back as `before` to page towards the start. Cursors carry (timestamp, _id),
+    so exchanges sharing a timestamp are never skipped at a page boundary. `format=ndjson` streams
+    the whole matching range, one message per line, for exports.
+    """
     if not db_client:
         raise HTTPException(status_code=503, detail="Database not available")
+    before_pos = parse_thread_position(before, "before")
+    after_pos = parse_thread_position(after, "after")
+    bounds = []
+    if before_pos:
+        bounds.append(thread_position_filter(before_pos, "$lt"))
+    if after_pos:
+        bounds.append(thread_position_filter(after_pos, "$gt"))
+    query: Dict[str, Any] = {"conversation_id": conversation_id}
+    if bounds:
+        query["$and"] = bounds
+    projection = {"_id": 1, "query": 1, "response": 1, "timestamp": 1, "confidence": 1}
+    if include_sources:
+        projection["sources"] = 1
     try:
         db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
-        cursor = db.rag_logs.find({"conversation_id": conversation_id}).sort("timestamp", 1)
+
+        if format == "ndjson":
+            async def export_thread():
+                try:
+                    async for doc in db.rag_logs.find(query, projection).sort([("timestamp", 1), ("_id", 1)]):
+                        for message in rag_log_to_messages(doc, include_sources):
+                            yield json.dumps(message, default=str) + "\n"
+                except Exception as e:
+                    print(f"❌ Conversation export error: {e}")
+            return StreamingResponse(export_thread(), media_type="application/x-ndjson")
+
+        # Newest-first from the cursor position (or oldest-first when paging forward), then chronological
+        direction = 1 if after_pos and not before_pos else -1
+        docs = await db.rag_logs.find(query, projection).sort(
+            [("timestamp", direction), ("_id", direction)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        if direction == -1:
+            docs.reverse()
         thread = []
-        async for doc in cursor:
-            ts = doc.get("timestamp")
-            ts_iso = ts.isoformat() if isinstance(ts, datetime) else str(ts)
-            user_msg = doc.get("query")
-            assistant_msg = doc.get("response")
-            if user_msg:
-                thread.append({"role": "user", "content": user_msg, "timestamp": ts_iso})
-            if assistant_msg:
-                thread.append({
-                    "role": "assistant",
-                    "content": assistant_msg,
-                    "timestamp": ts_iso,
-                    "meta": {
-                        "confidence": doc.get("confidence"),
-                        "sources": doc.get("sources", [])
-                    }
-                })
-        return {"success": True, "conversation_id": conversation_id, "messages": thread}
+        for doc in docs:
+            thread.extend(rag_log_to_messages(doc, include_sources))
+        return {
+            "success": True,
+            "conversation_id": conversation_id,
+            "messages": thread,
+            "has_more": has_more,
+            "next_before": encode_thread_cursor(docs[0]) if docs else None,
+            "next_after": encode_thread_cursor(docs[-1]) if docs else None
+        }
     except Exception as e:
         print(f"❌ Conversation fetch error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch conversation thread")
 
+async def retrieve_context(message: str, university_name: Optional[str] = None, query_vector: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Shared retrieval for /respond and /respond/stream: local search, fast path or web fallback.
+
+    With SPECULATIVE_WEB_SEARCH the web lookup starts alongside local search and is cancelled
+    as soon as local confidence clears the fast-path threshold.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, Any] = {"speculative": SPECULATIVE_WEB_SEARCH}
+
+    web_task = None
+    if SPECULATIVE_WEB_SEARCH:
+        web_started = time.perf_counter()
+        web_task = asyncio.ensure_future(search_web_realtime(message))
+
+    # Step A: Search local knowledge base (off the loop when racing the web task). Callers with
+    # CAG and intent routing off pass no vector; the model's forward pass must not run on the loop
+    local_started = time.perf_counter()
+    if query_vector is None:
+        query_vector = await asyncio.to_thread(embed_query, message)
+    if web_task is not None:
+        local_results = await asyncio.to_thread(search_local_knowledge, message, university_name, query_vector)
+    else:
+        local_results = search_local_knowledge(message, university_name, query_vector=query_vector)
+    timings["local_search_ms"] = round((time.perf_counter() - local_started) * 1000, 2)
+    print(f"🔍 Local search found {len(local_results['results'])} results (confidence={local_results.get('confidence', 0.0):.2f})")
+
+    all_sources: List[Dict[str, Any]] = []
+    context_blocks: List[Dict[str, Any]] = []
+
+    # Add local sources immediately (as compact, scored knowledge chunks)
+    for result in local_results.get("results", []):
+        all_sources.append({
+            "source": result.get("source"),
+            "type": "local_knowledge",
+            "confidence": result.get("relevance", 0.0)
+        })
+        context_blocks.extend(knowledge_context_blocks(result))
+
+    # Step B: Fast Path if local confidence clears the threshold
+    if local_results.get('confidence', 0.0) > FAST_PATH_CONFIDENCE:
+        print("⚡ Fast Path: Skipping web search due to high local confidence")
+        path = "fast"
+        RETRIEVAL_PATHS.inc(path="fast")
+        final_confidence = local_results.get('confidence', 0.8)
+        if web_task is not None:
+            web_task.cancel()
+            timings["web_cancelled"] = True
+    else:
+        # Step C: Fallback – perform real web search and combine contexts
+        path = "fallback"
+        RETRIEVAL_PATHS.inc(path="fallback")
+        wait_started = time.perf_counter()
+        if web_task is not None:
+            print("🌐 Fallback path: awaiting speculative web search...")
+            try:
+                web_results = await asyncio.wait_for(web_task, timeout=WEB_SEARCH_BUDGET_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"⏱️ Speculative web search exceeded {WEB_SEARCH_BUDGET_SECONDS}s budget")
+                web_results = {"results": [], "confidence": 0.0}
+            timings["web_search_ms"] = round((time.perf_counter() - web_started) * 1000, 2)
+        else:
+            print("🌐 Fallback path: Running real-time web search via DDG/SerpAPI...")
+            web_results = await search_web_realtime(message)
+            timings["web_search_ms"] = round((time.perf_counter() - wait_started) * 1000, 2)
+        timings["web_wait_ms"] = round((time.perf_counter() - wait_started) * 1000, 2)
+        print(f"🌐 Real-time search found {len(web_results.get('results', []))} results")
+
+        for result in web_results.get("results", []):
+            all_sources.append({
+                "source": result.get("title", "Web Result"),
+                "url": result.get("url", ""),
+                "type": result.get("source", "web_search"),
+                "confidence": 0.7
+            })
+            snippet = result.get('snippet') or result.get('body') or ''
+            context_blocks.append({"source": result.get("title", "Web Result"), "text": f"Web Result: {snippet}", "score": 0.7})
+
+        final_confidence = max(local_results.get("confidence", 0.0), web_results.get("confidence", 0.0))
+
+    timings["retrieval_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return {
+        "sources": all_sources,
+        "context": context_text(context_blocks),
+        "context_blocks": context_blocks,
+        "confidence": final_confidence,
+        "path": path,
+        "timings": timings
+    }
+
+class RagLogWriter:
+    """Write-behind pipeline for rag_logs: responses enqueue, a background task batches inserts.
+
+    Batches are flushed with insert_many when RAG_LOG_BATCH_SIZE documents are waiting or
+    RAG_LOG_FLUSH_INTERVAL_SECONDS has passed. If the queue is full or MongoDB fails/times out,
+    documents are appended to a local JSONL spill file and replayed on the next start.
+    Every document gets its _id up front, so a replayed batch never creates duplicates.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int, spill_path: str):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.spill_path = spill_path
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.in_flight: List[Dict[str, Any]] = []  # Batch currently being written (re-flushed on shutdown)
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "spilled": 0, "replayed": 0, "failures": 0}
+
+    @staticmethod
+    def _collection():
+        return db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')].rag_logs
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.queue = self.queue or asyncio.Queue(maxsize=self.max_queue)
+            self.task = asyncio.create_task(self._run())
+
+    def submit(self, document: Dict[str, Any]):
+        """Queue one exchange for persistence without waiting on MongoDB"""
+        if not db_client:
+            return
+        document.setdefault("_id", ObjectId())
+        self.start()
+        try:
+            self.queue.put_nowait(document)
+            self.stats["enqueued"] += 1
+        except asyncio.QueueFull:
+            self._spill([document])
+
+    def _spill(self, documents: List[Dict[str, Any]]):
+        """Append documents to the local spill file (Extended JSON keeps ObjectId/datetime types)"""
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for doc in documents:
+                    f.write(json_util.dumps(doc) + "\n")
+            self.stats["spilled"] += len(documents)
+        except Exception as e:
+            print(f"❌ Failed to spill {len(documents)} rag_logs to disk, dropping them: {e}")
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        """Insert one batch; on failure spill whatever was not written. Returns True on success."""
+        try:
+            with STAGE_SECONDS.time(stage="mongo_log_write"):
+                await asyncio.wait_for(self._collection().insert_many(batch, ordered=False), timeout=RAG_LOG_WRITE_TIMEOUT_SECONDS)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+            await update_conversation_rollups(batch)
+            return True
+        except BulkWriteError as e:
+            # Duplicate _ids (code 11000) are replays of documents already stored
+            errors = e.details.get("writeErrors", [])
+            failed = [err["index"] for err in errors if err.get("code") != 11000]
+            self.stats["written"] += e.details.get("nInserted", 0)
+            self.stats["failures"] += 1
+            ERRORS.inc(stage="mongo_log_write")
+            skipped = {err["index"] for err in errors}
+            await update_conversation_rollups([doc for i, doc in enumerate(batch) if i not in skipped])
+            if failed:
+                await asyncio.to_thread(self._spill, [batch[i] for i in failed])
+            return not failed
+        except Exception as e:
+            print(f"⚠️ rag_logs batch of {len(batch)} failed, spilling to disk: {type(e).__name__} {e}")
+            self.stats["failures"] += 1
+            ERRORS.inc(stage="mongo_log_write")
+            await asyncio.to_thread(self._spill, batch)
+            return False
+
+    def _take_spill(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.spill_path):
+            return []
+        replay_path = self.spill_path + ".replay"
+        os.replace(self.spill_path, replay_path)
+        with open(replay_path, encoding="utf-8") as f:
+            documents = [json_util.loads(line) for line in f if line.strip()]
+        os.remove(replay_path)
+        return documents
+
+    async def _replay_spill(self):
+        try:
+            documents = await asyncio.to_thread(self._take_spill)
+        except Exception as e:
+            print(f"⚠️ Could not read rag_logs spill file: {e}")
+            return
+        if documents:
+            print(f"♻️ Replaying {len(documents)} spilled rag_logs")
+        for i in range(0, len(documents), self.batch_size):
+            batch = documents[i:i + self.batch_size]
+            if await self._write(batch):
+                self.stats["replayed"] += len(batch)
+
+    async def _run(self):
+        await self._replay_spill()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            self.in_flight = batch
+            await self._write(batch)
+            self.in_flight = []
+
+    def _drain_queue(self) -> List[Dict[str, Any]]:
+        pending, self.in_flight = self.in_flight, []
+        while self.queue is not None and not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        return pending
+
+    async def stop(self):
+        """Flush everything still queued (shutdown); whatever cannot be written is spilled"""
+        if self.task is not None:
+            # Before Python 3.12, wait_for can swallow a cancel that races with a completed
+            # queue.get(); keep cancelling until the task has really finished
+            while not self.task.done():
+                self.task.cancel()
+                await asyncio.wait({self.task}, timeout=0.1)
+            self.task = None
+        pending = self._drain_queue()
+        if not pending:
+            return
+        try:
+            async def flush_pending():
+                for i in range(0, len(pending), self.batch_size):
+                    await self._write(pending[i:i + self.batch_size])
+            await asyncio.wait_for(flush_pending(), timeout=RAG_LOG_DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            # Some of these may already be stored; replay skips them by _id
+            print(f"⚠️ rag_logs drain timed out, spilling {len(pending)} queued documents")
+            self._spill(pending)
+        print(f"✅ rag_logs drained ({self.stats['written']} written, {self.stats['spilled']} spilled)")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "queued": self.queue.qsize() if self.queue is not None else 0}
+
+async def update_conversation_rollups(documents: List[Dict[str, Any]]):
+    """Fold newly stored rag_logs into rag_conversations: one upsert per conversation in the batch"""
+    rollups: Dict[tuple, Dict[str, Any]] = {}
+    for doc in documents:
+        timestamp = doc.get("timestamp")
+        if not doc.get("conversation_id") or timestamp is None:
+            continue
+        key = (doc.get("user_id"), doc["conversation_id"])
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollups[key] = {"title": doc.get("query"), "started_at": timestamp, "last_active": timestamp, "count": 1}
+            continue
+        if timestamp < rollup["started_at"]:
+            rollup["started_at"], rollup["title"] = timestamp, doc.get("query")
+        rollup["last_active"] = max(rollup["last_active"], timestamp)
+        rollup["count"] += 1
+    if not rollups:
+        return
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "conversation_id": conversation_id},
+            {
+                "$setOnInsert": {"title": (rollup["title"] or "Untitled conversation")[:120]},
+                "$min": {"started_at": rollup["started_at"]},
+                "$max": {"last_active": rollup["last_active"]},
+                "$inc": {"message_count": rollup["count"]}
+            },
+            upsert=True
+        )
+        for (user_id, conversation_id), rollup in rollups.items()
+    ]
+    try:
+        db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
+        with STAGE_SECONDS.time(stage="mongo_rollup_update"):
+            await db.rag_conversations.bulk_write(operations, ordered=False)
+    except Exception as e:
+        ERRORS.inc(stage="mongo_rollup_update")
+        # Logs are stored; summaries catch up on the next CONVERSATION_ROLLUP_REBUILD
+        print(f"⚠️ Conversation rollup update failed: {e}")
+
+rag_log_writer = RagLogWriter(
+    batch_size=RAG_LOG_BATCH_SIZE,
+    flush_interval=RAG_LOG_FLUSH_INTERVAL_SECONDS,
+    max_queue=RAG_LOG_QUEUE_SIZE,
+    spill_path=RAG_LOG_SPILL_PATH
+)
+
+def save_rag_log(document: Dict[str, Any]):
+    """Hand one exchange to the rag_logs write-behind queue (never waits on MongoDB)"""
+    rag_log_writer.submit(document)
+
 @app.post("/respond", response_model=ChatResponse)
 async def respond_to_query(request: ChatRequest):
     """Main RAG+CAG endpoint with conditional logic (Fast Path + Fallback)"""
@@ -908,79 +2866,105 @@ async def respond_to_query(request: ChatRequest):
     try:
         print(f"📥 Processing query: {request.message[:100]}...")
 
-        # Step A: Search local knowledge base
-        local_results = search_local_knowledge(
-            request.message,
-            request.university_name
-        )
-        print(f"🔍 Local search found {len(local_results['results'])} results (confidence={local_results.get('confidence', 0.0):.2f})")
-
-        all_sources: List[Dict[str, Any]] = []
-        context_parts: List[str] = []
-
-        # Add local sources immediately
-        for result in local_results.get("results", []):
-            all_sources.append({
-                "source": result.get("source"),
-                "type": "local_knowledge",
-                "confidence": result.get("relevance", 0.0)
+        # Structured short-circuit: eligibility questions are answered from the cut-off index, and
+        # fees/deadlines/contact-style questions from the knowledge base, with no LLM call
+        query_vector = None
+        direct = answer_eligibility_question(request.message, request.university_name)
+        path, model_used = "cut-off", "cut-off-engine"
+        if not direct:
+            query_vector = await asyncio.to_thread(embed_query, request.message) if CAG_ENABLED or INTENT_ROUTING_ENABLED else None
+            direct = route_structured_query(request.message, request.university_name, query_vector)
+            path, model_used = "intent", "intent-router"
+        if direct:
+            processing_time = (datetime.now() - start_time).total_seconds()
+            RETRIEVAL_PATHS.inc(path=path)
+            print(f"🎯 Answered by {model_used} in {processing_time * 1000:.1f}ms")
+            save_rag_log({
+                "query": request.message,
+                "response": direct["reply"],
+                "confidence": direct["confidence"],
+                "sources": direct["sources"],
+                "processing_time": processing_time,
+                "timestamp": datetime.now(),
+                "conversation_id": request.conversation_id,
+                "user_id": request.user_id
             })
-            context_parts.append(f"University: {result.get('source')}\n{json.dumps(result.get('data', {}), indent=2)}")
-
-        # Step B: Fast Path if local confidence > 0.7
-        if local_results.get('confidence', 0.0) > 0.7:
-            print("⚡ Fast Path: Skipping web search due to high local confidence")
-            combined_context = "\n\n".join(context_parts)
-            final_confidence = local_results.get('confidence', 0.8)
-            # Generate response
-            if groq_client and (final_confidence > 0.3 or combined_context):
-                response_text = generate_response_with_groq(request.message, combined_context, all_sources)
-            else:
-                response_text = generate_smart_fallback_response(request.message, combined_context, all_sources)
-        else:
-            # Step C: Fallback – perform real web search and combine contexts
-            print("🌐 Fallback path: Running real-time web search via DDG/SerpAPI...")
-            web_results = await search_web_realtime(request.message)
-            print(f"🌐 Real-time search found {len(web_results.get('results', []))} results")
-
-            for result in web_results.get("results", []):
-                all_sources.append({
-                    "source": result.get("title", "Web Result"),
-                    "url": result.get("url", ""),
-                    "type": result.get("source", "web_search"),
-                    "confidence": 0.7
-                })
-                snippet = result.get('snippet') or result.get('body') or ''
-                context_parts.append(f"Web Result: {snippet}")
+            return ChatResponse(
+                success=True,
+                reply=direct["reply"],
+                sources=direct["sources"],
+                confidence=direct["confidence"],
+                timestamp=datetime.now().isoformat(),
+                processing_time=processing_time,
+                model_used=model_used
+            )
 
-            combined_context = "\n\n".join(context_parts)
-            final_confidence = max(local_results.get("confidence", 0.0), web_results.get("confidence", 0.0))
+        # CAG: serve near-duplicate questions about the same university from the semantic answer cache
+        cache_scope = answer_cache_scope(request.university_name, request.message)
+        cached = answer_cache.lookup(query_vector, cache_scope) if CAG_ENABLED and query_vector is not None else None
+        if cached:
+            processing_time = (datetime.now() - start_time).total_seconds()
+            RETRIEVAL_PATHS.inc(path="cache")
+            print(f"💾 Semantic cache hit (similarity={cached['similarity']:.3f}) in {processing_time:.3f}s")
+            save_rag_log({
+                "query": request.message,
+                "response": cached["reply"],
+                "confidence": cached["confidence"],
+                "sources": cached["sources"],
+                "processing_time": processing_time,
+                "timestamp": datetime.now(),
+                "conversation_id": request.conversation_id,
+                "user_id": request.user_id,
+                "cache_hit": True
+            })
+            return ChatResponse(
+                success=True,
+                reply=cached["reply"],
+                sources=cached["sources"],
+                confidence=cached["confidence"],
+                timestamp=datetime.now().isoformat(),
+                processing_time=processing_time,
+                model_used="semantic-cache"
+            )
 
-            if groq_client and (final_confidence > 0.3 or combined_context):
-                response_text = generate_response_with_groq(request.message, combined_context, all_sources)
-            else:
-                response_text = generate_smart_fallback_response(request.message, combined_context, all_sources)
+        retrieval = await retrieve_context(request.message, request.university_name, query_vector=query_vector)
+        all_sources = retrieval["sources"]
+        combined_context = retrieval["context"]
+        final_confidence = retrieval["confidence"]
+
+        # Generate response
+        generation_started = time.perf_counter()
+        response_text = None
+        if groq_async_client and (final_confidence > 0.3 or combined_context):
+            prompt = assemble_prompt(request.message, retrieval["context_blocks"], all_sources)
+            retrieval["timings"]["prompt_tokens"] = prompt["prompt_tokens"]
+            response_text = await complete_with_groq(request.message, combined_context, all_sources, prompt)
+            if response_text is not None and CAG_ENABLED and query_vector is not None:
+                answer_cache.store(query_vector, cache_scope, {
+                    "reply": response_text,
+                    "sources": all_sources,
+                    "confidence": final_confidence
+                })
+        if response_text is None:
+            response_text = generate_smart_fallback_response(request.message, combined_context, all_sources)
+        retrieval["timings"]["generation_ms"] = round((time.perf_counter() - generation_started) * 1000, 2)
 
         # Calculate processing time
         processing_time = (datetime.now() - start_time).total_seconds()
         print(f"✅ Response generated in {processing_time:.2f}s with confidence {final_confidence:.2f}")
 
         # Save to MongoDB if available
-        if db_client:
-            try:
-                db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
-                await db.rag_logs.insert_one({
-                    "query": request.message,
-                    "response": response_text,
-                    "confidence": final_confidence,
-                    "sources": all_sources,
-                    "processing_time": processing_time,
-                    "timestamp": datetime.now(),
-                    "conversation_id": request.conversation_id,
-                    "user_id": request.user_id
-                })
-            except Exception as e:
-                print(f"⚠️ Failed to save to MongoDB: {e}")
+        save_rag_log({
+            "query": request.message,
+            "response": response_text,
+            "confidence": final_confidence,
+            "sources": all_sources,
+            "processing_time": processing_time,
+            "timestamp": datetime.now(),
+            "conversation_id": request.conversation_id,
+            "user_id": request.user_id,
+            "prompt_tokens": retrieval["timings"].get("prompt_tokens")
+        })
 
         return ChatResponse(
             success=True,
@@ -989,10 +2973,12 @@ async def respond_to_query(request: ChatRequest):
             confidence=final_confidence,
             timestamp=datetime.now().isoformat(),
             processing_time=processing_time,
-            model_used="hybrid-rag-v2"
+            model_used="hybrid-rag-v2",
+            stage_timings={**retrieval["timings"], "path": retrieval["path"]}
         )
         
     except Exception as e:
+        ERRORS.inc(stage="respond")
         print(f"❌ RAG processing error: {e}")
         
         # Even on error, try to provide a helpful fallback response
@@ -1016,13 +3002,439 @@ async def respond_to_query(request: ChatRequest):
             
             return ChatResponse(
                 success=False,
-                reply="I apologize, but I'm having technical difficulties. Please try asking about specific universities like University of Ghana, KNUST, UCC, or UDS, and I'll do my best to help with admissions information.",
+                reply=MINIMAL_FALLBACK_REPLY,
                 sources=[],
                 confidence=0.0,
                 timestamp=datetime.now().isoformat(),
                 model_used="minimal-fallback"
             )
 
+class ExtractionCache:
+    """Two-tier cache of extraction results keyed by SHA-256 of the file bytes.
+
+    Memory tier: LRU bounded by EXTRACTION_CACHE_MEMORY_BYTES.
+    Persistent tier: MongoDB `extraction_cache` collection (when connected), expired by a TTL index on last_used.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.bytes_used = 0
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "time_saved_seconds": 0.0}
+
+    @staticmethod
+    def _collection():
+        if not db_client:
+            return None
+        return db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')].extraction_cache
+
+    @staticmethod
+    def _for_filename(entry: Dict[str, Any], filename: str) -> Dict[str, Any]:
+        # The summary embeds the name of the file it was extracted from
+        summary = entry["summary"].replace(entry["filename"], filename, 1) if entry["filename"] != filename else entry["summary"]
+        return {"summary": summary, "text": entry["text"], "ok": True}
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        if key in self.entries:
+            self.bytes_used -= self.entries.pop(key)["size"]
+        entry["size"] = len(entry["summary"].encode("utf-8")) + len(entry["text"].encode("utf-8"))
+        if entry["size"] > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.bytes_used += entry["size"]
+        while self.bytes_used > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes_used -= evicted["size"]
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str, filename: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            self.stats["time_saved_seconds"] += entry["elapsed"]
+            return self._for_filename(entry, filename)
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = await collection.find_one_and_update(
+                    {"_id": key},
+                    {"$set": {"last_used": datetime.now()}},
+                    projection={"summary": 1, "text": 1, "filename": 1, "elapsed": 1}
+                )
+                if doc:
+                    entry = {k: doc[k] for k in ("summary", "text", "filename", "elapsed")}
+                    self._remember(key, entry)
+                    self.stats["persistent_hits"] += 1
+                    self.stats["time_saved_seconds"] += entry["elapsed"]
+                    return self._for_filename(entry, filename)
+            except Exception as e:
+                print(f"⚠️ Extraction cache lookup failed: {e}")
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, key: str, filename: str, result: Dict[str, Any], elapsed: float):
+        entry = {"summary": result["summary"], "text": result["text"], "filename": filename, "elapsed": elapsed}
+        self._remember(key, dict(entry))
+        self.stats["stores"] += 1
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                await collection.replace_one({"_id": key}, {**entry, "last_used": datetime.now()}, upsert=True)
+            except Exception as e:
+                print(f"⚠️ Extraction cache write failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "time_saved_seconds": round(self.stats["time_saved_seconds"], 3),
+            "entries": len(self.entries),
+            "bytes": self.bytes_used,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+extraction_cache = ExtractionCache(EXTRACTION_CACHE_MEMORY_BYTES)
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Bounded process pool for CPU-bound file extraction.
+
+    Spawned workers import file_extraction plus whatever script launched the process, so the
+    service must run under the uvicorn CLI (`uvicorn main:app`), never with main.py as __main__.
+    """
+    global extraction_pool
+    if extraction_pool is None:
+        extraction_pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=limit_worker_memory,
+            initargs=(EXTRACTION_WORKER_MEMORY_MB,)
+        )
+    return extraction_pool
+
+class UploadTooLarge(HTTPException):
+    """413 raised while an upload is still streaming in (subclasses HTTPException so FastAPI re-raises it)"""
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=413, detail=detail)
+
+MULTIPART_BOUNDARY_PATTERN = re.compile(rb'boundary="?([^";,]+)"?', re.IGNORECASE)
+MULTIPART_HEADER_ALLOWANCE = 16 * 1024  # Part headers counted with the file bytes by MultipartPartMeter
+
+class MultipartPartMeter:
+    """Size of the multipart part currently streaming in, tracked across body chunks.
+
+    Counts from the last boundary delimiter, so a part's own headers are included; delimiters
+    split between chunks are caught by carrying the previous chunk's tail.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.delimiter = b"\r\n--" + boundary
+        self.tail = b""
+        self.part_bytes = 0
+
+    def feed(self, chunk: bytes) -> int:
+        """Account for the next body chunk; returns the largest part size seen in it"""
+        data = self.tail + chunk
+        start = len(self.tail)  # The carried tail was counted with the previous chunk
+        largest = 0
+        position = data.find(self.delimiter)
+        while position != -1:
+            self.part_bytes += max(position - start, 0)
+            largest = max(largest, self.part_bytes)
+            self.part_bytes = 0
+            start = position + len(self.delimiter)
+            position = data.find(self.delimiter, start)
+        self.part_bytes += len(data) - start
+        self.tail = data[-(len(self.delimiter) - 1):]
+        return max(largest, self.part_bytes)
+
+class UploadBudgetMiddleware:
+    """Reject oversized upload requests and parts before the multipart body is buffered.
+
+    The declared Content-Length is checked on the first receive, streamed body bytes are
+    counted for chunked uploads, and each multipart part is metered as it streams in (the
+    exact per-file check happens again when the upload is spooled). UploadTooLarge is raised
+    inside the app so the 413 still passes through the CORS middleware.
+    """
+
+    def __init__(self, app, paths: tuple, max_bytes: int, max_part_bytes: int):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+        self.max_part_bytes = max_part_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        detail = f"Upload exceeds the {self.max_bytes // (1024 * 1024)}MB request limit"
+        part_detail = f"File exceeds the {self.max_part_bytes // (1024 * 1024)}MB per-file limit"
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length", b"")
+        declared = int(content_length) if content_length.isdigit() else 0
+        boundary = MULTIPART_BOUNDARY_PATTERN.search(headers.get(b"content-type", b""))
+        meter = MultipartPartMeter(boundary.group(1)) if boundary else None
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            if declared > self.max_bytes:
+                raise UploadTooLarge(detail)
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if received > self.max_bytes:
+                    raise UploadTooLarge(detail)
+                if meter is not None and meter.feed(body) > self.max_part_bytes + MULTIPART_HEADER_ALLOWANCE:
+                    raise UploadTooLarge(part_detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadBudgetMiddleware, paths=("/respond-with-files",), max_bytes=MAX_UPLOAD_REQUEST_BYTES, max_part_bytes=MAX_UPLOAD_FILE_BYTES)
+
+class RequestTimingMiddleware:
+    """Observe end-to-end latency per route template, including the streamed body of SSE responses"""
+
+    def __init__(self, app, exclude: tuple = ()):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+        started = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            REQUEST_SECONDS.observe_ns(started, endpoint=getattr(route, "path", "unmatched"))
+
+app.add_middleware(RequestTimingMiddleware, exclude=("/metrics",))
+
+def _spool_to_disk(source, suffix: str) -> tuple:
+    """Copy an upload stream to a named temp file in chunks, hashing as it goes (runs in a thread).
+
+    Starlette has already spooled parts over 1MB to an anonymous temp file; this one disk-to-disk
+    copy gives extraction workers a path they can open.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, dir=UPLOAD_SPOOL_DIR, prefix="glinax-upload-", suffix=suffix) as target:
+        try:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_FILE_BYTES:
+                    raise UploadTooLarge(f"File exceeds the {MAX_UPLOAD_FILE_BYTES // (1024 * 1024)}MB per-file limit")
+                hasher.update(chunk)
+                target.write(chunk)
+        except BaseException:
+            target.close()
+            os.unlink(target.name)
+            raise
+    return target.name, size, hasher.hexdigest()
+
+async def spool_upload(file: UploadFile) -> Dict[str, Any]:
+    """Stage one upload for extraction: small files stay in memory, larger ones go to a temp file path"""
+    upload = {"filename": file.filename, "content_type": file.content_type or '', "data": None, "path": None}
+    await file.seek(0)
+    if file.size is not None and file.size <= UPLOAD_SPOOL_THRESHOLD_BYTES:
+        data = await file.read()
+        upload.update(data=data, size=len(data), sha256=hashlib.sha256(data).hexdigest())
+    else:
+        path, size, digest = await asyncio.to_thread(_spool_to_disk, file.file, os.path.splitext(file.filename)[1])
+        upload.update(path=path, size=size, sha256=digest)
+    return upload
+
+def release_upload(upload: Dict[str, Any]):
+    """Delete the spooled temp file, if any"""
+    if upload.get("path"):
+        try:
+            os.unlink(upload["path"])
+        except OSError:
+            pass
+
+def extraction_file_type(content_type: str) -> str:
+    """Bounded metrics label for a client-supplied content type"""
+    if content_type == 'application/pdf':
+        return "pdf"
+    if content_type in ('application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'):
+        return "docx"
+    if content_type.startswith('image/'):
+        return "image"
+    if content_type.startswith('text/'):
+        return "text"
+    return "other"
+
+async def extract_upload(upload: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract one staged upload with per-file timeout, using the content-addressed cache; never raises"""
+    global extraction_pool
+
+    filename, content_type = upload["filename"], upload["content_type"]
+    file_type = extraction_file_type(content_type)
+    started = time.perf_counter_ns()
+    if not is_cpu_bound(content_type):
+        result = extract_file_content(filename, content_type, upload["data"], upload["path"])
+        EXTRACTION_SECONDS.observe_ns(started, file_type=file_type, source="inline")
+        return result
+
+    # Content-addressed cache: identical bytes are never extracted twice
+    cache_key = f"{upload['sha256']}:{content_type}"
+    cached = await extraction_cache.get(cache_key, filename)
+    if cached:
+        EXTRACTION_SECONDS.observe_ns(started, file_type=file_type, source="cache")
+        return cached
+
+    loop = asyncio.get_running_loop()
+    try:
+        started = time.perf_counter_ns()
+        result = await asyncio.wait_for(
+            loop.run_in_executor(get_extraction_pool(), extract_file_content, filename, content_type, upload["data"], upload["path"]),
+            timeout=EXTRACTION_TIMEOUT_SECONDS
+        )
+        EXTRACTION_SECONDS.observe_ns(started, file_type=file_type, source="worker")
+        if result.get("ok"):
+            await extraction_cache.put(cache_key, filename, result, (time.perf_counter_ns() - started) / 1e9)
+        else:
+            ERRORS.inc(stage="file_extraction")
+        return result
+    except asyncio.TimeoutError:
+        # The worker finishes in the background; the pool size still bounds total CPU use
+        ERRORS.inc(stage="file_extraction_timeout")
+        print(f"⏱️ Extraction of {filename} exceeded {EXTRACTION_TIMEOUT_SECONDS}s")
+        return {"summary": f"📎 {filename}: Extraction timed out, please upload a smaller or clearer file.", "text": "", "ok": False}
+    except BrokenProcessPool as e:
+        # A worker died (e.g. hit the memory cap); start a fresh pool for later requests
+        ERRORS.inc(stage="file_extraction_worker")
+        print(f"⚠️ Extraction worker crashed on {filename}: {e}")
+        extraction_pool = None
+        return {"summary": f"📎 {filename}: File could not be processed.", "text": "", "ok": False}
+    except Exception as e:
+        ERRORS.inc(stage="file_extraction")
+        print(f"⚠️ Error processing file {filename}: {e}")
+        return {"summary": f"File: {filename} - processing error", "text": "", "ok": False}
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/respond/stream")
+async def respond_stream(request: ChatRequest):
+    """Streaming variant of /respond: metadata event first, then tokens as Server-Sent Events"""
+
+    start_time = datetime.now()
+    print(f"📥 Streaming query: {request.message[:100]}...")
+
+    query_vector, cache_scope, cached, prompt, use_llm = None, None, None, None, False
+    try:
+        direct = answer_eligibility_question(request.message, request.university_name)
+        path, model_used = "cut-off", "cut-off-engine"
+        if not direct:
+            query_vector = await asyncio.to_thread(embed_query, request.message) if CAG_ENABLED or INTENT_ROUTING_ENABLED else None
+            direct = route_structured_query(request.message, request.university_name, query_vector)
+            path, model_used = "intent", "intent-router"
+        cache_scope = answer_cache_scope(request.university_name, request.message)
+        cached = answer_cache.lookup(query_vector, cache_scope) if CAG_ENABLED and query_vector is not None and not direct else None
+        if direct:
+            retrieval = {"sources": direct["sources"], "context": "", "confidence": direct["confidence"], "path": path}
+            RETRIEVAL_PATHS.inc(path=path)
+        elif cached:
+            retrieval = {"sources": cached["sources"], "context": "", "confidence": cached["confidence"], "path": "cache"}
+            RETRIEVAL_PATHS.inc(path="cache")
+        else:
+            retrieval = await retrieve_context(request.message, request.university_name, query_vector=query_vector)
+        all_sources = retrieval["sources"]
+        combined_context = retrieval["context"]
+        final_confidence = retrieval["confidence"]
+        use_llm = bool(groq_async_client and not direct and (final_confidence > 0.3 or combined_context))
+        prompt = assemble_prompt(request.message, retrieval["context_blocks"], all_sources) if use_llm and not cached else None
+        if prompt is not None:
+            retrieval["timings"]["prompt_tokens"] = prompt["prompt_tokens"]
+    except Exception as e:
+        # Degrade like /respond: a fallback answer streamed as meta + token + done, never a bare 500
+        ERRORS.inc(stage="respond_stream")
+        print(f"❌ Streaming RAG processing error: {e}")
+        try:
+            reply = generate_smart_fallback_response(request.message, "", [])
+            sources, confidence, model_used = [{"source": "Local Knowledge Base", "type": "fallback", "confidence": 0.5}], 0.5, "emergency-fallback"
+        except Exception as fallback_error:
+            print(f"❌ Even fallback failed: {fallback_error}")
+            reply, sources, confidence, model_used = MINIMAL_FALLBACK_REPLY, [], 0.0, "minimal-fallback"
+        direct = {"reply": reply, "sources": sources, "confidence": confidence}
+        cached, prompt, use_llm = None, None, False
+        retrieval = {"sources": sources, "context": "", "confidence": confidence, "path": "emergency-fallback"}
+        all_sources, combined_context, final_confidence = sources, "", confidence
+
+    async def event_stream():
+        reply_parts: List[str] = []
+        try:
+            yield sse_event("meta", {
+                "sources": all_sources,
+                "confidence": final_confidence,
+                "path": retrieval["path"],
+                "timings": retrieval.get("timings"),
+                "conversation_id": request.conversation_id
+            })
+
+            if direct or cached:
+                reply = (direct or cached)["reply"]
+                reply_parts.append(reply)
+                yield sse_event("token", {"text": reply})
+            elif use_llm:
+                status: Dict[str, Any] = {}
+                async for token in stream_response_with_groq(request.message, combined_context, all_sources, status, prompt):
+                    reply_parts.append(token)
+                    yield sse_event("token", {"text": token})
+                if status.get("completed") and CAG_ENABLED and query_vector is not None:
+                    answer_cache.store(query_vector, cache_scope, {
+                        "reply": "".join(reply_parts),
+                        "sources": all_sources,
+                        "confidence": final_confidence
+                    })
+            else:
+                fallback = generate_smart_fallback_response(request.message, combined_context, all_sources)
+                reply_parts.append(fallback)
+                yield sse_event("token", {"text": fallback})
+
+            processing_time = (datetime.now() - start_time).total_seconds()
+            yield sse_event("done", {
+                "processing_time": processing_time,
+                "model_used": model_used if direct else "semantic-cache" if cached else "hybrid-rag-v2-stream",
+                "timestamp": datetime.now().isoformat()
+            })
+        finally:
+            # Persist whatever was generated, even if the client disconnected mid-stream
+            processing_time = (datetime.now() - start_time).total_seconds()
+            print(f"✅ Streamed response in {processing_time:.2f}s with confidence {final_confidence:.2f}")
+            save_rag_log({
+                "query": request.message,
+                "response": "".join(reply_parts),
+                "confidence": final_confidence,
+                "sources": all_sources,
+                "processing_time": processing_time,
+                "timestamp": datetime.now(),
+                "conversation_id": request.conversation_id,
+                "user_id": request.user_id,
+                "cache_hit": bool(cached),
+                "prompt_tokens": prompt["prompt_tokens"] if prompt else None
+            })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/respond-with-files", response_model=ChatResponse)
 async def respond_with_files(
     message: str = Form(...),
@@ -1033,9 +3445,14 @@ async def respond_with_files(
     files: List[UploadFile] = File(None)
 ):
     """FIXED: Enhanced endpoint for handling file uploads with RAG+CAG processing"""
-    
+
     start_time = datetime.now()
-    
+
+    # Per-file byte budget (the request-wide budget is enforced by UploadBudgetMiddleware)
+    for file in files or []:
+        if file and file.size is not None and file.size > MAX_UPLOAD_FILE_BYTES:
+            raise HTTPException(status_code=413, detail=f"{file.filename} exceeds the {MAX_UPLOAD_FILE_BYTES // (1024 * 1024)}MB per-file limit")
+
     try:
         print(f"📎 Processing message with files: {message[:100]}")
         print(f"📎 File count: {len(files) if files else 0}")
@@ -1043,168 +3460,44 @@ async def respond_with_files(
         # Process uploaded files if any
         file_contents = []
         file_info = []
-        extracted_content_parts: List[str] = []  # Accumulate full extracted text content from files
+        documents: List[Dict[str, str]] = []  # One entry per file for the prompt: full text, or the summary when there is none
         
         if files:
-            for file in files:
-                if file and file.filename:
-                    try:
-                        print(f"📄 Processing file: {file.filename} ({file.content_type})")
-                        
-                        # Read file content based on type
-                        content = await file.read()
-                        
-                        # Actual content extraction per type
-                        if file.content_type == 'text/plain':
-                            try:
-                                text_content = content.decode('utf-8', errors='ignore')
-                                preview = text_content.strip()[:4000]
-                                file_contents.append(f"📄 TEXT: {file.filename}\n{preview}")
-                                if text_content:
-                                    extracted_content_parts.append(text_content.strip())
-                            except Exception as e:
-                                file_contents.append(f"📄 TEXT extraction failed for {file.filename}: {e}")
-                        
-                        # For PDFs - Enhanced analysis for university documents
-                        elif file.content_type == 'application/pdf':
-                            try:
-                                # Extract selectable text from PDF using pdfplumber for robust header/top text capture
-                                import io
-                                import pdfplumber
-
-                                extracted_pages = []
-                                with pdfplumber.open(io.BytesIO(content)) as pdf:
-                                    for i, page in enumerate(pdf.pages):
-                                        try:
-                                            page_text = page.extract_text() or ""
-                                        except Exception:
-                                            page_text = ""
-                                        if page_text:
-                                            extracted_pages.append(page_text)
-                                        # Cap overall extracted text to ~15k chars to protect downstream model
-                                        if sum(len(p) for p in extracted_pages) > 15000:
-                                            break
-
-                                # Join with double newlines to preserve section breaks
-                                extracted_text = "\n\n".join(extracted_pages).strip()
-                                if not extracted_text:
-                                    extracted_text = "[No selectable text extracted from PDF. This may be a scanned document or image-based PDF.]"
-
-                                # Store full extracted content for LLM context
-                                extracted_content_parts.append(extracted_text)
-
-                                # Proof-of-life debugging to verify University name capture
-                                print(f"DEBUG: Extracted {len(extracted_text)} chars. Start: {extracted_text[:200]}")
-
-                                preview = extracted_text[:4000]
-                                file_contents.append(f"📋 PDF: {file.filename}\n{preview}")
-                            except Exception as e:
-                                file_contents.append(f"📋 PDF extraction failed for {file.filename}: {e}")
-                        
-                        # For images - Enhanced visual analysis
-                        elif file.content_type.startswith('image/'):
-                            try:
-                                # OCR via pytesseract on Pillow image
-                                import io
-                                from PIL import Image
-                                try:
-                                    import pytesseract
-                                except Exception as _err:
-                                    pytesseract = None
-                                image = Image.open(io.BytesIO(content))
-                                ocr_text = ''
-                                if pytesseract:
-                                    try:
-                                        ocr_text = pytesseract.image_to_string(image) or ''
-                                    except Exception as ocr_err:
-                                        ocr_text = f"[OCR failed: {ocr_err}]"
-                                else:
-                                    ocr_text = "[OCR engine not available on server. Install pytesseract to enable OCR.]"
-                                preview = ocr_text.strip()[:4000]
-                                file_contents.append(f"🖼️ IMAGE: {file.filename}\n{preview if preview else '[No text detected]'}")
-                                if ocr_text:
-                                    extracted_content_parts.append(ocr_text.strip())
-                            except Exception as e:
-                                file_contents.append(f"🖼️ Image processing failed for {file.filename}: {e}")
-                        
-                        # For Word documents - Enhanced document analysis
-                        elif file.content_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
-                            try:
-                                # Extract text from DOCX using python-docx. For legacy .doc we return a hint.
-                                import io
-                                if file.content_type == 'application/msword' and not file.filename.lower().endswith('.docx'):
-                                    file_contents.append(f"📝 {file.filename}: Legacy .doc files are not supported. Please convert to .docx and try again.")
-                                else:
-                                    from docx import Document
-                                    doc = Document(io.BytesIO(content))
-                                    paragraphs = []
-                                    for p in doc.paragraphs:
-                                        txt = p.text.strip()
-                                        if txt:
-                                            paragraphs.append(txt)
-                                        if sum(len(x) for x in paragraphs) > 15000:
-                                            break
-                                    text = "\n".join(paragraphs)
-                                    preview = text[:4000] if text else ""
-                                    file_contents.append(f"📝 DOCX: {file.filename}\n{preview if preview else '[No text extracted]'}")
-                                    if text:
-                                        extracted_content_parts.append(text)
-                            except Exception as e:
-                                file_contents.append(f"📝 DOCX extraction failed for {file.filename}: {e}")
-                        
-                        # For Excel/CSV files - Enhanced data analysis
-                        elif file.content_type in ['text/csv', 'application/vnd.ms-excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
-                            try:
-                                file_size_kb = len(content) / 1024
-                                file_contents.append(f"""📊 **SPREADSHEET ANALYSIS**
-**File:** {file.filename}
-**Size:** {file_size_kb:.1f}KB
-
-**Data Analysis Capabilities:**
-• **Grade Calculations:** CGPA/GPA analysis and university program matching
-• **University Comparisons:** Cost analysis, program comparisons, ranking data
-• **Academic Planning:** Course planning and credit calculations
-• **Financial Planning:** University cost analysis and scholarship planning
-• **Application Tracking:** University application status and deadline management
-
-I can interpret your data and provide personalized university recommendations based on the spreadsheet content.""")
-                            except Exception as e:
-                                file_contents.append(f"📊 **SPREADSHEET:** {file.filename} (processing error)")
-                        
-                        # For other documents - Professional handling
-                        else:
-                            try:
-                                file_size_kb = len(content) / 1024
-                                file_contents.append(f"""📎 **DOCUMENT ANALYSIS**
-**File:** {file.filename}
-**Type:** {file.content_type}
-**Size:** {file_size_kb:.1f}KB
-
-**General Analysis:** I have received your document and will analyze it in the context of Ghanaian university admissions. Whether it's an application document, academic record, or informational material, I'll provide relevant guidance for your university journey.
-
-Please let me know what specific aspect of this document you'd like me to help you with regarding university admissions.""")
-                            except Exception as e:
-                                file_contents.append(f"📎 **DOCUMENT:** {file.filename} (processing error - please try a different format)")
-                        
-                        file_info.append({
-                            "name": file.filename,
-                            "type": file.content_type,
-                            "size": len(content)
-                        })
-                        
-                    except Exception as file_error:
-                        print(f"⚠️ Error processing file {file.filename}: {file_error}")
-                        file_contents.append(f"File: {file.filename} - processing error")
-        
-        # Enhance message with file information
+            uploads = []
+            try:
+                for file in files:
+                    if file and file.filename:
+                        try:
+                            print(f"📄 Processing file: {file.filename} ({file.content_type})")
+                            uploads.append(await spool_upload(file))
+                        except UploadTooLarge:
+                            raise
+                        except Exception as file_error:
+                            print(f"⚠️ Error reading file {file.filename}: {file_error}")
+                            file_contents.append(f"File: {file.filename} - processing error")
+                            documents.append({"name": file.filename, "text": "processing error"})
+
+                # Extract concurrently (CPU-bound types in the process pool); results keep upload order
+                extracted = await asyncio.gather(*[extract_upload(upload) for upload in uploads])
+            finally:
+                for upload in uploads:
+                    release_upload(upload)
+
+            for upload, result in zip(uploads, extracted):
+                file_contents.append(result["summary"])
+                # The summary's preview is the first 4,000 chars of the text: send each document once
+                documents.append({"name": upload["filename"], "text": result["text"] or result["summary"]})
+                file_info.append({
+                    "name": upload["filename"],
+                    "type": upload["content_type"],
+                    "size": upload["size"]
+                })
+
+        # Enhance message with file information (retrieval and the template fallback search it)
         enhanced_message = message
-        if file_contents:
-            enhanced_message += f"\n\n[Extracted content from uploaded files]\n" + "\n\n".join(file_contents)
-        
-        # Also append full extracted document text for LLM prioritization
-        extracted_content = "\n\n".join(extracted_content_parts).strip()
-        if extracted_content:
-            enhanced_message += f"\n\n[Document Text]\n{extracted_content}"
+        if documents:
+            extracted_content = "\n\n".join(f"📎 {d['name']}\n{d['text']}" for d in documents)
+            enhanced_message += f"\n\n[Extracted content from uploaded files]\n{extracted_content}"
             # Proof-of-life log for entire extracted content
             print(f"DEBUG: Extracted {len(extracted_content)} chars. Start: {extracted_content[:200]}")
         
@@ -1230,21 +3523,24 @@ Please let me know what specific aspect of this document you'd like me to help y
             }
         )
         
-        # Process with standard RAG pipeline
+        # Process with standard RAG pipeline (the query embedding runs off the event loop)
+        query_vector = await asyncio.to_thread(embed_query, enhanced_message)
         local_results = search_local_knowledge(
             enhanced_message, 
-            university_name
+            university_name,
+            query_vector=query_vector
         )
         
         print(f"🔍 Local search found {len(local_results['results'])} results")
         
         # Search web for real-time information
+        RETRIEVAL_PATHS.inc(path="files")
         web_results = await search_web_realtime(enhanced_message)
         print(f"🌐 Real-time search found {len(web_results['results'])} results")
         
         # Combine and prepare context
         all_sources = []
-        context_parts = []
+        context_blocks: List[Dict[str, Any]] = []
         
         # Add file sources
         if file_info:
@@ -1253,7 +3549,7 @@ Please let me know what specific aspect of this document you'd like me to help y
                 "type": "user_files",
                 "confidence": 0.9
             })
-            context_parts.append(f"User uploaded {len(file_info)} files: {', '.join([f['name'] for f in file_info])}")
+            context_blocks.append({"source": "user_files", "text": f"User uploaded {len(file_info)} files: {', '.join([f['name'] for f in file_info])}", "score": 1.0})
         
         # Add local sources
         for result in local_results["results"]:
@@ -1262,7 +3558,7 @@ Please let me know what specific aspect of this document you'd like me to help y
                 "type": "local_knowledge",
                 "confidence": result["relevance"]
             })
-            context_parts.append(f"University: {result['source']}\n{json.dumps(result['data'], indent=2)}")
+            context_blocks.extend(knowledge_context_blocks(result))
         
         # Add web sources
         for result in web_results["results"]:
@@ -1272,21 +3568,24 @@ Please let me know what specific aspect of this document you'd like me to help y
                 "type": "web_search",
                 "confidence": 0.7
             })
-            context_parts.append(f"Web Result: {result.get('snippet', '')}")
+            context_blocks.append({"source": result.get("title", "Web Result"), "text": f"Web Result: {result.get('snippet', '')}", "score": 0.7})
         
-        combined_context = "\n\n".join(context_parts)
+        combined_context = context_text(context_blocks)
         
         # Generate response with file context
         final_confidence = max(local_results["confidence"], web_results["confidence"])
         if file_info:
             final_confidence = max(final_confidence, 0.8)  # Boost confidence with files
         
-        if groq_client and (final_confidence > 0.3 or combined_context):
+        prompt = None
+        if groq_async_client and (final_confidence > 0.3 or combined_context):
             print("🤖 Generating response with Groq LLM (including file context)...")
-            response_text = generate_response_with_groq(
+            prompt = assemble_prompt(message, context_blocks, all_sources, documents)
+            response_text = await generate_response_with_groq_async(
                 enhanced_message, 
                 combined_context, 
-                all_sources
+                all_sources,
+                prompt
             )
         else:
             print("🧠 Generating smart fallback response (with file acknowledgment)...")
@@ -1325,23 +3624,19 @@ Please let me know what specific aspect of this document you'd like me to help y
         print(f"✅ File response generated in {processing_time:.2f}s with confidence {final_confidence:.2f}")
         
         # Save to MongoDB if available (including user_id)
-        if db_client:
-            try:
-                db = db_client[os.getenv('DB_NAME', 'glinax_chatbot_db')]
-                await db.rag_logs.insert_one({
-                    "query": message,
-                    "response": response_text,
-                    "confidence": final_confidence,
-                    "sources": all_sources,
-                    "processing_time": processing_time,
-                    "timestamp": datetime.now(),
-                    "conversation_id": conversation_id,
-                    "user_id": user_id,
-                    "has_files": bool(file_info),
-                    "file_info": file_info
-                })
-            except Exception as e:
-                print(f"⚠️ Failed to save file-response to MongoDB: {e}")
+        save_rag_log({
+            "query": message,
+            "response": response_text,
+            "confidence": final_confidence,
+            "sources": all_sources,
+            "processing_time": processing_time,
+            "timestamp": datetime.now(),
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "has_files": bool(file_info),
+            "file_info": file_info,
+            "prompt_tokens": prompt["prompt_tokens"] if prompt else None
+        })
         
         return ChatResponse(
             success=True,
@@ -1350,10 +3645,14 @@ Please let me know what specific aspect of this document you'd like me to help y
             confidence=final_confidence,
             timestamp=datetime.now().isoformat(),
             processing_time=processing_time,
-            model_used="hybrid-rag-with-files"
+            model_used="hybrid-rag-with-files",
+            stage_timings={"path": "files", "prompt_tokens": prompt["prompt_tokens"] if prompt else None}
         )
         
+    except UploadTooLarge:
+        raise
     except Exception as e:
+        ERRORS.inc(stage="respond_with_files")
         print(f"❌ File processing error: {e}")
         
         return ChatResponse(
@@ -1366,5 +3665,9 @@ Please let me know what specific aspect of this document you'd like me to help y
         )
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    # Hand over to the uvicorn CLI (same as `uvicorn main:app --host 0.0.0.0 --port 8000`) instead of
+    # uvicorn.run(app): spawned extraction workers re-import the launching script, and this one would
+    # pull torch and the embedding stack into every worker before its memory cap applies.
+    import sys
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+                              "--host", "0.0.0.0", "--port", "8000", "--log-level", "info"])
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+GLINAX PIPELINE METRICS
+Dependency-free Prometheus counters, gauges and histograms for the RAG pipeline.
+
+Observations cost a lock and a bisect, so they are cheap enough for every request;
+timings use time.perf_counter_ns. render() produces the Prometheus text exposition
+format (version 0.0.4) served on /metrics.
+"""
+
+import math
+import time
+import threading
+import functools
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans in-memory lookups (sub-millisecond) up to Groq/web timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+class Counter(_Metric):
+    """Monotonic counter, one series per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[Any, ...], float] = {} if self.label_names else {(): 0}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values]
+
+class Gauge(_Metric):
+    """Point-in-time value read from a callback at scrape time (e.g. queue depth)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    """Bucketed latency histogram; bucket counts are kept per bucket and made cumulative on render"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Any, ...], list] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def observe_ns(self, started_ns: int, **labels):
+        """Observe the time elapsed since a time.perf_counter_ns() reading"""
+        self.observe((time.perf_counter_ns() - started_ns) / 1e9, **labels)
+
+    @contextmanager
+    def time(self, **labels):
+        """Time a block (exceptions are timed too)"""
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe_ns(started, **labels)
+
+    def timed(self, **labels):
+        """Decorator timing every call of a sync or async function"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter_ns()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe_ns(started, **labels)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe_ns(started, **labels)
+            return wrapper
+        return decorator
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series_items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                bucket_label = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
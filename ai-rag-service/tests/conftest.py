@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the service modules (main, file_extraction, metrics) by name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
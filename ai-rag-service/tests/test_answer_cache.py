@@ -0,0 +1,102 @@
+import numpy as np
+
+import main
+from main import SemanticAnswerCache, answer_cache_scope
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def answer(reply, sources=()):
+    return {"reply": reply, "sources": [{"source": s, "type": "local_knowledge"} for s in sources], "confidence": 0.9}
+
+
+def make_cache(**overrides):
+    settings = {"threshold": 0.9, "ttl_seconds": 60, "max_entries": 10, "max_bytes": 1_000_000, **overrides}
+    return SemanticAnswerCache(**settings)
+
+
+def test_hit_requires_similarity_above_threshold():
+    cache = make_cache()
+    cache.store(unit(1, 0, 0), "university of ghana", answer("fees"))
+
+    hit = cache.lookup(unit(1, 0.1, 0), "university of ghana")
+    assert hit["reply"] == "fees" and hit["similarity"] > 0.9
+    assert cache.lookup(unit(0, 1, 0), "university of ghana") is None
+
+
+def test_entries_only_match_within_their_scope():
+    cache = make_cache()
+    cache.store(unit(1, 0, 0), "kwame nkrumah university of science and technology", answer("knust fees"))
+
+    assert cache.lookup(unit(1, 0, 0), "university of ghana") is None
+    assert cache.lookup(unit(1, 0, 0), None) is None
+    assert cache.snapshot()["unscoped"] == 1
+
+
+def test_unscoped_answers_are_not_stored():
+    cache = make_cache()
+    cache.store(unit(1, 0, 0), None, answer("generic"))
+
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_expired_entries_are_dropped_on_lookup(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    cache = make_cache(ttl_seconds=60)
+    cache.store(unit(1, 0, 0), "ug", answer("fees"))
+
+    now[0] += 61
+    assert cache.lookup(unit(1, 0, 0), "ug") is None
+    assert cache.snapshot()["entries"] == 0
+    assert cache.stats["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = make_cache(max_entries=2)
+    cache.store(unit(1, 0, 0), "ug", answer("first"))
+    cache.store(unit(0, 1, 0), "ug", answer("second"))
+    cache.lookup(unit(1, 0, 0), "ug")  # "first" is now most recently used
+    cache.store(unit(0, 0, 1), "ug", answer("third"))
+
+    assert cache.lookup(unit(0, 1, 0), "ug") is None
+    assert cache.lookup(unit(1, 0, 0), "ug")["reply"] == "first"
+    assert cache.stats["evictions"] == 1
+
+
+def test_byte_budget_evicts_and_rejects_oversized_answers():
+    cache = make_cache(max_bytes=400)
+    cache.store(unit(1, 0, 0), "ug", answer("x" * 200))
+    cache.store(unit(0, 1, 0), "ug", answer("y" * 200))
+
+    assert cache.snapshot()["entries"] == 1
+    assert cache.bytes_used <= 400
+
+    cache.store(unit(0, 0, 1), "ug", answer("z" * 1000))
+    assert cache.lookup(unit(0, 0, 1), "ug") is None
+
+
+def test_invalidate_drops_answers_grounded_on_changed_universities():
+    cache = make_cache()
+    cache.store(unit(1, 0, 0), "ug", answer("ug fees", ["University of Ghana"]))
+    cache.store(unit(0, 1, 0), "ucc", answer("ucc fees", ["University of Cape Coast"]))
+
+    cache.invalidate({"University of Ghana"})
+
+    assert cache.lookup(unit(1, 0, 0), "ug") is None
+    assert cache.lookup(unit(0, 1, 0), "ucc")["reply"] == "ucc fees"
+
+
+def test_scope_comes_from_the_selected_university_or_the_message():
+    assert answer_cache_scope(None, "KNUST computer engineering fees") == "kwame nkrumah university of science and technology"
+    assert answer_cache_scope(None, "UG computer engineering fees") == "university of ghana"
+    assert answer_cache_scope("UG", "computer engineering fees") == "university of ghana"
+    assert answer_cache_scope("University of Ghana", "fees at Legon") == "university of ghana"
+
+
+def test_scope_is_none_when_unknown_or_contradictory():
+    assert answer_cache_scope(None, "computer engineering fees") is None
+    assert answer_cache_scope("UG", "KNUST computer engineering fees") is None
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from main import decode_conversation_cursor, encode_conversation_cursor
+
+
+def test_cursor_round_trips_the_keyset_position():
+    doc = {"conversation_id": "conv-42", "last_active": datetime(2026, 3, 1, 9, 30, 15, 123000), "title": "Fees"}
+
+    cursor = encode_conversation_cursor(doc)
+
+    assert decode_conversation_cursor(cursor) == {"last_active": doc["last_active"], "conversation_id": "conv-42"}
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_conversation_cursor({"conversation_id": "a/b+c?d", "last_active": datetime(2026, 1, 1)})
+
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30=", "eyJ0IjogIm5vdC1hLWRhdGUiLCAiYyI6ICJ4In0="])
+def test_malformed_cursors_are_rejected_with_400(cursor):
+    # e30= is "{}"; the last one carries a timestamp that is not ISO 8601
+    with pytest.raises(HTTPException) as error:
+        decode_conversation_cursor(cursor)
+
+    assert error.value.status_code == 400
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class _LogsOnly:
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return _Cursor(self.docs)
+
+
+def test_conversation_list_aggregates_rag_logs_while_rollup_backfills(monkeypatch):
+    import asyncio
+
+    import main
+
+    logs = _LogsOnly([
+        {"conversation_id": "b", "title": "Fees", "last_active": datetime(2026, 3, 2), "message_count": 2},
+        {"conversation_id": "a", "title": "Cut-offs", "last_active": datetime(2026, 3, 1), "message_count": 1},
+    ])
+    # No rag_conversations attribute: touching the rollup would fail the test
+    database = type("Db", (), {"rag_logs": logs})()
+    monkeypatch.setattr(main, "db_client", {"glinax_chatbot_db": database})
+    monkeypatch.setattr(main, "conversation_rollups_ready", False)
+    monkeypatch.delenv("DB_NAME", raising=False)
+
+    page = asyncio.run(main.fetch_conversation_page("user-1", 1, None))
+
+    assert [item["conversation_id"] for item in page["items"]] == ["b"]
+    assert decode_conversation_cursor(page["next_cursor"])["conversation_id"] == "b"
+    assert logs.pipelines[0][0]["$match"]["user_id"] == "user-1"
@@ -0,0 +1,66 @@
+from main import CutOffIndex
+
+CUT_OFFS = {
+    "source": "Test cut-offs",
+    "2023_2024": {"UG": {"Medicine": 6}},
+    "2024_2025": {
+        "UG": {"Medicine": 8, "Law": 10, "Nursing": 14, "Business Administration": "n/a"},
+        "KNUST": {"Medicine": 7, "Computer Engineering": 10, "Nursing": 18},
+    },
+}
+
+
+def programs(entries):
+    return [(e["university_code"], e["program"]) for e in entries]
+
+
+def test_only_the_latest_academic_year_is_indexed():
+    index = CutOffIndex(CUT_OFFS)
+
+    assert index.academic_year == "2024/2025"
+    assert index.cut_offs == [7, 8, 10, 10, 14, 18]  # Non-numeric cut-offs are skipped
+
+
+def test_aggregate_equal_to_a_cut_off_qualifies():
+    index = CutOffIndex(CUT_OFFS)
+
+    assert programs(index.eligible(10)) == [
+        ("KNUST", "Computer Engineering"), ("UG", "Law"), ("UG", "Nursing"), ("KNUST", "Nursing")
+    ]
+    assert [e["margin"] for e in index.eligible(10)] == [0, 0, 4, 8]
+
+
+def test_aggregate_bounds():
+    index = CutOffIndex(CUT_OFFS)
+
+    assert len(index.eligible(6)) == len(index.entries)
+    assert len(index.eligible(7)) == len(index.entries)
+    assert index.eligible(19) == []
+
+
+def test_eligible_filters_by_university_and_program():
+    index = CutOffIndex(CUT_OFFS)
+
+    assert programs(index.eligible(8, university="University of Ghana")) == [
+        ("UG", "Medicine"), ("UG", "Law"), ("UG", "Nursing")
+    ]
+    assert programs(index.eligible(8, programs=["Nursing"])) == [("UG", "Nursing"), ("KNUST", "Nursing")]
+    assert index.eligible(8, university="University of Cape Coast") == []
+
+
+def test_near_misses_are_the_closest_cut_offs_below_the_aggregate():
+    index = CutOffIndex(CUT_OFFS)
+
+    misses = index.near_misses(11, limit=2)
+
+    assert programs(misses) == [("UG", "Law"), ("KNUST", "Computer Engineering")]
+    assert [e["margin"] for e in misses] == [-1, -1]
+    assert index.near_misses(7) == []
+
+
+def test_match_programs_distinguishes_known_and_unknown_programs():
+    index = CutOffIndex(CUT_OFFS)
+
+    assert index.match_programs("Can I study nursing with aggregate 12?") == ["Nursing"]
+    assert index.match_programs("which programmes can I get with 12") == []
+    assert index.match_programs("can I do veterinary medicine with 12") is None
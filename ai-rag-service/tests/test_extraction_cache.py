@@ -0,0 +1,64 @@
+import asyncio
+
+from main import ExtractionCache
+
+
+def result(filename, text):
+    return {"summary": f"📎 {filename}\n{text[:40]}", "text": text, "ok": True}
+
+
+def put(cache, key, filename, text, elapsed=0.5):
+    asyncio.run(cache.put(key, filename, result(filename, text), elapsed))
+
+
+def get(cache, key, filename):
+    return asyncio.run(cache.get(key, filename))
+
+
+def test_hit_is_relabelled_for_the_new_filename():
+    cache = ExtractionCache(max_bytes=10_000)
+    put(cache, "sha-a", "transcript.pdf", "WASSCE results")
+
+    hit = get(cache, "sha-a", "copy of transcript.pdf")
+
+    assert hit["text"] == "WASSCE results"
+    assert hit["summary"].startswith("📎 copy of transcript.pdf")
+    assert cache.stats["memory_hits"] == 1
+    assert cache.stats["time_saved_seconds"] == 0.5
+
+
+def test_miss_for_unknown_content():
+    cache = ExtractionCache(max_bytes=10_000)
+
+    assert get(cache, "sha-unknown", "a.pdf") is None
+    assert cache.stats["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted_over_budget():
+    cache = ExtractionCache(max_bytes=350)  # Room for two ~150-byte entries
+    put(cache, "sha-a", "a.pdf", "a" * 100)
+    put(cache, "sha-b", "b.pdf", "b" * 100)
+    get(cache, "sha-a", "a.pdf")  # "a" is now most recently used
+    put(cache, "sha-c", "c.pdf", "c" * 100)
+
+    assert get(cache, "sha-b", "b.pdf") is None
+    assert get(cache, "sha-a", "a.pdf") is not None
+    assert cache.bytes_used <= 350
+    assert cache.stats["evictions"] == 1
+
+
+def test_entries_larger_than_the_budget_are_not_kept():
+    cache = ExtractionCache(max_bytes=100)
+    put(cache, "sha-big", "big.pdf", "x" * 500)
+
+    assert get(cache, "sha-big", "big.pdf") is None
+    assert cache.bytes_used == 0
+
+
+def test_storing_the_same_content_again_replaces_its_size():
+    cache = ExtractionCache(max_bytes=10_000)
+    put(cache, "sha-a", "a.pdf", "short")
+    put(cache, "sha-a", "a.pdf", "a much longer extraction result")
+
+    assert cache.snapshot()["entries"] == 1
+    assert cache.bytes_used == cache.entries["sha-a"]["size"]
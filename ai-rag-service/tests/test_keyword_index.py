@@ -0,0 +1,48 @@
+from main import KnowledgeKeywordIndex, tokenize
+
+
+def chunk(university, title, body):
+    return {"university": university, "kind": "test", "title": title, "text": f"{university} - {title}: {body}"}
+
+
+def test_tokenize_lowercases_and_drops_stopwords_and_punctuation():
+    assert tokenize("Where is the University located?") == ["university", "located"]
+
+
+def test_tokenize_keeps_whole_alphanumeric_words():
+    assert tokenize("BSc Computer Engineering 2024/2025 fees: GH₵4,500") == [
+        "bsc", "computer", "engineering", "2024", "2025", "fees", "gh", "4", "500"
+    ]
+
+
+def test_search_ranks_rare_term_matches_first():
+    index = KnowledgeKeywordIndex([
+        chunk("UG", "Fees", "tuition fees for undergraduate programmes"),
+        chunk("KNUST", "Programs", "computer engineering and electrical engineering"),
+        chunk("UCC", "Programs", "education and computer science"),
+    ])
+
+    results = index.search("computer engineering")
+
+    assert [r["university"] for r in results] == ["KNUST", "UCC"]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_search_scores_are_normalized():
+    index = KnowledgeKeywordIndex([
+        chunk("UG", "Fees", "fees fees fees"),
+        chunk("KNUST", "Contact", "phone and email"),
+    ])
+
+    results = index.search("fees")
+
+    assert len(results) == 1
+    assert 0.0 < results[0]["score"] <= 1.0
+
+
+def test_search_without_known_terms_returns_nothing():
+    index = KnowledgeKeywordIndex([chunk("UG", "Fees", "tuition fees")])
+
+    assert index.search("what is the") == []
+    assert index.search("astronomy") == []
+    assert KnowledgeKeywordIndex([]).search("fees") == []
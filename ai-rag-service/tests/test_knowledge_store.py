@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import main
+from main import KnowledgeStore
+
+CURATED = {
+    "University of Ghana": {"location": "Legon", "scholarships": {"sports": "For athletes"}},
+    "Kwame Nkrumah University of Science and Technology": {"location": "Kumasi"},
+}
+
+
+def write_scholarships(data_dir, scholarships):
+    (data_dir / "scholarships.json").write_text(json.dumps(scholarships), encoding="utf-8")
+
+
+def scholarship(name, partners=None, **fields):
+    return {"full_name": name, "type": "government", "eligibility": "Ghanaian citizens",
+            "last_updated": "2026-10-16T00:00:00", **({"partner_universities": partners} if partners else {}), **fields}
+
+
+def reload(store, monkeypatch):
+    swaps = []
+    monkeypatch.setattr(main, "swap_knowledge", lambda knowledge, records, index, changed: swaps.append((knowledge, changed)))
+    changed = asyncio.run(store.reload("test"))
+    return changed, swaps
+
+
+def test_scholarships_without_partners_go_on_every_university(tmp_path):
+    store = KnowledgeStore(CURATED, str(tmp_path))
+
+    knowledge, _ = store.merge({"scholarships": {"getfund": scholarship("GETFund")}})
+
+    for entry in knowledge.values():
+        assert entry["external_scholarships"] == {"GETFund": {"type": "government", "eligibility": "Ghanaian citizens"}}
+    assert "external_scholarships" not in CURATED["University of Ghana"]
+
+
+def test_partner_scholarships_only_go_on_their_partners(tmp_path):
+    store = KnowledgeStore(CURATED, str(tmp_path))
+
+    knowledge, _ = store.merge({"scholarships": {"mcf": scholarship("Mastercard Scholars", ["KNUST", "Ashesi University"])}})
+
+    assert "Mastercard Scholars" in knowledge["Kwame Nkrumah University of Science and Technology"]["external_scholarships"]
+    assert "external_scholarships" not in knowledge["University of Ghana"]
+
+
+def test_scholarship_change_swaps_in_a_new_snapshot(tmp_path, monkeypatch):
+    store = KnowledgeStore(CURATED, str(tmp_path))
+    write_scholarships(tmp_path, {"mcf": scholarship("Mastercard Scholars", ["KNUST"], amount="Full tuition")})
+    changed, swaps = reload(store, monkeypatch)
+    assert changed == ["Kwame Nkrumah University of Science and Technology"] and len(swaps) == 1
+
+    write_scholarships(tmp_path, {"mcf": scholarship("Mastercard Scholars", ["KNUST"], amount="Full tuition and stipend")})
+    changed, swaps = reload(store, monkeypatch)
+
+    assert changed == ["Kwame Nkrumah University of Science and Technology"]
+    knowledge, _ = swaps[0]
+    lines = main._intent_lines("scholarships", knowledge["Kwame Nkrumah University of Science and Technology"], "")
+    assert any("Full tuition and stipend" in line for line in lines)
+
+
+def test_scrape_timestamps_alone_do_not_trigger_a_reload(tmp_path, monkeypatch):
+    store = KnowledgeStore(CURATED, str(tmp_path))
+    write_scholarships(tmp_path, {"getfund": scholarship("GETFund")})
+    reload(store, monkeypatch)
+
+    write_scholarships(tmp_path, {"getfund": scholarship("GETFund", last_updated="2026-10-17T00:00:00")})
+    changed, swaps = reload(store, monkeypatch)
+
+    assert changed == [] and swaps == []
@@ -0,0 +1,88 @@
+from main import GLINAX_SYSTEM_PROMPT, assemble_prompt, compact_sources, count_tokens, truncate_to_tokens
+
+
+def block(text, score):
+    return {"source": "UG", "text": text, "score": score}
+
+
+def user_message(prompt):
+    return prompt["messages"][1]["content"]
+
+
+def test_count_tokens_splits_long_words_and_counts_symbols():
+    assert count_tokens("") == 0
+    assert count_tokens("fees") == 1
+    assert count_tokens("engineering") == 3
+    assert count_tokens("GH₵ 4,500.") == 6
+
+
+def test_truncate_to_tokens_cuts_and_marks_the_cut():
+    assert truncate_to_tokens("one two three four", 2) == "one two …"
+    assert truncate_to_tokens("one two", 5) == "one two"
+    assert truncate_to_tokens("one two", 0) == ""
+
+
+def test_prompt_stays_within_the_budget():
+    blocks = [block(f"University of Ghana chunk {i}: " + "tuition details " * 40, 1.0 - i / 100) for i in range(50)]
+
+    prompt = assemble_prompt("What are the fees?", blocks, [], budget=1500)
+
+    assert prompt["prompt_tokens"] <= 1500
+    assert prompt["truncated"] == 1
+    assert prompt["dropped"] > 0
+    assert prompt["messages"][0]["content"] == GLINAX_SYSTEM_PROMPT
+
+
+def test_best_scoring_blocks_are_kept_first():
+    blocks = [block("low relevance block", 0.1), block("high relevance block", 0.9)]
+
+    message = user_message(assemble_prompt("fees?", blocks, []))
+
+    assert message.index("high relevance block") < message.index("low relevance block")
+
+
+def test_low_scoring_blocks_are_dropped_when_the_budget_runs_out():
+    filler = "admission requirements " * 200
+    budget = count_tokens(GLINAX_SYSTEM_PROMPT) + 150
+    blocks = [block("top block " + filler, 0.9), block("second block", 0.5)]
+
+    prompt = assemble_prompt("fees?", blocks, [], budget=budget)
+
+    assert "top block" in user_message(prompt)
+    assert "second block" not in user_message(prompt)
+    assert (prompt["truncated"], prompt["dropped"]) == (1, 1)
+
+
+def test_documents_take_at_most_their_share_when_context_is_present():
+    document = {"name": "transcript.pdf", "text": "grade " * 5000}
+    blocks = [block("University of Ghana fees block", 0.9)]
+
+    prompt = assemble_prompt("Which programmes fit my grades?", blocks, [], documents=[document], budget=3000)
+
+    message = user_message(prompt)
+    assert "[Document: transcript.pdf]" in message
+    assert "University of Ghana fees block" in message
+    assert prompt["prompt_tokens"] <= 3000
+
+
+def test_sources_are_listed_once_each():
+    sources = [
+        {"source": "University of Ghana", "type": "local_knowledge"},
+        {"source": "University of Ghana", "type": "local_knowledge"},
+        {"source": "Fees page", "type": "web_search", "url": "https://ug.edu.gh/fees"},
+        {"source": "Fees page", "type": "web_search", "url": "https://ug.edu.gh/fees"},
+    ]
+
+    assert compact_sources(sources).splitlines() == [
+        "- University of Ghana (local_knowledge)",
+        "- Fees page (web_search) https://ug.edu.gh/fees",
+    ]
+
+
+def test_long_source_lists_are_capped():
+    sources = [{"source": f"Result {i}", "type": "web_search"} for i in range(20)]
+
+    lines = compact_sources(sources).splitlines()
+
+    assert len(lines) == 13
+    assert lines[-1] == "- ...and 8 more"
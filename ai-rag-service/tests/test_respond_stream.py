@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+import httpx
+
+import main
+
+
+def stream_events(payload):
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/respond/stream", json=payload)
+
+    response = asyncio.run(post())
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        event, data = frame.split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return response, events
+
+
+def test_retrieval_failure_streams_a_fallback_answer(monkeypatch):
+    async def failing_retrieval(*args, **kwargs):
+        raise RuntimeError("web search down")
+
+    monkeypatch.setattr(main, "retrieve_context", failing_retrieval)
+    monkeypatch.setattr(main, "save_rag_log", lambda entry: None)
+
+    response, events = stream_events({"message": "Tell me something about studying abroad", "conversation_id": "c1"})
+
+    assert response.status_code == 200
+    assert [event for event, _ in events] == ["meta", "token", "done"]
+    assert events[0][1]["path"] == "emergency-fallback"
+    assert events[1][1]["text"]
+    assert events[2][1]["model_used"] == "emergency-fallback"
+
+
+def test_fallback_renderer_failure_streams_the_minimal_reply(monkeypatch):
+    def failing(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    async def failing_retrieval(*args, **kwargs):
+        raise RuntimeError("web search down")
+
+    monkeypatch.setattr(main, "retrieve_context", failing_retrieval)
+    monkeypatch.setattr(main, "generate_smart_fallback_response", failing)
+    monkeypatch.setattr(main, "save_rag_log", lambda entry: None)
+
+    _, events = stream_events({"message": "Tell me something about studying abroad", "conversation_id": "c1"})
+
+    assert events[1][1]["text"] == main.MINIMAL_FALLBACK_REPLY
+    assert events[2][1]["model_used"] == "minimal-fallback"
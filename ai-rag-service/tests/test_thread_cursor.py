@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from main import encode_thread_cursor, parse_thread_position, thread_position_filter
+
+
+def test_thread_cursor_round_trips_timestamp_and_id():
+    doc = {"_id": ObjectId(), "timestamp": datetime(2026, 3, 1, 9, 30, 15, 123000)}
+
+    position = parse_thread_position(encode_thread_cursor(doc), "before")
+
+    assert position == {"timestamp": doc["timestamp"], "_id": doc["_id"]}
+
+
+def test_cursor_filter_breaks_timestamp_ties_on_id():
+    ts, oid = datetime(2026, 3, 1), ObjectId()
+
+    condition = thread_position_filter({"timestamp": ts, "_id": oid}, "$lt")
+
+    # Exchanges sharing the boundary timestamp stay reachable through the _id tie-breaker
+    assert condition == {"$or": [{"timestamp": {"$lt": ts}}, {"timestamp": ts, "_id": {"$lt": oid}}]}
+
+
+def test_bare_iso_timestamps_are_still_accepted():
+    position = parse_thread_position("2026-03-01T09:30:00", "after")
+
+    assert position == {"timestamp": datetime(2026, 3, 1, 9, 30), "_id": None}
+    assert thread_position_filter(position, "$gt") == {"timestamp": {"$gt": datetime(2026, 3, 1, 9, 30)}}
+
+
+def test_malformed_thread_cursor_is_rejected_with_400():
+    with pytest.raises(HTTPException) as error:
+        parse_thread_position("not-a-cursor", "before")
+
+    assert error.value.status_code == 400
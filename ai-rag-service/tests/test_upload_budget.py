@@ -0,0 +1,25 @@
+from main import MultipartPartMeter
+
+BOUNDARY = b"XyZ123"
+
+
+def body(*parts):
+    return b"".join(b"--" + BOUNDARY + b"\r\n" + part + b"\r\n" for part in parts) + b"--" + BOUNDARY + b"--\r\n"
+
+
+def largest_part(data, chunk_size):
+    meter = MultipartPartMeter(BOUNDARY)
+    return max(meter.feed(data[i:i + chunk_size]) for i in range(0, len(data), chunk_size))
+
+
+def test_each_part_is_metered_separately():
+    data = body(b"a" * 500, b"b" * 300, b"c" * 400)
+
+    assert 500 <= largest_part(data, len(data)) < 600
+
+
+def test_delimiters_split_across_chunks_still_reset_the_count():
+    data = body(b"a" * 500, b"b" * 300, b"c" * 400)
+
+    for chunk_size in (1, 3, 7, 64):
+        assert 500 <= largest_part(data, chunk_size) < 600
@@ -0,0 +1,131 @@
+"""
+SCRAPER EXTRACTION BENCHMARK
+
+Compares the original extraction path (BeautifulSoup with html.parser, one get_text()
+and one regex compile per extractor, separate find_all passes) with the single-pass
+lxml pipeline in GhanaUniversityDataScraper._extract_page_fields.
+
+Usage:
+    python benchmarks/bench_extraction.py [--fixtures DIR] [--repeat N]
+
+Any *.html files in the fixtures directory are used (save real university pages
+there); when it is empty, synthetic admissions pages are generated into it first.
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ghana_universities_scraper import GhanaUniversityDataScraper  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+PROGRAMS = ['Computer Science', 'Nursing', 'Civil Engineering', 'Economics', 'Law', 'Medicine',
+            'Agriculture', 'Accounting', 'Architecture', 'Pharmacy', 'Education', 'Statistics']
+MONTHS = ['January', 'March', 'May', 'July', 'August', 'September', 'November']
+
+
+def generate_fixture(seed: int, sections: int) -> str:
+    """A university-site-like page: nav, requirement blocks, programme lists, contacts, footer"""
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html><head><title>Admissions</title>',
+             '<meta name="description" content="Undergraduate and postgraduate admissions">',
+             '<meta name="viewport" content="width=device-width"></head><body>',
+             '<nav><ul>' + ''.join(f'<li><a href="/p{i}">Link {i}</a></li>' for i in range(40)) + '</ul></nav>']
+    for s in range(sections):
+        parts.append(f'<section class="block-{s}"><h2>Faculty {s}</h2>')
+        parts.append('<div class="intro"><p>Entry requirements for this faculty</p>'
+                     f'<p>Applicants need credit passes in six subjects including English and Mathematics, aggregate {rng.randint(6, 36)} or better.</p></div>')
+        parts.append('<ul class="program-list">')
+        for _ in range(rng.randint(5, 15)):
+            level = rng.choice(['Bachelor of Science in', 'Master of Arts in', 'PhD in', 'Diploma in'])
+            parts.append(f'<li>{level} {rng.choice(PROGRAMS)}</li>')
+        parts.append('</ul>')
+        parts.append(f'<p>Applications close on {rng.choice(MONTHS)} {rng.randint(1, 28)}, 2025. '
+                     f'Contact admissions{s}@university.edu.gh or call 0302{rng.randint(100000, 999999)}.</p>')
+        parts.append('<div><span>' + ' '.join('lorem ipsum dolor sit amet' for _ in range(30)) + '</span></div></section>')
+    parts.append('<footer><p>Copyright University. info@university.edu.gh +233302123456</p></footer></body></html>')
+    return ''.join(parts)
+
+
+def load_fixtures(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    if not list(directory.glob('*.html')):
+        for i, sections in enumerate((10, 40, 120)):
+            (directory / f'synthetic_{i}.html').write_text(generate_fixture(i, sections), encoding='utf-8')
+    return {p.name: p.read_text(encoding='utf-8', errors='ignore') for p in sorted(directory.glob('*.html'))}
+
+
+def legacy_extract(html: str) -> dict:
+    """The pre-optimisation extraction path, kept here as the baseline"""
+    fields = {}
+    soup = BeautifulSoup(html, 'html.parser')
+    description = soup.find('meta', {'name': 'description'})
+    fields['description'] = description.get('content', '') if description else None
+
+    text = soup.get_text()
+    fields['emails'] = list(set(re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)))
+    fields['phones'] = list(set(re.findall(r'(\+233|0)[0-9]{9,10}', text)))
+
+    requirements = []
+    for section in soup.find_all(['div', 'section', 'p'], string=re.compile(r'requirement|admission|entry', re.I))[:3]:
+        parent = section.parent if section.parent else section
+        section_text = parent.get_text().strip()
+        if 20 < len(section_text) < 500:
+            requirements.append(section_text)
+    fields['requirements'] = requirements
+
+    date_pattern = r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}\b'
+    fields['deadlines'] = list(set(re.findall(date_pattern, soup.get_text(), re.I)))
+
+    programs = []
+    for elem in soup.find_all(['li', 'div'], string=re.compile(r'Bachelor|Master|PhD|Diploma', re.I))[:20]:
+        elem_text = elem.get_text().strip()
+        if 10 < len(elem_text) < 100:
+            programs.append(elem_text)
+    fields['programs'] = programs
+    return fields
+
+
+def timed(fn, html: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(html)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    scraper = GhanaUniversityDataScraper.__new__(GhanaUniversityDataScraper)  # Extraction needs no session or DB
+    single_pass = scraper._extract_page_fields
+
+    print(f"{'fixture':<24}{'size KB':>9}{'legacy ms':>12}{'single-pass ms':>16}{'speedup':>9}")
+    totals = [0.0, 0.0]
+    for name, html in load_fixtures(args.fixtures).items():
+        old, new = legacy_extract(html), single_pass(html)
+        for field in ('description', 'requirements', 'programs', 'emails', 'deadlines'):
+            if sorted(old[field]) != sorted(new[field]) if isinstance(old[field], list) else old[field] != new[field]:
+                print(f"  ⚠️ {name}: '{field}' differs between pipelines")
+        legacy_ms = timed(legacy_extract, html, args.repeat)
+        single_ms = timed(single_pass, html, args.repeat)
+        totals[0] += legacy_ms
+        totals[1] += single_ms
+        print(f"{name:<24}{len(html) / 1024:>9.1f}{legacy_ms:>12.2f}{single_ms:>16.2f}{legacy_ms / single_ms:>8.1f}x")
+    print(f"{'total':<33}{totals[0]:>12.2f}{totals[1]:>16.2f}{totals[0] / totals[1]:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
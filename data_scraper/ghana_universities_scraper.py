@@ -24,17 +24,21 @@ import aiohttp
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 import re
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+import random
 import time
 import hashlib
 import os
 from pathlib import Path
 
 # Database imports
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
@@ -44,6 +48,38 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fields that change on every run without the content changing; excluded from content hashes
+VOLATILE_FIELDS = {'last_updated', 'last_checked'}
+
+# Bump whenever _extract_page_fields or the page parsers change what they return, so pages
+# whose content hash is unchanged are still re-parsed once (2: phone numbers on main pages)
+PARSER_VERSION = 2
+
+# Extraction patterns, compiled once
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERN = re.compile(r'(?:\+233|0)[0-9]{9,10}')
+# "<Month> <day>, <year>": a plain word is matched and checked against MONTH_NAMES, which is
+# much cheaper than a case-insensitive twelve-way alternation at every word boundary
+DATE_PATTERN = re.compile(r'\b([A-Za-z]{3,9})\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}\b')
+MONTH_NAMES = {'january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december'}
+REQUIREMENT_PATTERN = re.compile(r'requirement|admission|entry', re.I)
+PROGRAM_PATTERN = re.compile(r'Bachelor|Master|PhD|Diploma', re.I)
+REQUIREMENT_TAGS = {'div', 'section', 'p'}
+PROGRAM_TAGS = {'li', 'div'}
+
+
+def element_string(element) -> Optional[str]:
+    """lxml equivalent of BeautifulSoup's Tag.string: the text of an element whose only
+    content is a single string, following single-child chains; None otherwise"""
+    while True:
+        if len(element) == 0:
+            return element.text or None
+        if len(element) == 1 and not element.text and not element[0].tail:
+            element = element[0]
+            continue
+        return None
+
 class GhanaUniversityDataScraper:
     """
     Comprehensive scraper for Ghana university admission data
@@ -60,9 +96,19 @@ class GhanaUniversityDataScraper:
         self.cut_off_points = {}
         
         # Scraping configuration
-        self.rate_limit_delay = 2.0  # Seconds between requests
+        self.rate_limit_delay = 2.0  # Minimum seconds between requests to the same host
         self.timeout = 30
         self.max_retries = 3
+        self.retry_backoff = 1.0  # Base delay for exponential backoff between retries
+        self.max_concurrency = int(os.getenv('SCRAPER_MAX_CONCURRENCY', '8'))  # Requests in flight across all hosts
+        self.user_agent = 'Glinax University Bot 1.0 (Educational Purpose)'
+        self.bulk_batch_size = 500  # ReplaceOne operations per bulk_write call
+        
+        # Crawl scheduler state: global cap plus per-host throttling and robots.txt rules
+        self._request_slots = asyncio.Semaphore(self.max_concurrency)
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_next_request: Dict[str, float] = {}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
         
         # University endpoints and selectors
         self.university_sources = {
@@ -97,6 +143,13 @@ class GhanaUniversityDataScraper:
         self.data_dir = Path('data')
         self.data_dir.mkdir(exist_ok=True)
         
+        # Change detection: per-URL validators, content hash and last parsed data from previous runs
+        self.state_path = self.data_dir / 'scrape_state.json'
+        self.page_state: Dict[str, Dict] = self._load_page_state()
+        self.change_report = {'changed': [], 'unchanged': [], 'failed': []}
+        self.changed_universities = set()
+        self.save_report: Dict[str, Dict] = {}
+        
         logger.info("🚀 Ghana University Data Scraper initialized!")
     
     async def __aenter__(self):
@@ -104,7 +157,7 @@ class GhanaUniversityDataScraper:
         self.session = aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=self.timeout),
             headers={
-                'User-Agent': 'Glinax University Bot 1.0 (Educational Purpose)',
+                'User-Agent': self.user_agent,
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                 'Accept-Language': 'en-US,en;q=0.5',
                 'DNT': '1',
@@ -137,6 +190,10 @@ class GhanaUniversityDataScraper:
             # Save to files and database
             await self._save_data()
             
+            # Persist validators for the next run and report what changed
+            self._save_page_state()
+            self._write_change_report()
+            
             logger.info("✅ Data scraping completed successfully!")
             
         except Exception as e:
@@ -144,167 +201,321 @@ class GhanaUniversityDataScraper:
             raise
     
     async def _scrape_universities(self):
-        """Scrape comprehensive university information"""
+        """Scrape comprehensive university information (hosts crawled concurrently)"""
         logger.info("🏫 Scraping university data...")
         
-        for uni_code, config in self.university_sources.items():
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._scrape_university(uni_code, config)
+            for uni_code, config in self.university_sources.items()
+        ))
+        logger.info(f"✅ Scraped {len(self.university_sources)} universities in {time.perf_counter() - started:.1f}s")
+    
+    async def _scrape_university(self, uni_code: str, config: Dict):
+        """Scrape one university's main and admissions pages"""
+        try:
+            logger.info(f"📖 Scraping {uni_code}...")
+            
+            # Both pages share a host, so the host throttle spaces them out
+            main_data, admissions_data = await asyncio.gather(
+                self._fetch_university_main_page(config['url']),
+                self._fetch_admissions_page(config['admissions_url'])
+            )
+            if any(self._page_changed(url) for url in (config['url'], config['admissions_url'])):
+                self.changed_universities.add(uni_code)
+            
+            # Combine data
+            self.universities_data[uni_code] = {
+                **main_data,
+                **admissions_data,
+                'last_updated': datetime.now().isoformat(),
+                'source_urls': [config['url'], config['admissions_url']]
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Error scraping {uni_code}: {str(e)}")
+            # Use fallback data if scraping fails
+            self.universities_data[uni_code] = self._get_fallback_university_data(uni_code)
+            self.changed_universities.add(uni_code)
+    
+    def _host_lock(self, host: str) -> asyncio.Lock:
+        if host not in self._host_locks:
+            self._host_locks[host] = asyncio.Lock()
+        return self._host_locks[host]
+    
+    async def _wait_for_host(self, host: str):
+        """Space requests to one host at least rate_limit_delay (or robots Crawl-delay) apart"""
+        robots = self._robots.get(host)
+        crawl_delay = robots.crawl_delay(self.user_agent) if robots else None
+        delay = max(self.rate_limit_delay, float(crawl_delay or 0))
+        async with self._host_lock(host):
+            wait = self._host_next_request.get(host, 0.0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_next_request[host] = time.monotonic() + delay
+    
+    async def _load_robots(self, url: str) -> Optional[RobotFileParser]:
+        """Fetch and cache robots.txt for the URL's host (once per run)"""
+        parsed = urlparse(url)
+        host = parsed.netloc
+        if host in self._robots:
+            return self._robots[host]
+        async with self._host_lock(f"robots:{host}"):
+            if host in self._robots:
+                return self._robots[host]
+            robots_url = f"{parsed.scheme}://{host}/robots.txt"
+            parser = RobotFileParser(robots_url)
             try:
-                logger.info(f"📖 Scraping {uni_code}...")
-                
-                # Get main university page
-                main_data = await self._fetch_university_main_page(config['url'])
-                
-                # Get admissions page
-                admissions_data = await self._fetch_admissions_page(config['admissions_url'])
-                
-                # Combine data
-                self.universities_data[uni_code] = {
-                    **main_data,
-                    **admissions_data,
-                    'last_updated': datetime.now().isoformat(),
-                    'source_urls': [config['url'], config['admissions_url']]
-                }
-                
-                # Rate limiting
-                await asyncio.sleep(self.rate_limit_delay)
-                
+                await self._wait_for_host(host)
+                async with self._request_slots:
+                    async with self.session.get(robots_url) as response:
+                        if response.status >= 500:
+                            parser.disallow_all = True  # Server error: assume the whole site is off limits
+                        elif response.status >= 400:
+                            parser.allow_all = True  # No robots.txt: everything is allowed
+                        else:
+                            parser.parse((await response.text()).splitlines())
             except Exception as e:
-                logger.error(f"❌ Error scraping {uni_code}: {str(e)}")
-                # Use fallback data if scraping fails
-                self.universities_data[uni_code] = self._get_fallback_university_data(uni_code)
+                logger.warning(f"⚠️ Could not fetch {robots_url}: {str(e)}")
+                parser.disallow_all = True
+            self._robots[host] = parser
+            return parser
+    
+    async def _fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+        """Polite GET: honours robots.txt, per-host spacing, the global concurrency cap,
+        and retries timeouts, connection errors, 429 and 5xx with exponential backoff.
+        
+        Returns {'status': int, 'text': str, 'headers': dict}; status is None when
+        robots.txt disallows the URL.
+        """
+        robots = await self._load_robots(url)
+        if robots and not robots.can_fetch(self.user_agent, url):
+            logger.info(f"🤖 robots.txt disallows {url}")
+            return {'status': None, 'text': '', 'headers': {}, 'blocked': True}
+        
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_host(host)
+            retry_after = None
+            try:
+                async with self._request_slots:
+                    async with self.session.get(url, headers=headers) as response:
+                        if response.status == 429 or response.status >= 500:
+                            retry_after = response.headers.get('Retry-After')
+                            error = f"HTTP {response.status}"
+                            result = {'status': response.status, 'text': '', 'headers': dict(response.headers)}
+                        else:
+                            text = await response.text() if response.status == 200 else ''
+                            return {'status': response.status, 'text': text, 'headers': dict(response.headers)}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+                result = None
+            
+            if attempt == self.max_retries:
+                break
+            backoff = self.retry_backoff * (2 ** attempt) + random.uniform(0, self.retry_backoff)
+            if retry_after and retry_after.isdigit():
+                backoff = max(backoff, float(retry_after))
+            logger.warning(f"🔁 {url}: {error}, retrying in {backoff:.1f}s ({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(backoff)
+        
+        if result is None:
+            raise aiohttp.ClientError(f"{url}: {error} after {self.max_retries + 1} attempts")
+        return result
+    
+    def _load_page_state(self) -> Dict[str, Dict]:
+        """Load per-URL change-detection state saved by the previous run"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable scrape state {self.state_path}: {str(e)}")
+            return {}
+    
+    def _save_page_state(self):
+        """Write page state atomically so an interrupted run never leaves a corrupt file"""
+        tmp_path = self.state_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.page_state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+    
+    def _write_change_report(self):
+        report = {
+            'run_at': datetime.now().isoformat(),
+            **{status: sorted(urls) for status, urls in self.change_report.items()},
+            'changed_universities': sorted(self.changed_universities),
+            'database': self.save_report
+        }
+        with open(self.data_dir / 'scrape_report.json', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(
+            f"📋 Change report: {len(report['changed'])} changed, {len(report['unchanged'])} unchanged, "
+            f"{len(report['failed'])} failed pages; universities to update: {report['changed_universities'] or 'none'}"
+        )
+    
+    def _page_changed(self, url: str) -> bool:
+        """True when the page was re-parsed this run, or failed with no earlier data to fall back on"""
+        return url in self.change_report['changed'] or (
+            url in self.change_report['failed'] and 'data' not in self.page_state.get(url, {})
+        )
+    
+    async def _fetch_page(self, url: str, parse) -> Dict:
+        """Conditional GET of one page; only parse it when its content actually changed.
+        
+        Sends If-None-Match / If-Modified-Since from the previous run. A 304, or a 200 whose
+        SHA-256 matches the stored content hash, reuses the previously parsed data, provided it
+        was parsed by the current PARSER_VERSION (otherwise the page is fetched unconditionally).
+        `parse` receives the fields from _extract_page_fields and returns the data to keep.
+        Returns {'data': dict or None, 'status': HTTP status or None when blocked by robots.txt}.
+        """
+        previous = self.page_state.get(url, {})
+        reusable = 'data' in previous and previous.get('parser_version') == PARSER_VERSION
+        headers = {}
+        if reusable:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+        
+        response = await self._fetch(url, headers=headers)
+        now = datetime.now().isoformat()
+        
+        if response['status'] in (200, 304):
+            content_hash = hashlib.sha256(response['text'].encode('utf-8')).hexdigest() if response['status'] == 200 else None
+            state = {
+                **previous,
+                'etag': response['headers'].get('ETag') or previous.get('etag'),
+                'last_modified': response['headers'].get('Last-Modified') or previous.get('last_modified'),
+                'checked_at': now
+            }
+            if reusable and (response['status'] == 304 or content_hash == previous.get('content_hash')):
+                self.page_state[url] = state
+                self.change_report['unchanged'].append(url)
+                return {'data': previous['data'], 'status': response['status']}
+            if response['status'] == 200:
+                data = parse(self._extract_page_fields(response['text']))
+                self.page_state[url] = {**state, 'content_hash': content_hash, 'parser_version': PARSER_VERSION,
+                                        'changed_at': now, 'data': data}
+                self.change_report['changed'].append(url)
+                return {'data': data, 'status': 200}
+        
+        # Failed: keep serving what we parsed last time, if anything
+        self.change_report['failed'].append(url)
+        return {'data': previous.get('data'), 'status': response['status']}
     
     async def _fetch_university_main_page(self, url: str) -> Dict:
         """Extract university information from main page"""
         try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    # Extract basic information
-                    data = {
-                        'url_accessible': True,
-                        'last_checked': datetime.now().isoformat()
-                    }
-                    
-                    # Try to extract description
-                    description = soup.find('meta', {'name': 'description'})
-                    if description:
-                        data['description'] = description.get('content', '')
-                    
-                    # Extract contact information
-                    contact_info = self._extract_contact_info(soup)
-                    if contact_info:
-                        data['contact'] = contact_info
-                    
-                    return data
-                else:
-                    logger.warning(f"⚠️ HTTP {response.status} for {url}")
-                    return {'url_accessible': False, 'status_code': response.status}
-                    
+            page = await self._fetch_page(url, self._parse_main_page)
+            if page['data'] is not None:
+                return {**page['data'], 'url_accessible': True, 'last_checked': datetime.now().isoformat()}
+            else:
+                logger.warning(f"⚠️ HTTP {page['status']} for {url}")
+                return {'url_accessible': False, 'status_code': page['status']}
+                
         except Exception as e:
             logger.error(f"❌ Error fetching {url}: {str(e)}")
+            self.change_report['failed'].append(url)
             return {'url_accessible': False, 'error': str(e)}
     
+    def _parse_main_page(self, fields: Dict) -> Dict:
+        """Keep description and contact details from a university home page"""
+        data = {}
+        
+        if fields['description'] is not None:
+            data['description'] = fields['description']
+        
+        # Contact information
+        contact = {}
+        if fields['emails']:
+            contact['emails'] = fields['emails']
+        if fields['phones']:
+            contact['phones'] = fields['phones']
+        if contact:
+            data['contact'] = contact
+        
+        return data
+    
     async def _fetch_admissions_page(self, url: str) -> Dict:
         """Extract admissions-specific information"""
         try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    data = {
-                        'admissions_url_accessible': True
-                    }
-                    
-                    # Extract admission requirements
-                    requirements = self._extract_admission_requirements(soup)
-                    if requirements:
-                        data['admission_requirements'] = requirements
-                    
-                    # Extract application deadlines
-                    deadlines = self._extract_deadlines(soup)
-                    if deadlines:
-                        data['deadlines'] = deadlines
-                    
-                    # Extract programs offered
-                    programs = self._extract_programs(soup)
-                    if programs:
-                        data['programs'] = programs
-                    
-                    return data
-                else:
-                    return {'admissions_url_accessible': False}
-                    
+            page = await self._fetch_page(url, self._parse_admissions_page)
+            if page['data'] is not None:
+                return {**page['data'], 'admissions_url_accessible': True}
+            else:
+                return {'admissions_url_accessible': False}
+                
         except Exception as e:
             logger.error(f"❌ Error fetching admissions page {url}: {str(e)}")
+            self.change_report['failed'].append(url)
             return {'admissions_url_accessible': False, 'error': str(e)}
     
-    def _extract_contact_info(self, soup: BeautifulSoup) -> Dict:
-        """Extract contact information from university page"""
-        contact = {}
-        
-        # Look for common contact patterns
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        phone_pattern = r'(\+233|0)[0-9]{9,10}'
-        
-        text = soup.get_text()
-        
-        # Find emails
-        emails = re.findall(email_pattern, text)
-        if emails:
-            contact['emails'] = list(set(emails))
-        
-        # Find phone numbers
-        phones = re.findall(phone_pattern, text)
-        if phones:
-            contact['phones'] = list(set(phones))
+    def _parse_admissions_page(self, fields: Dict) -> Dict:
+        """Keep requirements, deadlines and programmes from an admissions page"""
+        data = {}
         
-        return contact if contact else None
-    
-    def _extract_admission_requirements(self, soup: BeautifulSoup) -> List[str]:
-        """Extract admission requirements from page"""
-        requirements = []
-        
-        # Look for requirement sections
-        req_sections = soup.find_all(['div', 'section', 'p'], 
-                                   string=re.compile(r'requirement|admission|entry', re.I))
-        
-        for section in req_sections[:3]:  # Limit to first 3 matches
-            parent = section.parent if section.parent else section
-            text = parent.get_text().strip()
-            if len(text) > 20 and len(text) < 500:  # Reasonable length
-                requirements.append(text)
+        if fields['requirements']:
+            data['admission_requirements'] = fields['requirements']
+        if fields['deadlines']:
+            data['deadlines'] = fields['deadlines']
+        if fields['programs']:
+            data['programs'] = fields['programs']
         
-        return requirements
+        return data
     
-    def _extract_deadlines(self, soup: BeautifulSoup) -> List[str]:
-        """Extract application deadlines"""
-        deadlines = []
+    def _extract_page_fields(self, html: str) -> Dict:
+        """Single-pass extraction of everything the scraper keeps from a page.
         
-        # Look for date patterns
-        date_pattern = r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}\b'
-        
-        text = soup.get_text()
-        dates = re.findall(date_pattern, text, re.I)
+        The page is parsed once with lxml, and one walk over the candidate tags collects the
+        meta description, requirement sections (first 3 matches) and programme names (first
+        20 matches); the page text is computed once for the email, phone and date patterns.
+        Script and style contents are ignored, as BeautifulSoup's get_text() did.
+        """
+        fields = {'description': None, 'emails': [], 'phones': [], 'deadlines': [], 'requirements': [], 'programs': []}
+        if not html or not html.strip():
+            return fields
+        try:
+            document = lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode input carrying an XML encoding declaration
+            document = lxml.html.document_fromstring(html.encode('utf-8'))
+        etree.strip_elements(document, 'script', 'style', with_tail=False)
         
-        return list(set(dates))
-    
-    def _extract_programs(self, soup: BeautifulSoup) -> List[str]:
-        """Extract academic programs offered"""
-        programs = []
+        requirement_matches = []
+        program_matches = []
+        for element in document.iter('meta', 'div', 'section', 'p', 'li'):
+            if element.tag == 'meta':
+                if fields['description'] is None and element.get('name') == 'description':
+                    fields['description'] = element.get('content', '')
+                continue
+            
+            string = element_string(element)
+            if string is None:
+                continue
+            if element.tag in REQUIREMENT_TAGS and len(requirement_matches) < 3 and REQUIREMENT_PATTERN.search(string):
+                requirement_matches.append(element)
+            if element.tag in PROGRAM_TAGS and len(program_matches) < 20 and PROGRAM_PATTERN.search(string):
+                program_matches.append(element)
         
-        # Look for program lists
-        program_elements = soup.find_all(['li', 'div'], 
-                                       string=re.compile(r'Bachelor|Master|PhD|Diploma', re.I))
+        for section in requirement_matches:
+            parent = section.getparent() if section.getparent() is not None else section
+            text = parent.text_content().strip()
+            if 20 < len(text) < 500:  # Reasonable length
+                fields['requirements'].append(text)
         
-        for elem in program_elements[:20]:  # Limit results
-            text = elem.get_text().strip()
+        for elem in program_matches:
+            text = elem.text_content().strip()
             if 10 < len(text) < 100:  # Reasonable program name length
-                programs.append(text)
+                fields['programs'].append(text)
         
-        return programs
+        text = document.text_content()
+        # Emails never span whitespace, so only tokens containing '@' need scanning
+        fields['emails'] = list(set(EMAIL_PATTERN.findall(' '.join(t for t in text.split() if '@' in t))))
+        fields['phones'] = list(set(PHONE_PATTERN.findall(text)))
+        fields['deadlines'] = list({m.group(0) for m in DATE_PATTERN.finditer(text) if m.group(1).lower() in MONTH_NAMES})
+        return fields
     
     async def _scrape_scholarships(self):
         """Scrape scholarship information"""
@@ -444,51 +655,68 @@ class GhanaUniversityDataScraper:
             raise
     
     async def _save_to_database(self):
-        """Save scraped data to MongoDB"""
+        """Save scraped data to MongoDB with one unordered bulk_write per collection"""
         try:
-            # Save universities
-            universities_collection = self.db['universities_data']
-            for uni_code, data in self.universities_data.items():
-                await universities_collection.replace_one(
-                    {'university_code': uni_code},
-                    {
-                        'university_code': uni_code,
-                        'data': data,
-                        'last_updated': datetime.now()
-                    },
-                    upsert=True
-                )
-            
-            # Save scholarships
-            scholarships_collection = self.db['scholarships_data']
-            for scholarship_id, data in self.scholarships_data.items():
-                await scholarships_collection.replace_one(
-                    {'scholarship_id': scholarship_id},
-                    {
-                        'scholarship_id': scholarship_id,
-                        'data': data,
-                        'last_updated': datetime.now()
-                    },
-                    upsert=True
-                )
-            
-            # Save cut-off points
-            cutoffs_collection = self.db['cut_off_points']
-            await cutoffs_collection.replace_one(
-                {'academic_year': '2024_2025'},
-                {
-                    'academic_year': '2024_2025',
-                    'data': self.cut_off_points,
-                    'last_updated': datetime.now()
-                },
-                upsert=True
-            )
+            self.save_report = {
+                'universities_data': await self._bulk_upsert('universities_data', 'university_code', self.universities_data),
+                'scholarships_data': await self._bulk_upsert('scholarships_data', 'scholarship_id', self.scholarships_data),
+                'cut_off_points': await self._bulk_upsert('cut_off_points', 'academic_year', {'2024_2025': self.cut_off_points})
+            }
             
-            logger.info("✅ Data saved to MongoDB Atlas")
+            failed = sum(len(r['errors']) for r in self.save_report.values())
+            if failed:
+                logger.warning(f"⚠️ Data saved to MongoDB Atlas with {failed} failed documents")
+            else:
+                logger.info("✅ Data saved to MongoDB Atlas")
             
         except Exception as e:
             logger.error(f"❌ Database save error: {str(e)}")
     
+    @staticmethod
+    def _content_hash(data: Dict) -> str:
+        """Stable SHA-256 of a record, ignoring timestamps that change on every run"""
+        stable = {k: v for k, v in data.items() if k not in VOLATILE_FIELDS}
+        return hashlib.sha256(json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+    
+    async def _bulk_upsert(self, collection_name: str, key_field: str, records: Dict[str, Dict]) -> Dict:
+        """Upsert records keyed by key_field, skipping those whose content hash is unchanged.
+        
+        Stored hashes are read in one query, changed records are written with unordered
+        ReplaceOne batches, and each failed document is reported individually.
+        """
+        collection = self.db[collection_name]
+        hashes = {key: self._content_hash(data) for key, data in records.items()}
+        stored = {}
+        async for doc in collection.find({key_field: {'$in': list(records)}}, {key_field: 1, 'content_hash': 1}):
+            stored[doc[key_field]] = doc.get('content_hash')
+        
+        now = datetime.now()
+        changed = [key for key in records if stored.get(key) != hashes[key]]
+        result = {'written': 0, 'unchanged': len(records) - len(changed), 'errors': []}
+        
+        for start in range(0, len(changed), self.bulk_batch_size):
+            keys = changed[start:start + self.bulk_batch_size]
+            operations = [
+                ReplaceOne(
+                    {key_field: key},
+                    {key_field: key, 'data': records[key], 'content_hash': hashes[key], 'last_updated': now},
+                    upsert=True
+                )
+                for key in keys
+            ]
+            try:
+                outcome = await collection.bulk_write(operations, ordered=False)
+                result['written'] += outcome.matched_count + outcome.upserted_count
+            except BulkWriteError as e:
+                result['written'] += e.details.get('nMatched', 0) + e.details.get('nUpserted', 0)
+                for error in e.details.get('writeErrors', []):
+                    key = keys[error['index']]
+                    result['errors'].append({'key': key, 'code': error.get('code'), 'message': error.get('errmsg')})
+                    logger.error(f"❌ {collection_name} {key_field}={key}: {error.get('errmsg')}")
+        
+        logger.info(f"💾 {collection_name}: {result['written']} written, {result['unchanged']} unchanged, {len(result['errors'])} failed")
+        return result
+    
     def _get_fallback_university_data(self, uni_code: str) -> Dict:
         """Provide fallback data if scraping fails"""
         fallback_data = {
@@ -148,6 +148,89 @@ db.notifications.createIndex({ user_id: 1 });
 }
 */
 
+// =============================================
+// EXTRACTION_CACHE COLLECTION (RAG service)
+// =============================================
+// Text extracted from uploaded files, keyed by "<sha256 of bytes>:<content type>".
+// Entries unused for 30 days expire (EXTRACTION_CACHE_TTL_DAYS).
+db.extraction_cache.createIndex({ last_used: 1 }, { expireAfterSeconds: 2592000 });
+
+// Example document structure:
+/*
+{
+  _id: "9f86d081884c7d65...:application/pdf",
+  summary: "📋 PDF: transcript.pdf\nUniversity of Ghana ...",
+  text: "University of Ghana ...",
+  filename: "transcript.pdf",
+  elapsed: 1.42, // seconds the original extraction took
+  last_used: ISODate("2024-01-01T10:00:00Z")
+}
+*/
+
+// =============================================
+// RAG_LOGS COLLECTION (RAG service)
+// =============================================
+// One document per question/answer exchange, written in batches by the RAG service.
+// Thread pages are read by conversation in timestamp order.
+db.rag_logs.createIndex({ conversation_id: 1, timestamp: 1 });
+
+// Example document structure:
+/*
+{
+  _id: ObjectId("..."),
+  conversation_id: "conv-1700000000000",
+  user_id: "64f1c2...",
+  query: "What are the fees for Computer Science at UG?",
+  response: "...",
+  confidence: 0.92,
+  sources: [{ source: "University of Ghana", type: "local_knowledge", confidence: 0.95 }],
+  processing_time: 1.84,
+  timestamp: ISODate("2024-01-01T10:00:00Z")
+}
+*/
+
+// =============================================
+// RAG_CONVERSATIONS COLLECTION (RAG service)
+// =============================================
+// One summary per conversation, maintained by the RAG service whenever a batch of
+// rag_logs is written. Conversation lists page through this collection with a
+// keyset cursor on (last_active, conversation_id) instead of aggregating rag_logs.
+db.rag_conversations.createIndex({ user_id: 1, conversation_id: 1 }, { unique: true });
+db.rag_conversations.createIndex({ user_id: 1, last_active: -1, conversation_id: -1 });
+
+// Example document structure:
+/*
+{
+  _id: ObjectId("..."),
+  user_id: "64f1c2...",
+  conversation_id: "conv-1700000000000",
+  title: "What are the fees for Computer Science at UG?", // first query, max 120 chars
+  started_at: ISODate("2024-01-01T10:00:00Z"),
+  last_active: ISODate("2024-01-01T10:05:00Z"),
+  message_count: 4
+}
+*/
+
+// =============================================
+// SCRAPED DATA COLLECTIONS (data_scraper)
+// =============================================
+// Written by the scraper with unordered bulk ReplaceOne upserts on these keys.
+// content_hash lets unchanged records be skipped without a write.
+db.universities_data.createIndex({ university_code: 1 }, { unique: true });
+db.scholarships_data.createIndex({ scholarship_id: 1 }, { unique: true });
+db.cut_off_points.createIndex({ academic_year: 1 }, { unique: true });
+
+// Example document structure:
+/*
+{
+  _id: ObjectId("..."),
+  university_code: "KNUST",
+  data: { description: "...", programs: ["..."], source_urls: ["..."] },
+  content_hash: "5e884898da28047151d0e56f8dc62927...", // sha256 of data without timestamps
+  last_updated: ISODate("2024-01-01T10:00:00Z")
+}
+*/
+
 // =============================================
 // INSERT SAMPLE FORMS DATA
 // =============================================